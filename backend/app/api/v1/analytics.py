@@ -1,12 +1,30 @@
 """
 Analytics API routes.
 """
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
-from typing import List
-from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from datetime import date, datetime, timedelta
+import asyncio
 
+import numpy as np
+
+from app.core.config import settings
 from app.core.security import get_current_user
+from app.db.storage import storage
+from app.services.ai_client import ai_client
+from app.services.analytics_engine import (
+    MIN_TOPIC_ANSWERS,
+    STRONG_TOPIC_SCORE,
+    WEAK_TOPIC_SCORE,
+    load_events,
+    subject_report,
+    topic_report,
+    weekly_report,
+)
+from app.services.cohort_stats import ALL_SUBJECTS, SESSION_MINUTES, USER_QUIZ_AVERAGE, cohort_stats
+from app.services.rollups import daily_rollups, subject_rollups, topic_rollups, utc_today
+from app.services.jobs import ProgressFn, run_or_enqueue
 
 router = APIRouter()
 
@@ -42,10 +60,32 @@ class AnalyticsResponse(BaseModel):
     strong_areas: List[dict]
 
 
-@router.get("", response_model=AnalyticsResponse)
-async def get_analytics(current_user: dict = Depends(get_current_user)):
-    """Get user analytics and performance data."""
-    # Generate sample analytics data
+class WeeklyReport(BaseModel):
+    """Per-week totals in an analytics report."""
+    week_start: str
+    study_hours: float
+    tasks_completed: int
+    quizzes_taken: int
+    average_quiz_score: float
+
+
+class AnalyticsReport(BaseModel):
+    """Analytics over a date range (e.g. a whole term)."""
+    start: str
+    end: str
+    events: int
+    weekly: List[WeeklyReport]
+    subject_performance: List[SubjectPerformance]
+    weak_areas: List[dict]
+    strong_areas: List[dict]
+
+
+ACTIVITY_FIELDS = ("study_minutes", "tasks_completed", "quizzes_taken", "habit_completions")
+MAX_SESSION_DAYS = 366
+
+
+def _sample_analytics() -> AnalyticsResponse:
+    # Sample data for users with no recorded activity yet
     subject_performance = [
         SubjectPerformance(
             subject="Mathematics",
@@ -109,19 +149,15 @@ async def get_analytics(current_user: dict = Depends(get_current_user)):
     )
 
 
-@router.get("/study-sessions")
-async def get_study_sessions(
-    days: int = 7,
-    current_user: dict = Depends(get_current_user)
-):
-    """Get study session history."""
+def _sample_study_sessions(days: int) -> List[dict]:
+    # Sample data for users with no recorded activity yet
     sessions = []
-    base_date = datetime.now()
+    base_date = utc_today()
     
     for i in range(days):
-        date = base_date - timedelta(days=i)
+        day = base_date - timedelta(days=i)
         sessions.append({
-            "date": date.strftime("%Y-%m-%d"),
+            "date": day.strftime("%Y-%m-%d"),
             "total_minutes": 180 + (i * 20) % 120,
             "subjects": ["Mathematics", "Physics", "Computer Science"][i % 3:],
             "breaks_taken": 3 + (i % 2),
@@ -131,59 +167,276 @@ async def get_study_sessions(
     return sessions
 
 
+def _activity_by_day(rollups: List[dict]) -> Dict[str, dict]:
+    """Sum per-subject daily rollups into one activity total per date."""
+    days: Dict[str, dict] = {}
+    for rollup in rollups:
+        day = days.setdefault(rollup["date"], {**{field: 0 for field in ACTIVITY_FIELDS}, "subjects": []})
+        for field in ACTIVITY_FIELDS:
+            day[field] += rollup.get(field, 0)
+        if rollup["subject"]:
+            day["subjects"].append(rollup["subject"])
+    return days
+
+
+def _current_streak(active_days: Dict[str, dict], today: date) -> int:
+    """Consecutive active days ending today (or yesterday, before today's first activity)."""
+    day = today if today.isoformat() in active_days else today - timedelta(days=1)
+    streak = 0
+    while day.isoformat() in active_days:
+        streak += 1
+        day -= timedelta(days=1)
+    return streak
+
+
+@router.get("", response_model=AnalyticsResponse)
+async def get_analytics(current_user: dict = Depends(get_current_user)):
+    """Get user analytics and performance data.
+    
+    Read from incrementally maintained rollups, so the cost grows with the
+    number of active days and subjects rather than with raw events.
+    """
+    user_id = current_user["id"]
+    subjects, daily, topics = await asyncio.gather(
+        subject_rollups(user_id), daily_rollups(user_id), topic_rollups(user_id)
+    )
+    if not daily:
+        return _sample_analytics()
+    
+    subject_performance = []
+    for rollup in subjects:
+        quizzes = rollup.get("quizzes_taken", 0)
+        average = rollup.get("quiz_score_total", 0) / quizzes if quizzes else 0
+        subject_performance.append(SubjectPerformance(
+            subject=rollup["subject"],
+            score=round(average, 1),
+            total_study_hours=round(rollup.get("study_minutes", 0) / 60, 1),
+            quizzes_taken=quizzes,
+            average_quiz_score=round(average, 1),
+        ))
+    
+    today = utc_today()
+    active_days = _activity_by_day(daily)
+    weekly_progress = []
+    for offset in range(6, -1, -1):
+        day = today - timedelta(days=offset)
+        activity = active_days.get(day.isoformat(), {})
+        weekly_progress.append(WeeklyProgress(
+            day=day.strftime("%a"),
+            study_hours=round(activity.get("study_minutes", 0) / 60, 1),
+            tasks_completed=activity.get("tasks_completed", 0),
+            quizzes_taken=activity.get("quizzes_taken", 0),
+        ))
+    
+    scored_topics = [
+        {"topic": t["topic"], "score": round(t["correct"] / t["answered"] * 100, 1), "subject": t["subject"]}
+        for t in topics if t["answered"] >= MIN_TOPIC_ANSWERS
+    ]
+    scored_topics.sort(key=lambda t: t["score"])
+    
+    total_quizzes = sum(r.get("quizzes_taken", 0) for r in subjects)
+    total_score = sum(r.get("quiz_score_total", 0) for r in subjects)
+    week_hours = sum(d.study_hours for d in weekly_progress)
+    
+    return AnalyticsResponse(
+        total_study_hours=round(sum(r.get("study_minutes", 0) for r in subjects) / 60, 1),
+        total_tasks_completed=sum(r.get("tasks_completed", 0) for r in subjects),
+        total_quizzes_taken=total_quizzes,
+        average_quiz_score=round(total_score / total_quizzes, 1) if total_quizzes else 0,
+        current_streak=_current_streak(active_days, today),
+        weekly_goal_progress=round(min(1.0, week_hours / settings.WEEKLY_STUDY_GOAL_HOURS), 2),
+        subject_performance=subject_performance,
+        weekly_progress=weekly_progress,
+        weak_areas=[t for t in scored_topics if t["score"] < WEAK_TOPIC_SCORE][:3],
+        strong_areas=[t for t in reversed(scored_topics) if t["score"] >= STRONG_TOPIC_SCORE][:3],
+    )
+
+
+@router.get("/study-sessions")
+async def get_study_sessions(
+    days: int = Query(7, ge=1, le=MAX_SESSION_DAYS),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get study session history, newest day first."""
+    today = utc_today()
+    daily = await daily_rollups(current_user["id"], since=today - timedelta(days=days - 1))
+    if not daily and not await storage.daily_rollups.count(user_id=current_user["id"]):
+        return _sample_study_sessions(days)
+    
+    active_days = _activity_by_day(daily)
+    sessions = []
+    for offset in range(days):
+        day = (today - timedelta(days=offset)).isoformat()
+        activity = active_days.get(day, {})
+        sessions.append({
+            "date": day,
+            "total_minutes": round(activity.get("study_minutes", 0)),
+            "subjects": activity.get("subjects", []),
+            "tasks_completed": activity.get("tasks_completed", 0),
+            "quizzes_taken": activity.get("quizzes_taken", 0),
+            "habit_completions": activity.get("habit_completions", 0),
+        })
+    
+    return sessions
+
+
+@router.get("/report", response_model=AnalyticsReport)
+async def get_analytics_report(
+    start: Optional[date] = Query(None, description="First day (default: 16 weeks before end)"),
+    end: Optional[date] = Query(None, description="Last day (default: today)"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get weekly, subject and topic analytics over a date range.
+    
+    Events are loaded into NumPy columns once and aggregated with
+    vectorized group-bys, so term-long reports stay fast.
+    """
+    end = end or utc_today()
+    start = start or end - timedelta(weeks=16) + timedelta(days=1)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must not be after end"
+        )
+    
+    cols = await load_events(current_user["id"], start)
+    days = np.array([start, end], dtype="datetime64[D]").astype(np.int64)
+    in_range = (cols.day >= days[0]) & (cols.day <= days[1])
+    weak_areas, strong_areas = topic_report(cols, in_range)
+    
+    return AnalyticsReport(
+        start=start.isoformat(),
+        end=end.isoformat(),
+        events=int(in_range.sum()),
+        weekly=weekly_report(cols, start, end),
+        subject_performance=subject_report(cols, in_range),
+        weak_areas=weak_areas,
+        strong_areas=strong_areas,
+    )
+
+
 @router.get("/insights")
-async def get_ai_insights(current_user: dict = Depends(get_current_user)):
+async def get_ai_insights(
+    background: bool = Query(False, description="Queue as a background job"),
+    current_user: dict = Depends(get_current_user)
+):
     """Get AI-generated learning insights."""
-    return {
-        "insights": [
-            {
-                "type": "recommendation",
-                "title": "Focus on Integration",
-                "description": "Your performance in integration problems is below average. Consider spending more time on Chapter 6.",
-                "priority": "high"
-            },
-            {
-                "type": "achievement",
-                "title": "Strong in Algorithms",
-                "description": "You're excelling in algorithms! Your score is 20% above the class average.",
-                "priority": "low"
-            },
-            {
-                "type": "habit",
-                "title": "Study Time Pattern",
-                "description": "You study best between 9-11 AM. Consider scheduling difficult topics during this time.",
-                "priority": "medium"
-            },
-            {
-                "type": "goal",
-                "title": "Weekly Goal Progress",
-                "description": "You're on track to complete 85% of your weekly study goal. 2 more hours needed!",
-                "priority": "medium"
+    async def work(progress: ProgressFn):
+        if ai_client.configured:
+            progress(0.1, "Analyzing your progress")
+            analytics = await get_analytics(current_user)
+            data = await ai_client.generate_json(
+                "Here is a student's learning analytics as JSON:\n"
+                f"{analytics.model_dump_json()}\n\n"
+                "Write 3-5 personalised insights. Return {\"insights\": [{\"type\": "
+                "\"recommendation\" | \"achievement\" | \"habit\" | \"goal\", \"title\", "
+                "\"description\", \"priority\": \"high\" | \"medium\" | \"low\"}]}.",
+                system="You are a learning coach. Respond with JSON only.",
+            )
+            return {
+                "insights": [
+                    {key: str(item.get(key, "")) for key in ("type", "title", "description", "priority")}
+                    for item in data.get("insights", []) if isinstance(item, dict)
+                ],
+                "generated_at": datetime.utcnow().isoformat()
             }
-        ],
-        "generated_at": datetime.utcnow().isoformat()
-    }
+        
+        return {
+            "insights": [
+                {
+                    "type": "recommendation",
+                    "title": "Focus on Integration",
+                    "description": "Your performance in integration problems is below average. Consider spending more time on Chapter 6.",
+                    "priority": "high"
+                },
+                {
+                    "type": "achievement",
+                    "title": "Strong in Algorithms",
+                    "description": "You're excelling in algorithms! Your score is 20% above the class average.",
+                    "priority": "low"
+                },
+                {
+                    "type": "habit",
+                    "title": "Study Time Pattern",
+                    "description": "You study best between 9-11 AM. Consider scheduling difficult topics during this time.",
+                    "priority": "medium"
+                },
+                {
+                    "type": "goal",
+                    "title": "Weekly Goal Progress",
+                    "description": "You're on track to complete 85% of your weekly study goal. 2 more hours needed!",
+                    "priority": "medium"
+                }
+            ],
+            "generated_at": datetime.utcnow().isoformat()
+        }
+    
+    return await run_or_enqueue("analytics.insights", current_user, background, work)
 
 
-@router.get("/comparison")
-async def get_peer_comparison(current_user: dict = Depends(get_current_user)):
-    """Get anonymous peer comparison data."""
+def _sample_comparison() -> dict:
+    # Shown until the user has quiz activity to compare
     return {
         "your_percentile": 75,
-        "avg_study_hours_comparison": {
-            "you": 32.5,
-            "class_average": 28.0
-        },
         "quiz_score_comparison": {
             "you": 78,
             "class_average": 72
         },
-        "consistency_score": 85,
-        "rank_in_subject": {
-            "Mathematics": 12,
-            "Physics": 25,
-            "Computer Science": 5
+        "session_minutes_comparison": {
+            "you": 45.0,
+            "class_average": 40.0
+        },
+        "percentile_in_subject": {
+            "Mathematics": 88.0,
+            "Physics": 42.5,
+            "Computer Science": 95.0
         },
-        "improvement_areas": ["Physics", "Essay Writing"],
+        "improvement_areas": ["Physics"],
+        "note": "Comparison is anonymized and based on aggregate data"
+    }
+
+
+@router.get("/comparison")
+async def get_peer_comparison(current_user: dict = Depends(get_current_user)):
+    """Get anonymous peer comparison data.
+    
+    Percentiles and class averages are lookups in the cohort summaries, so
+    the cost does not grow with the number of students. Quiz averages are
+    compared with other students' averages, and minutes per study session
+    with the cohort's sessions. Values with no cohort data yet are None.
+    """
+    subjects = [r for r in await subject_rollups(current_user["id"]) if r.get("quizzes_taken")]
+    if not subjects:
+        return _sample_comparison()
+    
+    quizzes = sum(r["quizzes_taken"] for r in subjects)
+    your_score = sum(r.get("quiz_score_total", 0) for r in subjects) / quizzes
+    sessions = sum(r.get("study_sessions", 0) for r in subjects)
+    your_minutes = sum(r.get("study_minutes", 0) for r in subjects) / sessions if sessions > 0 else None
+    class_score = cohort_stats.average(USER_QUIZ_AVERAGE)
+    class_minutes = cohort_stats.average(SESSION_MINUTES)
+    
+    percentile_in_subject = {}
+    for rollup in subjects:
+        average = rollup.get("quiz_score_total", 0) / rollup["quizzes_taken"]
+        percentile = cohort_stats.percentile(USER_QUIZ_AVERAGE, rollup["subject"], average)
+        if percentile is not None:
+            percentile_in_subject[rollup["subject"]] = percentile
+    
+    return {
+        "your_percentile": cohort_stats.percentile(USER_QUIZ_AVERAGE, ALL_SUBJECTS, your_score),
+        "quiz_score_comparison": {
+            "you": round(your_score, 1),
+            "class_average": round(class_score, 1) if class_score is not None else None
+        },
+        "session_minutes_comparison": {
+            "you": round(your_minutes, 1) if your_minutes is not None else None,
+            "class_average": round(class_minutes, 1) if class_minutes is not None else None
+        },
+        "percentile_in_subject": percentile_in_subject,
+        "improvement_areas": sorted(
+            (subject for subject, percentile in percentile_in_subject.items() if percentile < 50),
+            key=percentile_in_subject.get,
+        ),
         "note": "Comparison is anonymized and based on aggregate data"
     }
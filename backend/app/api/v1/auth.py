@@ -7,20 +7,20 @@ from datetime import timedelta
 from typing import Optional
 
 from app.core.security import (
-    get_password_hash, 
-    verify_password, 
+    hash_password,
+    verify_password_and_update,
     create_access_token, 
     create_refresh_token,
     decode_token,
     get_current_user
 )
 from app.core.config import settings
+from app.core.ids import new_id
+from app.db.base import DuplicateKeyError
+from app.db.storage import storage
 
 router = APIRouter()
 
-# In-memory user storage (replace with MongoDB in production)
-users_db: dict = {}
-
 
 class UserRegister(BaseModel):
     """User registration request schema."""
@@ -51,19 +51,25 @@ class UserProfile(BaseModel):
     role: str
 
 
+async def get_user_by_email(email: str) -> Optional[dict]:
+    """Look up a user through the unique email index."""
+    users = await storage.users.find(limit=1, email=email)
+    return users[0] if users else None
+
+
 @router.post("/register", response_model=TokenResponse)
 async def register(user_data: UserRegister):
     """Register a new user."""
     # Check if user exists
-    if user_data.email in users_db:
+    if await get_user_by_email(user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
     # Create user
-    user_id = f"user_{len(users_db) + 1}"
-    hashed_password = get_password_hash(user_data.password)
+    user_id = new_id("user")
+    hashed_password = await hash_password(user_data.password)
     
     user = {
         "id": user_id,
@@ -72,7 +78,14 @@ async def register(user_data: UserRegister):
         "password": hashed_password,
         "role": "student",
     }
-    users_db[user_data.email] = user
+    try:
+        await storage.users.insert(user)
+    except DuplicateKeyError:
+        # Registered concurrently while the password was being hashed
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
     # Generate tokens
     token_data = {"sub": user_id, "email": user_data.email, "role": "student"}
@@ -95,26 +108,40 @@ async def register(user_data: UserRegister):
 async def login(credentials: UserLogin):
     """Login user and return tokens."""
     # Demo login - accept any credentials for testing
-    user = users_db.get(credentials.email)
+    user = await get_user_by_email(credentials.email)
     
     if not user:
         # Create demo user on first login
-        user_id = f"user_{len(users_db) + 1}"
+        user_id = new_id("user")
         user = {
             "id": user_id,
             "email": credentials.email,
             "name": "Demo User",
-            "password": get_password_hash(credentials.password),
+            "password": await hash_password(credentials.password),
             "role": "student",
         }
-        users_db[credentials.email] = user
+        try:
+            await storage.users.insert(user)
+        except DuplicateKeyError:
+            # Created concurrently by another login; check against that user
+            user = await get_user_by_email(credentials.email)
+            valid, _ = await verify_password_and_update(credentials.password, user["password"])
+            if not valid:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Invalid email or password"
+                )
     else:
         # Verify password
-        if not verify_password(credentials.password, user["password"]):
+        valid, new_hash = await verify_password_and_update(credentials.password, user["password"])
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
             )
+        if new_hash:
+            # Stored hash used an old cost factor
+            await storage.users.update(user["id"], {"password": new_hash})
     
     # Generate tokens
     token_data = {"sub": user["id"], "email": user["email"], "role": user["role"]}
@@ -136,14 +163,10 @@ async def login(credentials: UserLogin):
 @router.get("/me", response_model=UserProfile)
 async def get_me(current_user: dict = Depends(get_current_user)):
     """Get current user profile."""
-    user = None
-    for u in users_db.values():
-        if u["id"] == current_user["id"]:
-            user = u
-            break
+    user = await storage.users.get(current_user["id"])
     
     if not user:
-        # Return info from token if user not in memory
+        # Return info from token if the user record is gone
         return UserProfile(
             id=current_user["id"],
             email=current_user["email"],
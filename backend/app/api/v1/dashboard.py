@@ -0,0 +1,77 @@
+"""
+Dashboard API routes.
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Dict, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from app.api.v1 import analytics, habits, study_plans, tasks
+from app.core.config import settings
+from app.core.pagination import Page
+from app.core.security import get_current_user
+
+router = APIRouter()
+
+
+class DashboardResponse(BaseModel):
+    """Composite dashboard payload with per-section timings."""
+    sections: Dict[str, Any]
+    timings_ms: Dict[str, float]
+    errors: Dict[str, str]
+    total_ms: float
+    generated_at: str
+
+
+async def _timed(section: Awaitable) -> Tuple[Any, float, str]:
+    start = time.perf_counter()
+    try:
+        result, error = jsonable_encoder(await asyncio.wait_for(section, settings.DASHBOARD_SECTION_TIMEOUT_SECONDS)), None
+    except asyncio.TimeoutError:
+        result, error = None, "Timed out"
+    except HTTPException as e:
+        result, error = None, str(e.detail)
+    except Exception as e:
+        result, error = None, type(e).__name__
+    return result, round((time.perf_counter() - start) * 1000, 2), error
+
+
+@router.get("", response_model=DashboardResponse)
+async def get_dashboard(
+    limit: int = Query(20, ge=1, le=200, description="Items per list section"),
+    days: int = Query(7, ge=1, le=90, description="Days of study sessions"),
+    insights: bool = Query(False, description="Include AI insights (a model call)"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get everything the dashboard shows in one request.
+    
+    Sections are fetched concurrently; a failing section, or one slower
+    than ``DASHBOARD_SECTION_TIMEOUT_SECONDS``, is reported in ``errors``
+    instead of failing or holding up the whole dashboard. AI insights are
+    opt-in, since they wait on a model call.
+    """
+    start = time.perf_counter()
+    page = Page(limit=limit, cursor=None, fields=None)
+    sections = {
+        "tasks": tasks.get_tasks(Response(), status=None, priority=None, page=page, current_user=current_user),
+        "habits": habits.get_habits(Response(), page=page, current_user=current_user),
+        "study_plans": study_plans.get_study_plan_summaries(Response(), page=page, current_user=current_user),
+        "analytics": analytics.get_analytics(current_user=current_user),
+        "study_sessions": analytics.get_study_sessions(days=days, current_user=current_user),
+    }
+    if insights:
+        sections["insights"] = analytics.get_ai_insights(background=False, current_user=current_user)
+    
+    results = await asyncio.gather(*(_timed(section) for section in sections.values()))
+    
+    return DashboardResponse(
+        sections={name: result for name, (result, _, _) in zip(sections, results)},
+        timings_ms={name: ms for name, (_, ms, _) in zip(sections, results)},
+        errors={name: error for name, (_, _, error) in zip(sections, results) if error},
+        total_ms=round((time.perf_counter() - start) * 1000, 2),
+        generated_at=datetime.utcnow().isoformat(),
+    )
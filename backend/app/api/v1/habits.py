@@ -1,19 +1,19 @@
 """
 Habits API routes.
 """
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Response
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import datetime, date
+from datetime import datetime
 
+from app.core.ids import new_id
+from app.core.pagination import Page, page_params
 from app.core.security import get_current_user
+from app.db.storage import storage
+from app.services.rollups import record_habit_log, utc_today
 
 router = APIRouter()
 
-# In-memory storage
-habits_db: dict = {}
-habit_logs_db: dict = {}
-
 
 class HabitCreate(BaseModel):
     """Habit creation request."""
@@ -46,15 +46,21 @@ class HabitLog(BaseModel):
 
 
 @router.get("", response_model=List[HabitResponse])
-async def get_habits(current_user: dict = Depends(get_current_user)):
-    """Get all habits for current user."""
-    user_habits = [
-        habit for habit in habits_db.values()
-        if habit["user_id"] == current_user["id"]
-    ]
+async def get_habits(
+    response: Response,
+    page: Page = Depends(page_params),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a page of habits for current user."""
+    user_habits = await storage.habits.find(
+        projection=page.projection(HabitResponse),
+        limit=page.limit + 1,
+        after=page.cursor,
+        user_id=current_user["id"],
+    )
     
     # Return demo habits if empty
-    if not user_habits:
+    if not user_habits and page.cursor is None:
         demo_habits = [
             HabitResponse(
                 id="habit_1",
@@ -93,9 +99,9 @@ async def get_habits(current_user: dict = Depends(get_current_user)):
                 created_at=datetime.utcnow().isoformat()
             ),
         ]
-        return demo_habits
+        return page.respond(response, [h.model_dump() for h in demo_habits])
     
-    return user_habits
+    return page.respond(response, user_habits)
 
 
 @router.post("", response_model=HabitResponse)
@@ -104,7 +110,7 @@ async def create_habit(
     current_user: dict = Depends(get_current_user)
 ):
     """Create a new habit."""
-    habit_id = f"habit_{len(habits_db) + 1}"
+    habit_id = new_id("habit")
     
     habit = {
         "id": habit_id,
@@ -119,7 +125,7 @@ async def create_habit(
         "created_at": datetime.utcnow().isoformat(),
     }
     
-    habits_db[habit_id] = habit
+    await storage.habits.insert(habit)
     return habit
 
 
@@ -130,32 +136,29 @@ async def log_habit(
     current_user: dict = Depends(get_current_user)
 ):
     """Log habit completion."""
-    habit = habits_db.get(habit_id)
+    habit = await storage.habits.get(habit_id)
     if not habit or habit["user_id"] != current_user["id"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Habit not found"
         )
     
-    today = date.today().isoformat()
-    log_key = f"{habit_id}_{today}"
+    today = utc_today().isoformat()
+    log = await storage.habit_logs.increment(
+        f"{habit_id}_{today}",
+        {"count": count},
+        defaults={"habit_id": habit_id, "date": today},
+    )
     
-    if log_key in habit_logs_db:
-        habit_logs_db[log_key]["count"] += count
-    else:
-        habit_logs_db[log_key] = {
-            "habit_id": habit_id,
-            "date": today,
-            "count": count
-        }
+    await record_habit_log(current_user["id"], today, count)
     
-    habit["current_count"] = habit_logs_db[log_key]["count"]
+    changes = {"current_count": log["count"]}
     
-    # Update streak if target reached
-    if habit["current_count"] >= habit["target_count"]:
-        habit["streak"] += 1
+    # Update streak when this log reaches the target
+    if log["count"] - count < habit["target_count"] <= log["count"]:
+        changes["streak"] = habit["streak"] + 1
     
-    return habit
+    return await storage.habits.update(habit_id, changes)
 
 
 @router.get("/{habit_id}/history")
@@ -165,17 +168,17 @@ async def get_habit_history(
     current_user: dict = Depends(get_current_user)
 ):
     """Get habit completion history."""
-    habit = habits_db.get(habit_id)
+    habit = await storage.habits.get(habit_id)
     if not habit or habit["user_id"] != current_user["id"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Habit not found"
         )
     
-    history = [
-        log for log in habit_logs_db.values()
-        if log["habit_id"] == habit_id
-    ]
+    history = await storage.habit_logs.find(
+        projection=("habit_id", "date", "count"),
+        habit_id=habit_id,
+    )
     
     return {"habit_id": habit_id, "history": history}
 
@@ -186,18 +189,17 @@ async def delete_habit(
     current_user: dict = Depends(get_current_user)
 ):
     """Delete a habit."""
-    habit = habits_db.get(habit_id)
+    habit = await storage.habits.get(habit_id)
     if not habit or habit["user_id"] != current_user["id"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Habit not found"
         )
     
-    del habits_db[habit_id]
+    await storage.habits.delete(habit_id)
     
     # Clean up logs
-    keys_to_delete = [k for k in habit_logs_db if k.startswith(f"{habit_id}_")]
-    for key in keys_to_delete:
-        del habit_logs_db[key]
+    for log in await storage.habit_logs.find(habit_id=habit_id):
+        await storage.habit_logs.delete(log["id"])
     
     return {"message": "Habit deleted successfully"}
@@ -0,0 +1,72 @@
+"""
+Background Jobs API routes.
+"""
+from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Any, List, Optional
+import json
+
+from app.core.security import get_current_user
+from app.services.jobs import Job, job_runner
+
+router = APIRouter()
+
+
+class JobResponse(BaseModel):
+    """Job status schema."""
+    id: str
+    kind: str
+    status: str  # queued, running, succeeded, failed, cancelled
+    progress: float
+    message: str
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: str
+
+
+def _get_owned_job(job_id: str, current_user: dict) -> Job:
+    job = job_runner.get(job_id)
+    if not job or job.user_id != current_user["id"]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+
+@router.get("", response_model=List[JobResponse])
+async def get_jobs(current_user: dict = Depends(get_current_user)):
+    """Get recent jobs for current user."""
+    return [job.to_dict() for job in job_runner.for_user(current_user["id"])]
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get the status (and result, once finished) of a job."""
+    return _get_owned_job(job_id, current_user).to_dict()
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream job progress and partial results as Server-Sent Events."""
+    job = _get_owned_job(job_id, current_user)
+
+    async def event_stream():
+        async for event in job.stream():
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
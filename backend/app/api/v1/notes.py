@@ -1,17 +1,40 @@
 """
 Notes Generation API routes.
 """
-from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Awaitable, Callable, List, Optional, Tuple
 from datetime import datetime
+import json
+import logging
 
+from app.core.ids import new_id
+from app.core.pagination import Page, page_params
 from app.core.security import get_current_user
+from app.db.storage import storage
+from app.services.item_bank import add_questions
+from app.services.jobs import ProgressFn, run_or_enqueue
+from app.services.mcq_generation import generate_mcqs
+from app.services.note_generation import (
+    apply_note_event,
+    empty_note_content,
+    generate_note_content,
+    note_cache,
+    note_flights,
+    stream_note_content,
+    text_cache_key,
+    video_cache_key,
+)
+from app.services.pdf import iter_pdf_pages, pdf_text_cache, remove_spool, spool_upload
+from app.services.reviews import add_cards, remove_cards
+from app.services.rollups import DEFAULT_SUBJECT
+from app.services.summarization import summarize_pages
+from app.services.youtube import extract_video_id, fetch_transcript
 
 router = APIRouter()
 
-# In-memory storage
-notes_db: dict = {}
+logger = logging.getLogger(__name__)
 
 
 class MCQ(BaseModel):
@@ -38,6 +61,17 @@ class NoteResponse(BaseModel):
     created_at: str
 
 
+class NoteSummary(BaseModel):
+    """Lightweight note schema for list views (no content or MCQs)."""
+    id: str
+    user_id: str
+    title: str
+    source_type: str
+    source_url: Optional[str] = None
+    summary: str
+    created_at: str
+
+
 class GenerateFromTextRequest(BaseModel):
     """Request to generate notes from text."""
     content: str
@@ -47,108 +81,147 @@ class GenerateFromTextRequest(BaseModel):
 class GenerateFromYoutubeRequest(BaseModel):
     """Request to generate notes from YouTube."""
     url: str
+    language: Optional[str] = None  # Transcript language code, e.g. "en"
 
 
 @router.get("", response_model=List[NoteResponse])
-async def get_notes(current_user: dict = Depends(get_current_user)):
-    """Get all notes for current user."""
-    user_notes = [
-        note for note in notes_db.values()
-        if note["user_id"] == current_user["id"]
-    ]
-    return user_notes
+async def get_notes(
+    response: Response,
+    page: Page = Depends(page_params),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a page of notes for current user."""
+    notes = await storage.notes.find(
+        projection=page.projection(NoteResponse),
+        limit=page.limit + 1,
+        after=page.cursor,
+        user_id=current_user["id"],
+    )
+    return page.respond(response, notes)
+
+
+@router.get("/summary", response_model=List[NoteSummary])
+async def get_note_summaries(
+    response: Response,
+    page: Page = Depends(page_params),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a page of note summaries, without content or MCQs."""
+    notes = await storage.notes.find(
+        projection=page.projection(NoteSummary) or list(NoteSummary.model_fields),
+        limit=page.limit + 1,
+        after=page.cursor,
+        user_id=current_user["id"],
+    )
+    return page.respond(response, notes)
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(current_user: dict = Depends(get_current_user)):
+    """Get hit/miss counters for the generated-notes cache and request coalescing."""
+    return {**note_cache.stats(), "coalescing": note_flights.stats()}
 
 
 @router.post("/from-text", response_model=NoteResponse)
 async def generate_from_text(
     request: GenerateFromTextRequest,
+    background: bool = Query(False, description="Queue as a background job"),
     current_user: dict = Depends(get_current_user)
 ):
     """Generate notes from text content using AI."""
-    note_id = f"note_{len(notes_db) + 1}"
-    
-    # In production, this would call AI (Gemini) to generate notes
-    # For demo, we'll create structured content
-    note = {
-        "id": note_id,
-        "user_id": current_user["id"],
-        "title": request.title or "Generated Notes",
-        "content": request.content,
-        "source_type": "text",
-        "source_url": None,
-        "key_points": [
-            "Main concept explanation from the content",
-            "Key terminology and definitions",
-            "Important relationships between concepts",
-            "Practical applications mentioned",
-            "Summary of main arguments"
-        ],
-        "summary": f"AI-generated summary of the provided content. The content covers key concepts and their relationships. {request.content[:200]}...",
-        "mcqs": [
-            {
-                "id": "mcq_1",
-                "question": "What is the main topic discussed in this content?",
-                "options": {"a": "Option A", "b": "Option B", "c": "Option C", "d": "Option D"},
-                "correct_answer": "a",
-                "explanation": "This is the correct answer because...",
-                "difficulty": "medium"
-            }
-        ],
-        "created_at": datetime.utcnow().isoformat(),
-    }
+    async def work(progress: ProgressFn):
+        progress(0.1, "Generating notes")
+        generated = await generate_note_content(
+            text_cache_key(request.content), "text", request.content
+        )
+        
+        note = {
+            "id": new_id("note"),
+            "user_id": current_user["id"],
+            "title": request.title or "Generated Notes",
+            "content": request.content,
+            "source_type": "text",
+            "source_url": None,
+            **generated,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        
+        await storage.notes.insert(note)
+        await add_cards(current_user["id"], "note", note["id"], note["mcqs"])
+        return note
     
-    notes_db[note_id] = note
-    return note
+    return await run_or_enqueue("notes.from_text", current_user, background, work)
 
 
 @router.post("/from-youtube", response_model=NoteResponse)
 async def generate_from_youtube(
     request: GenerateFromYoutubeRequest,
+    background: bool = Query(False, description="Queue as a background job"),
     current_user: dict = Depends(get_current_user)
 ):
     """Generate notes from YouTube video using AI."""
-    note_id = f"note_{len(notes_db) + 1}"
+    try:
+        video_id = extract_video_id(request.url)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
-    # In production, this would:
-    # 1. Extract video ID from URL
-    # 2. Fetch transcript using YouTube API
-    # 3. Process with AI to generate notes
+    async def work(progress: ProgressFn):
+        progress(0.1, "Fetching transcript")
+        content = await fetch_transcript(video_id, [request.language] if request.language else None)
+        
+        progress(0.3, "Generating notes")
+        generated = await generate_note_content(video_cache_key(video_id, request.language), "youtube", content)
+        
+        note = {
+            "id": new_id("note"),
+            "user_id": current_user["id"],
+            "title": "Notes from YouTube Video",
+            "content": content,
+            "source_type": "youtube",
+            "source_url": request.url,
+            **generated,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        
+        await storage.notes.insert(note)
+        await add_cards(current_user["id"], "note", note["id"], note["mcqs"])
+        return note
     
-    note = {
-        "id": note_id,
-        "user_id": current_user["id"],
-        "title": "Notes from YouTube Video",
-        "content": "Extracted transcript content would appear here...",
-        "source_type": "youtube",
-        "source_url": request.url,
-        "key_points": [
-            "Key concept from video",
-            "Important explanation point",
-            "Practical demonstration summary",
-            "Key takeaway 1",
-            "Key takeaway 2"
-        ],
-        "summary": "AI-generated summary of the YouTube video content. The video covers important topics with practical demonstrations.",
-        "mcqs": [
-            {
-                "id": "mcq_1",
-                "question": "Based on the video, what is the correct approach?",
-                "options": {"a": "Approach A", "b": "Approach B", "c": "Approach C", "d": "Approach D"},
-                "correct_answer": "b",
-                "explanation": "As explained in the video...",
-                "difficulty": "medium"
-            }
-        ],
-        "created_at": datetime.utcnow().isoformat(),
-    }
+    return await run_or_enqueue("notes.from_youtube", current_user, background, work)
+
+
+async def _pdf_content(path: str, digest: str) -> str:
+    """Text of a spooled PDF, which is removed once read.
     
-    notes_db[note_id] = note
-    return note
+    A repeat upload (same ``digest``) reuses the text extracted last time,
+    so it goes straight to the note cache. Otherwise pages are chunked and
+    summarized as they are extracted.
+    """
+    content = pdf_text_cache.get(digest)
+    if content is not None:
+        remove_spool(path)
+        return content
+    
+    try:
+        content = await summarize_pages(text async for _, text in iter_pdf_pages(path))
+    finally:
+        remove_spool(path)
+    if not content:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="No extractable text found in PDF"
+        )
+    pdf_text_cache.set(digest, content)
+    return content
 
 
 @router.post("/from-pdf", response_model=NoteResponse)
 async def generate_from_pdf(
     file: UploadFile = File(...),
+    background: bool = Query(False, description="Queue as a background job"),
     current_user: dict = Depends(get_current_user)
 ):
     """Generate notes from uploaded PDF using AI."""
@@ -159,50 +232,155 @@ async def generate_from_pdf(
             detail="Only PDF files are allowed"
         )
     
-    note_id = f"note_{len(notes_db) + 1}"
+    # Spool before returning: the upload is closed once the request ends
+    path, digest = await spool_upload(file)
+    filename = file.filename
+    
+    async def work(progress: ProgressFn):
+        progress(0.1, "Extracting text")
+        content = await _pdf_content(path, digest)
+        
+        progress(0.5, "Generating notes")
+        generated = await generate_note_content(text_cache_key(content), "pdf", content)
+        
+        note = {
+            "id": new_id("note"),
+            "user_id": current_user["id"],
+            "title": f"Notes from {filename}",
+            "content": content,
+            "source_type": "pdf",
+            "source_url": filename,
+            **generated,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        
+        await storage.notes.insert(note)
+        await add_cards(current_user["id"], "note", note["id"], note["mcqs"])
+        return note
+    
+    return await run_or_enqueue("notes.from_pdf", current_user, background, work, cleanup=lambda: remove_spool(path))
+
+
+def _stream_note(
+    current_user: dict,
+    note_fields: dict,
+    load_content: Callable[[], Awaitable[Tuple[str, str]]],
+    cleanup: Optional[Callable[[], None]] = None,
+) -> StreamingResponse:
+    """Stream note generation as NDJSON events, saving the note at the end.
+    
+    ``load_content`` returns ``(content, cache_key)``; it runs inside the
+    stream so slow extraction doesn't delay the first byte. The final event
+    is ``{"type": "note", ...}`` with the saved note, or ``{"type": "error"}``.
+    ``cleanup`` runs when the stream ends, fails or the client disconnects.
+    """
+    async def events():
+        try:
+            yield {"type": "status", "message": "Preparing content"}
+            content, cache_key = await load_content()
+            
+            generated = empty_note_content()
+            async for event in stream_note_content(cache_key, note_fields["source_type"], content):
+                apply_note_event(generated, event)
+                yield event
+            
+            note = {
+                "id": new_id("note"),
+                "user_id": current_user["id"],
+                **note_fields,
+                "content": content,
+                **generated,
+                "created_at": datetime.utcnow().isoformat(),
+            }
+            await storage.notes.insert(note)
+            await add_cards(current_user["id"], "note", note["id"], note["mcqs"])
+            yield {"type": "note", "note": note}
+        except HTTPException as e:
+            yield {"type": "error", "detail": e.detail}
+        except Exception:
+            # The response has started, so end the stream with an error event, not a 500
+            logger.exception("Note stream failed")
+            yield {"type": "error", "detail": "Note generation failed"}
+    
+    async def ndjson():
+        try:
+            async for event in events():
+                yield json.dumps(event) + "\n"
+        finally:
+            if cleanup is not None:
+                cleanup()
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.post("/from-text/stream")
+async def stream_from_text(
+    request: GenerateFromTextRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Generate notes from text, streaming summary, key points and MCQs as NDJSON."""
+    async def load_content():
+        return request.content, text_cache_key(request.content)
+    
+    note_fields = {
+        "title": request.title or "Generated Notes",
+        "source_type": "text",
+        "source_url": None,
+    }
+    return _stream_note(current_user, note_fields, load_content)
+
+
+@router.post("/from-youtube/stream")
+async def stream_from_youtube(
+    request: GenerateFromYoutubeRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Generate notes from a YouTube video, streaming the result as NDJSON."""
+    try:
+        video_id = extract_video_id(request.url)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    async def load_content():
+        content = await fetch_transcript(video_id, [request.language] if request.language else None)
+        return content, video_cache_key(video_id, request.language)
+    
+    note_fields = {
+        "title": "Notes from YouTube Video",
+        "source_type": "youtube",
+        "source_url": request.url,
+    }
+    return _stream_note(current_user, note_fields, load_content)
+
+
+@router.post("/from-pdf/stream")
+async def stream_from_pdf(
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """Generate notes from an uploaded PDF, streaming the result as NDJSON."""
+    if not file.filename.endswith('.pdf'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only PDF files are allowed"
+        )
+    
+    # Spool before streaming: the upload is closed once the handler returns
+    path, digest = await spool_upload(file)
     
-    # In production, this would:
-    # 1. Extract text from PDF using PyMuPDF
-    # 2. Process with AI to generate notes
+    async def load_content():
+        content = await _pdf_content(path, digest)
+        return content, text_cache_key(content)
     
-    note = {
-        "id": note_id,
-        "user_id": current_user["id"],
+    note_fields = {
         "title": f"Notes from {file.filename}",
-        "content": "Extracted PDF content would appear here...",
         "source_type": "pdf",
         "source_url": file.filename,
-        "key_points": [
-            "Main concept from PDF",
-            "Key definition or formula",
-            "Important theorem or principle",
-            "Application example",
-            "Summary of chapter"
-        ],
-        "summary": f"AI-generated summary of {file.filename}. The document covers fundamental concepts with detailed explanations.",
-        "mcqs": [
-            {
-                "id": "mcq_1",
-                "question": "Based on the document, which statement is correct?",
-                "options": {"a": "Statement A", "b": "Statement B", "c": "Statement C", "d": "Statement D"},
-                "correct_answer": "a",
-                "explanation": "According to the document...",
-                "difficulty": "medium"
-            },
-            {
-                "id": "mcq_2",
-                "question": "What is the key formula mentioned?",
-                "options": {"a": "E = mc²", "b": "F = ma", "c": "V = IR", "d": "PV = nRT"},
-                "correct_answer": "b",
-                "explanation": "The document emphasizes this formula for...",
-                "difficulty": "easy"
-            }
-        ],
-        "created_at": datetime.utcnow().isoformat(),
     }
-    
-    notes_db[note_id] = note
-    return note
+    return _stream_note(current_user, note_fields, load_content, cleanup=lambda: remove_spool(path))
 
 
 @router.get("/{note_id}", response_model=NoteResponse)
@@ -211,7 +389,7 @@ async def get_note(
     current_user: dict = Depends(get_current_user)
 ):
     """Get a specific note."""
-    note = notes_db.get(note_id)
+    note = await storage.notes.get(note_id)
     if not note or note["user_id"] != current_user["id"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -226,14 +404,15 @@ async def delete_note(
     current_user: dict = Depends(get_current_user)
 ):
     """Delete a note."""
-    note = notes_db.get(note_id)
+    note = await storage.notes.get(note_id)
     if not note or note["user_id"] != current_user["id"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Note not found"
         )
     
-    del notes_db[note_id]
+    await storage.notes.delete(note_id)
+    await remove_cards(current_user["id"], note_id)
     return {"message": "Note deleted successfully"}
 
 
@@ -242,27 +421,32 @@ async def generate_more_mcqs(
     note_id: str,
     count: int = 5,
     difficulty: str = "mixed",
+    subject: str = Query(DEFAULT_SUBJECT, description="Question bank subject for the new MCQs"),
+    background: bool = Query(False, description="Queue as a background job"),
     current_user: dict = Depends(get_current_user)
 ):
-    """Generate additional MCQs from a note."""
-    note = notes_db.get(note_id)
+    """Generate additional MCQs from a note and add them to the question bank."""
+    note = await storage.notes.get(note_id)
     if not note or note["user_id"] != current_user["id"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Note not found"
         )
     
-    # In production, AI would generate MCQs based on note content
-    new_mcqs = []
-    for i in range(count):
-        new_mcqs.append({
-            "id": f"mcq_{len(note['mcqs']) + i + 1}",
-            "question": f"Generated question {i + 1} about the content?",
-            "options": {"a": "Option A", "b": "Option B", "c": "Option C", "d": "Option D"},
-            "correct_answer": ["a", "b", "c", "d"][i % 4],
-            "explanation": "AI-generated explanation for the answer.",
-            "difficulty": difficulty if difficulty != "mixed" else ["easy", "medium", "hard"][i % 3]
-        })
+    async def work(progress: ProgressFn):
+        progress(0.1, "Generating MCQs")
+        material = "\n".join([note["summary"], *note["key_points"]])
+        generated = await generate_mcqs(material, count, difficulty, about=note["title"])
+        
+        new_mcqs = []
+        for i, mcq in enumerate(generated):
+            mcq = {"id": new_id("mcq"), **mcq}
+            new_mcqs.append(mcq)
+            progress((i + 1) / len(generated), f"Generated MCQ {i + 1} of {len(generated)}", mcq)
+        
+        await storage.notes.update(note_id, {"mcqs": note["mcqs"] + new_mcqs})
+        await add_questions(current_user["id"], generated, subject, note["title"], "note", note_id)
+        await add_cards(current_user["id"], "note", note_id, new_mcqs)
+        return {"message": f"Generated {len(new_mcqs)} new MCQs", "mcqs": new_mcqs}
     
-    note["mcqs"].extend(new_mcqs)
-    return {"message": f"Generated {count} new MCQs", "mcqs": new_mcqs}
+    return await run_or_enqueue("notes.generate_mcq", current_user, background, work)
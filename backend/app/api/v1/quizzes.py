@@ -1,18 +1,35 @@
 """
 Quizzes API routes.
 """
-from fastapi import APIRouter, HTTPException, status, Depends
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
+import numpy as np
+
+from app.core.config import settings
+from app.core.ids import new_id
+from app.core.pagination import Page, page_params
 from app.core.security import get_current_user
+from app.db.storage import storage
+from app.services.adaptive import (
+    get_ability,
+    item_index,
+    mastery,
+    record_adaptive_answer,
+    record_quiz_abilities,
+)
+from app.services.grading import answer_key, compile_answer_key
+from app.services.item_bank import add_questions, sample_questions
+from app.services.jobs import ProgressFn, run_or_enqueue
+from app.services.mcq_generation import generate_mcqs
+from app.services.reviews import record_quiz_reviews
+from app.services.rollups import record_quiz_attempt
 
 router = APIRouter()
 
-# In-memory storage
-quizzes_db: dict = {}
-quiz_attempts_db: dict = {}
+MAX_QUIZ_SECONDS = 4 * 60 * 60
 
 
 class QuizQuestion(BaseModel):
@@ -49,6 +66,72 @@ class QuizResponse(BaseModel):
 class QuizAttempt(BaseModel):
     """Quiz attempt submission."""
     answers: dict  # {question_id: selected_answer}
+    time_taken_seconds: Optional[int] = Field(None, ge=0, le=MAX_QUIZ_SECONDS)  # Measured by the client
+
+
+class BatchAttempt(BaseModel):
+    """One offline attempt to grade."""
+    student: str
+    answers: dict  # {question_id: selected_answer}
+
+
+class BatchGradeRequest(BaseModel):
+    """Batch grading request."""
+    attempts: List[BatchAttempt]
+
+
+class BatchGradeResult(BaseModel):
+    """Grade for one offline attempt."""
+    student: str
+    score: int
+    total_questions: int
+    percentage: float
+    correct: List[str]  # IDs of correctly answered questions
+
+
+class AdaptiveQuizCreate(BaseModel):
+    """Adaptive quiz request."""
+    subject: str
+    topic: str
+    max_questions: int = Field(settings.ADAPTIVE_MAX_QUESTIONS, ge=1, le=settings.ADAPTIVE_MAX_QUESTIONS)
+
+
+class AdaptiveQuestion(BaseModel):
+    """Question shown during an adaptive quiz (without its answer)."""
+    id: str
+    question: str
+    options: dict  # {"a": str, "b": str, "c": str, "d": str}
+    difficulty: str
+    topic: str
+
+
+class AdaptiveAnswer(BaseModel):
+    """Answer to the current adaptive quiz question."""
+    question_id: str
+    answer: str
+
+
+class AdaptiveFeedback(BaseModel):
+    """Outcome of the previous adaptive answer."""
+    question_id: str
+    correct: bool
+    correct_answer: str
+    explanation: str
+
+
+class AdaptiveQuizResponse(BaseModel):
+    """Adaptive quiz state."""
+    id: str
+    subject: str
+    topic: str
+    ability: float
+    mastery: float  # Chance of answering a medium question correctly, in percent
+    answered: int
+    correct: int
+    max_questions: int
+    finished: bool
+    question: Optional[AdaptiveQuestion] = None
+    feedback: Optional[AdaptiveFeedback] = None
 
 
 class QuizResult(BaseModel):
@@ -67,65 +150,257 @@ class QuizResult(BaseModel):
 
 @router.get("", response_model=List[dict])
 async def get_quizzes(
+    response: Response,
     subject: Optional[str] = None,
+    page: Page = Depends(page_params),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get available quizzes."""
-    quizzes = list(quizzes_db.values())
+    """Get a page of available quizzes, optionally for one subject.
+    
+    The subject matches in any case, so it is checked per quiz: pages of
+    quizzes are read until the page is full or the quizzes run out.
+    """
+    projection = page.projection(QuizResponse)
+    if projection is not None and subject:
+        projection.append("subject")
     
-    if subject:
-        quizzes = [q for q in quizzes if q["subject"].lower() == subject.lower()]
+    quizzes = []
+    after = page.cursor
+    while len(quizzes) <= page.limit:
+        batch = await storage.quizzes.find(projection=projection, limit=page.limit + 1, after=after)
+        quizzes += [q for q in batch if not subject or q["subject"].lower() == subject.lower()]
+        if len(batch) <= page.limit:
+            break
+        after = batch[-1]["id"]
     
     # Add sample quizzes if empty
-    if not quizzes:
+    if not quizzes and page.cursor is None:
         sample_quizzes = [
             {"id": "quiz_1", "title": "Machine Learning Basics", "subject": "Computer Science", "difficulty": "medium", "num_questions": 10, "time_limit": 15},
             {"id": "quiz_2", "title": "Calculus Chapter 5", "subject": "Mathematics", "difficulty": "hard", "num_questions": 8, "time_limit": 12},
             {"id": "quiz_3", "title": "Thermodynamics", "subject": "Physics", "difficulty": "medium", "num_questions": 12, "time_limit": 18},
         ]
-        return sample_quizzes
+        return page.respond(response, sample_quizzes)
     
-    return quizzes
+    return page.respond(response, quizzes[:page.limit + 1])
 
 
 @router.post("", response_model=QuizResponse)
 async def create_quiz(
     quiz_data: QuizCreate,
+    background: bool = Query(False, description="Queue as a background job"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Create a custom quiz.
+    
+    Questions are drawn from the user's question bank first; only the
+    shortfall is generated (and banked for next time).
+    """
+    async def work(progress: ProgressFn):
+        quiz_id = new_id("quiz")
+        
+        topic = quiz_data.topic or quiz_data.subject
+        progress(0.1, "Drawing questions from the question bank")
+        mcqs = await sample_questions(
+            current_user["id"],
+            quiz_data.subject,
+            quiz_data.topic,
+            quiz_data.difficulty,
+            quiz_data.num_questions,
+        )
+        
+        missing = quiz_data.num_questions - len(mcqs)
+        if missing > 0:
+            progress(0.3, f"Generating {missing} new questions")
+            generated = await generate_mcqs(
+                f"Subject: {quiz_data.subject}\nTopic: {topic}",
+                missing,
+                quiz_data.difficulty,
+                about=quiz_data.subject if not quiz_data.topic else f"{quiz_data.subject} - {quiz_data.topic}",
+            )
+            await add_questions(current_user["id"], generated, quiz_data.subject, topic, "quiz", quiz_id)
+            mcqs += generated
+        
+        questions = []
+        for i, mcq in enumerate(mcqs):
+            question = QuizQuestion(id=f"q_{i + 1}", **{"topic": topic, **mcq})
+            questions.append(question)
+            progress((i + 1) / len(mcqs), f"Added question {i + 1} of {len(mcqs)}", question)
+        
+        quiz = {
+            "id": quiz_id,
+            "title": quiz_data.title,
+            "subject": quiz_data.subject,
+            "questions": [q.model_dump() for q in questions],
+            "difficulty": quiz_data.difficulty,
+            "time_limit_minutes": len(questions) * 2,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        
+        await storage.quizzes.insert(quiz)
+        compile_answer_key(quiz)
+        return quiz
+    
+    return await run_or_enqueue("quizzes.create", current_user, background, work)
+
+
+async def _adaptive_state(session: dict, feedback: Optional[AdaptiveFeedback] = None) -> AdaptiveQuizResponse:
+    question = None
+    if session["current"]:
+        item = await storage.question_bank.get(session["current"])
+        question = AdaptiveQuestion(**item)
+    return AdaptiveQuizResponse(
+        id=session["id"],
+        subject=session["subject"],
+        topic=session["topic"],
+        ability=round(session["ability"], 1),
+        mastery=mastery(session["ability"]),
+        answered=len(session["answers"]),
+        correct=session["correct"],
+        max_questions=session["max_questions"],
+        finished=session["finished"],
+        question=question,
+        feedback=feedback,
+    )
+
+
+async def _record_adaptive_attempt(session: dict) -> None:
+    # Count a finished adaptive quiz in analytics like any other attempt
+    completed_at = datetime.utcnow()
+    started_at = datetime.fromisoformat(session["started_at"])
+    quiz = {"id": session["id"], "subject": session["subject"], "questions": session["questions"]}
+    await record_quiz_attempt(session["user_id"], quiz, {
+        "percentage": round(session["correct"] / len(session["answers"]) * 100, 2),
+        "time_taken_seconds": int((completed_at - started_at).total_seconds()),
+        "answers": session["answers"],
+        "completed_at": completed_at.isoformat(),
+    })
+
+
+async def _get_adaptive_session(session_id: str, user_id: str) -> dict:
+    session = await storage.adaptive_sessions.get(session_id)
+    if not session or session["user_id"] != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Adaptive quiz not found"
+        )
+    return session
+
+
+@router.post("/adaptive", response_model=AdaptiveQuizResponse)
+async def start_adaptive_quiz(
+    quiz_data: AdaptiveQuizCreate,
     current_user: dict = Depends(get_current_user)
 ):
-    """Create a custom quiz (AI-generated questions)."""
-    quiz_id = f"quiz_{len(quizzes_db) + 1}"
-    
-    # Generate sample questions (in production, AI would generate these)
-    questions = []
-    for i in range(quiz_data.num_questions):
-        questions.append(QuizQuestion(
-            id=f"q_{i + 1}",
-            question=f"Sample question {i + 1} about {quiz_data.subject}?",
-            options={
-                "a": f"Option A for question {i + 1}",
-                "b": f"Option B for question {i + 1}",
-                "c": f"Option C for question {i + 1}",
-                "d": f"Option D for question {i + 1}"
-            },
-            correct_answer=["a", "b", "c", "d"][i % 4],
-            explanation=f"Explanation for question {i + 1}",
-            difficulty=quiz_data.difficulty if quiz_data.difficulty != "mixed" else ["easy", "medium", "hard"][i % 3],
-            topic=quiz_data.topic or quiz_data.subject
-        ))
-    
-    quiz = {
-        "id": quiz_id,
-        "title": quiz_data.title,
+    """Start an adaptive quiz on a topic.
+    
+    Each next question is the unanswered banked question whose difficulty
+    rating is closest to the student's current ability estimate.
+    """
+    user_id = current_user["id"]
+    session_id = new_id("adaptive")
+    
+    index = await item_index(user_id, quiz_data.subject, quiz_data.topic)
+    if len(index) < quiz_data.max_questions:
+        generated = await generate_mcqs(
+            f"Subject: {quiz_data.subject}\nTopic: {quiz_data.topic}",
+            quiz_data.max_questions - len(index),
+            about=f"{quiz_data.subject} - {quiz_data.topic}",
+        )
+        # Without an AI provider these are placeholders; bank them anyway so
+        # adaptive quizzes still work
+        await add_questions(
+            user_id, generated, quiz_data.subject, quiz_data.topic, "adaptive", session_id,
+            placeholders=True,
+        )
+    
+    ability, answered = await get_ability(user_id, quiz_data.subject, quiz_data.topic)
+    first = index.nearest(ability)
+    if first is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No questions available for this topic yet"
+        )
+    
+    session = {
+        "id": session_id,
+        "user_id": user_id,
         "subject": quiz_data.subject,
-        "questions": [q.model_dump() for q in questions],
-        "difficulty": quiz_data.difficulty,
-        "time_limit_minutes": quiz_data.num_questions * 2,
-        "created_at": datetime.utcnow().isoformat(),
+        "topic": quiz_data.topic,
+        "max_questions": quiz_data.max_questions,
+        "ability": ability,
+        "prior_answers": answered,
+        "current": first,
+        "answers": {},
+        "questions": [],
+        "correct": 0,
+        "finished": False,
+        "started_at": datetime.utcnow().isoformat(),
     }
+    await storage.adaptive_sessions.insert(session)
+    return await _adaptive_state(session)
+
+
+@router.get("/adaptive/{session_id}", response_model=AdaptiveQuizResponse)
+async def get_adaptive_quiz(
+    session_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get the state of an adaptive quiz, including the current question."""
+    return await _adaptive_state(await _get_adaptive_session(session_id, current_user["id"]))
+
+
+@router.post("/adaptive/{session_id}/answer", response_model=AdaptiveQuizResponse)
+async def answer_adaptive_quiz(
+    session_id: str,
+    answer: AdaptiveAnswer,
+    current_user: dict = Depends(get_current_user)
+):
+    """Answer the current adaptive question and get the next one."""
+    user_id = current_user["id"]
+    session = await _get_adaptive_session(session_id, user_id)
+    if session["finished"]:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Adaptive quiz is already finished"
+        )
+    if answer.question_id != session["current"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only the current question can be answered"
+        )
     
-    quizzes_db[quiz_id] = quiz
-    return quiz
+    item = await storage.question_bank.get(session["current"])
+    correct = answer.answer == item["correct_answer"]
+    answers = {**session["answers"], item["id"]: answer.answer}
+    ability = await record_adaptive_answer(
+        user_id, item, correct, session["ability"], session["prior_answers"] + len(session["answers"])
+    )
+    
+    next_id = None
+    if len(answers) < session["max_questions"]:
+        index = await item_index(user_id, session["subject"], session["topic"])
+        next_id = index.nearest(ability, exclude=answers)
+    
+    session = await storage.adaptive_sessions.update(session_id, {
+        "ability": ability,
+        "current": next_id,
+        "answers": answers,
+        "questions": session["questions"] + [
+            {"id": item["id"], "topic": item["topic"], "correct_answer": item["correct_answer"]}
+        ],
+        "correct": session["correct"] + correct,
+        "finished": next_id is None,
+    })
+    if session["finished"]:
+        await _record_adaptive_attempt(session)
+    
+    return await _adaptive_state(session, AdaptiveFeedback(
+        question_id=item["id"],
+        correct=correct,
+        correct_answer=item["correct_answer"],
+        explanation=item["explanation"],
+    ))
 
 
 @router.get("/{quiz_id}", response_model=QuizResponse)
@@ -134,7 +409,7 @@ async def get_quiz(
     current_user: dict = Depends(get_current_user)
 ):
     """Get a specific quiz."""
-    quiz = quizzes_db.get(quiz_id)
+    quiz = await storage.quizzes.get(quiz_id)
     
     if not quiz:
         # Return sample quiz for demo
@@ -168,18 +443,16 @@ async def submit_quiz(
     current_user: dict = Depends(get_current_user)
 ):
     """Submit quiz answers and get results."""
-    quiz = quizzes_db.get(quiz_id)
+    quiz = await storage.quizzes.get(quiz_id)
     
     # Calculate score
-    correct_count = 0
     correct_answers = {}
     
     if quiz:
-        for question in quiz["questions"]:
-            correct_answers[question["id"]] = question["correct_answer"]
-            if attempt.answers.get(question["id"]) == question["correct_answer"]:
-                correct_count += 1
-        total_questions = len(quiz["questions"])
+        key = answer_key(quiz)
+        correct_answers = key.correct_answers
+        correct_count = key.score(attempt.answers)
+        total_questions = len(key)
     else:
         # Demo result
         total_questions = len(attempt.answers)
@@ -187,7 +460,7 @@ async def submit_quiz(
     
     percentage = (correct_count / total_questions * 100) if total_questions > 0 else 0
     
-    result_id = f"result_{len(quiz_attempts_db) + 1}"
+    result_id = new_id("result")
     result = {
         "id": result_id,
         "quiz_id": quiz_id,
@@ -195,24 +468,67 @@ async def submit_quiz(
         "score": correct_count,
         "total_questions": total_questions,
         "percentage": round(percentage, 2),
-        "time_taken_seconds": 600,  # 10 min demo
+        "time_taken_seconds": attempt.time_taken_seconds or 0,
         "answers": attempt.answers,
         "correct_answers": correct_answers,
         "completed_at": datetime.utcnow().isoformat(),
     }
     
-    quiz_attempts_db[result_id] = result
+    await storage.quiz_attempts.insert(result)
+    # Demo results (unknown quizzes) stay out of analytics
+    if quiz:
+        await record_quiz_attempt(current_user["id"], quiz, result)
+        await record_quiz_abilities(current_user["id"], quiz, attempt.answers)
+        await record_quiz_reviews(current_user["id"], quiz, attempt.answers)
     return result
 
 
+@router.post("/{quiz_id}/grade-batch", response_model=List[BatchGradeResult])
+async def grade_quiz_batch(
+    quiz_id: str,
+    batch: BatchGradeRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Grade many offline attempts in one call.
+    
+    Results are returned in request order and are not stored.
+    """
+    quiz = await storage.quizzes.get(quiz_id)
+    if not quiz:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Quiz not found"
+        )
+    
+    key = answer_key(quiz)
+    correct = key.grade_many([a.answers for a in batch.attempts])
+    scores = correct.sum(axis=1)
+    total_questions = len(key)
+    return [
+        BatchGradeResult(
+            student=attempt.student,
+            score=int(score),
+            total_questions=total_questions,
+            percentage=round(score / total_questions * 100, 2) if total_questions else 0,
+            correct=[key.question_ids[i] for i in np.flatnonzero(row)],
+        )
+        for attempt, score, row in zip(batch.attempts, scores, correct)
+    ]
+
+
 @router.get("/{quiz_id}/results", response_model=List[QuizResult])
 async def get_quiz_results(
     quiz_id: str,
+    response: Response,
+    page: Page = Depends(page_params),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get all results for a quiz."""
-    results = [
-        r for r in quiz_attempts_db.values()
-        if r["quiz_id"] == quiz_id and r["user_id"] == current_user["id"]
-    ]
-    return results
+    """Get a page of results for a quiz."""
+    results = await storage.quiz_attempts.find(
+        projection=page.projection(QuizResult),
+        limit=page.limit + 1,
+        after=page.cursor,
+        quiz_id=quiz_id,
+        user_id=current_user["id"],
+    )
+    return page.respond(response, results)
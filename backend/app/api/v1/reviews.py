@@ -0,0 +1,78 @@
+"""
+Reviews API routes.
+"""
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+from app.core.security import get_current_user
+from app.db.storage import storage
+from app.services.reviews import CORRECT_GRADE, WRONG_GRADE, due_cards, review_card
+
+router = APIRouter()
+
+
+class ReviewCard(BaseModel):
+    """Review card shown to the student (without its answer)."""
+    id: str
+    source: str  # quiz, note
+    source_id: str
+    question: str
+    options: dict  # {"a": str, "b": str, "c": str, "d": str}
+    repetitions: int
+    interval_days: int
+    due_at: str
+
+
+class ReviewSubmit(BaseModel):
+    """Review of a card: an answer to grade, or a self-assessed grade."""
+    answer: Optional[str] = None
+    grade: Optional[int] = Field(None, ge=0, le=5)  # SM-2 recall quality
+
+
+class ReviewResult(BaseModel):
+    """Outcome of a review and the card's new schedule."""
+    id: str
+    correct: Optional[bool]
+    correct_answer: str
+    explanation: str
+    grade: int
+    repetitions: int
+    interval_days: int
+    ease: float
+    due_at: str
+
+
+@router.get("/due", response_model=List[ReviewCard])
+async def get_due_reviews(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get cards due for review, most overdue first."""
+    return await due_cards(current_user["id"], datetime.utcnow(), limit)
+
+
+@router.post("/{card_id}", response_model=ReviewResult)
+async def submit_review(
+    card_id: str,
+    review: ReviewSubmit,
+    current_user: dict = Depends(get_current_user)
+):
+    """Review a card and schedule its next review."""
+    card = await storage.review_cards.get(card_id)
+    if not card or card["user_id"] != current_user["id"]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Review card not found"
+        )
+    if review.answer is None and review.grade is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide an answer or a grade"
+        )
+    
+    correct = review.answer == card["correct_answer"] if review.answer is not None else None
+    grade = review.grade if review.grade is not None else CORRECT_GRADE if correct else WRONG_GRADE
+    card = await review_card(card, grade)
+    return ReviewResult(grade=grade, correct=correct, **card)
@@ -1,18 +1,22 @@
 """
 Study Plans API routes.
 """
-from fastapi import APIRouter, HTTPException, status, Depends
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime, date
 
+from app.core.config import settings
+from app.core.ids import new_id
+from app.core.pagination import Page, page_params
 from app.core.security import get_current_user
+from app.db.storage import storage
+from app.services.ai_client import ai_client
+from app.services.jobs import ProgressFn, run_or_enqueue
+from app.services.study_planner import build_schedule, measured_weakness, plan_topics
 
 router = APIRouter()
 
-# In-memory storage
-study_plans_db: dict = {}
-
 
 class Subject(BaseModel):
     """Subject schema."""
@@ -20,6 +24,7 @@ class Subject(BaseModel):
     topics: List[str]
     priority: str = "medium"
     hours_allocated: float = 0
+    deadline: Optional[str] = None  # Exam date (YYYY-MM-DD); defaults to the plan's end
 
 
 class ScheduleItem(BaseModel):
@@ -45,7 +50,7 @@ class StudyPlanCreate(BaseModel):
     subjects: List[Subject]
     start_date: str
     end_date: str
-    study_hours_per_day: float = 4
+    study_hours_per_day: float = Field(4, gt=0, le=24)
 
 
 class StudyPlanResponse(BaseModel):
@@ -61,61 +66,113 @@ class StudyPlanResponse(BaseModel):
     created_at: str
 
 
+class StudyPlanSummary(BaseModel):
+    """Lightweight study plan schema for list views (no daily schedule)."""
+    id: str
+    user_id: str
+    title: str
+    start_date: str
+    end_date: str
+    is_active: bool
+    created_at: str
+
+
 @router.get("", response_model=List[StudyPlanResponse])
-async def get_study_plans(current_user: dict = Depends(get_current_user)):
-    """Get all study plans for current user."""
-    user_plans = [
-        plan for plan in study_plans_db.values() 
-        if plan["user_id"] == current_user["id"]
-    ]
-    return user_plans
+async def get_study_plans(
+    response: Response,
+    page: Page = Depends(page_params),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a page of study plans for current user."""
+    plans = await storage.study_plans.find(
+        projection=page.projection(StudyPlanResponse),
+        limit=page.limit + 1,
+        after=page.cursor,
+        user_id=current_user["id"],
+    )
+    return page.respond(response, plans)
+
+
+@router.get("/summary", response_model=List[StudyPlanSummary])
+async def get_study_plan_summaries(
+    response: Response,
+    page: Page = Depends(page_params),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a page of study plan summaries, without the daily schedule."""
+    plans = await storage.study_plans.find(
+        projection=page.projection(StudyPlanSummary) or list(StudyPlanSummary.model_fields),
+        limit=page.limit + 1,
+        after=page.cursor,
+        user_id=current_user["id"],
+    )
+    return page.respond(response, plans)
 
 
 @router.post("", response_model=StudyPlanResponse)
 async def create_study_plan(
     plan_data: StudyPlanCreate,
+    background: bool = Query(False, description="Queue as a background job"),
     current_user: dict = Depends(get_current_user)
 ):
-    """Create a new study plan (AI-generated schedule)."""
-    plan_id = f"plan_{len(study_plans_db) + 1}"
+    """Create a new study plan.
     
-    # Generate sample daily schedule (in production, this would use AI)
-    daily_schedule = []
-    start = datetime.strptime(plan_data.start_date, "%Y-%m-%d")
-    end = datetime.strptime(plan_data.end_date, "%Y-%m-%d")
+    Daily study time is split across subjects and topics by priority,
+    deadline and measured weakness (quiz accuracy).
+    """
+    try:
+        start = date.fromisoformat(plan_data.start_date)
+        end = date.fromisoformat(plan_data.end_date)
+        for subject in plan_data.subjects:
+            if subject.deadline:
+                date.fromisoformat(subject.deadline)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Dates must be in YYYY-MM-DD format"
+        )
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date must not be after end_date"
+        )
+    if (end - start).days >= settings.STUDY_PLAN_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Study plans can span at most {settings.STUDY_PLAN_MAX_DAYS} days"
+        )
     
-    current_date = start
-    while current_date <= end:
-        schedule_items = []
-        for subject in plan_data.subjects[:3]:  # Max 3 subjects per day
-            schedule_items.append(ScheduleItem(
-                subject=subject.name,
-                topic=subject.topics[0] if subject.topics else "General Review",
-                duration_minutes=60,
-                priority=subject.priority,
-            ))
+    async def work(progress: ProgressFn):
+        plan_id = new_id("plan")
         
-        daily_schedule.append(DailySchedule(
-            date=current_date.strftime("%Y-%m-%d"),
-            subjects=schedule_items,
-            total_hours=len(schedule_items),
-        ))
-        current_date = datetime(current_date.year, current_date.month, current_date.day + 1) if current_date.day < 28 else datetime(current_date.year, current_date.month + 1, 1)
-    
-    plan = {
-        "id": plan_id,
-        "user_id": current_user["id"],
-        "title": plan_data.title,
-        "subjects": [s.model_dump() for s in plan_data.subjects],
-        "start_date": plan_data.start_date,
-        "end_date": plan_data.end_date,
-        "daily_schedule": [d.model_dump() for d in daily_schedule[:30]],  # Limit to 30 days
-        "is_active": True,
-        "created_at": datetime.utcnow().isoformat(),
-    }
+        progress(0.1, "Measuring weak areas")
+        weakness = await measured_weakness(current_user["id"])
+        subjects = [s.model_dump() for s in plan_data.subjects]
+        topics = plan_topics(subjects, end, weakness)
+        
+        progress(0.5, "Scheduling")
+        daily_schedule = build_schedule(topics, start, end, round(plan_data.study_hours_per_day * 60))
+        
+        for subject in subjects:
+            minutes = sum(t.minutes for t in topics if t.subject == subject["name"])
+            subject["hours_allocated"] = round(minutes / 60, 2)
+        
+        plan = {
+            "id": plan_id,
+            "user_id": current_user["id"],
+            "title": plan_data.title,
+            "subjects": subjects,
+            "start_date": plan_data.start_date,
+            "end_date": plan_data.end_date,
+            "daily_schedule": daily_schedule,
+            "is_active": True,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        
+        await storage.study_plans.insert(plan)
+        return plan
     
-    study_plans_db[plan_id] = plan
-    return plan
+    return await run_or_enqueue("study_plans.create", current_user, background, work)
 
 
 @router.get("/{plan_id}", response_model=StudyPlanResponse)
@@ -124,7 +181,7 @@ async def get_study_plan(
     current_user: dict = Depends(get_current_user)
 ):
     """Get a specific study plan."""
-    plan = study_plans_db.get(plan_id)
+    plan = await storage.study_plans.get(plan_id)
     if not plan or plan["user_id"] != current_user["id"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -139,36 +196,62 @@ async def delete_study_plan(
     current_user: dict = Depends(get_current_user)
 ):
     """Delete a study plan."""
-    plan = study_plans_db.get(plan_id)
+    plan = await storage.study_plans.get(plan_id)
     if not plan or plan["user_id"] != current_user["id"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Study plan not found"
         )
     
-    del study_plans_db[plan_id]
+    await storage.study_plans.delete(plan_id)
     return {"message": "Study plan deleted successfully"}
 
 
 @router.post("/{plan_id}/adapt")
 async def adapt_study_plan(
     plan_id: str,
+    background: bool = Query(False, description="Queue as a background job"),
     current_user: dict = Depends(get_current_user)
 ):
     """AI-adapt study plan based on performance."""
-    plan = study_plans_db.get(plan_id)
+    plan = await storage.study_plans.get(plan_id)
     if not plan or plan["user_id"] != current_user["id"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Study plan not found"
         )
     
-    # In production, this would use AI to analyze performance and adapt
-    return {
-        "message": "Study plan adapted based on your performance",
-        "adaptations": [
-            "Increased focus on Mathematics - Integration",
-            "Added extra revision sessions for Physics",
-            "Optimized schedule for better retention"
-        ]
-    }
+    async def work(progress: ProgressFn):
+        if not ai_client.configured:
+            return {
+                "message": "Study plan adapted based on your performance",
+                "adaptations": [
+                    "Increased focus on Mathematics - Integration",
+                    "Added extra revision sessions for Physics",
+                    "Optimized schedule for better retention"
+                ]
+            }
+        
+        progress(0.1, "Analyzing performance")
+        attempts = await storage.quiz_attempts.find(
+            projection=["quiz_id", "percentage", "completed_at"],
+            user_id=current_user["id"],
+        )
+        subjects = "\n".join(
+            f"- {s['name']} ({s['priority']} priority): {', '.join(s['topics'])}" for s in plan["subjects"]
+        )
+        scores = "\n".join(f"- {a['completed_at'][:10]}: {a['percentage']:.0f}%" for a in attempts[-20:])
+        data = await ai_client.generate_json(
+            f"A student is following the study plan \"{plan['title']}\" from {plan['start_date']} "
+            f"to {plan['end_date']} with these subjects:\n{subjects}\n\n"
+            f"Recent quiz scores:\n{scores or '- none yet'}\n\n"
+            "Suggest up to 5 concrete adaptations to the plan. "
+            "Return {\"adaptations\": [string]}.",
+            system="You are a study coach. Respond with JSON only.",
+        )
+        return {
+            "message": "Study plan adapted based on your performance",
+            "adaptations": [str(a) for a in data.get("adaptations", [])][:5]
+        }
+    
+    return await run_or_enqueue("study_plans.adapt", current_user, background, work)
@@ -1,18 +1,19 @@
 """
 Tasks API routes.
 """
-from fastapi import APIRouter, HTTPException, status, Depends
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, status, Depends, Response
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Literal, Optional
 from datetime import datetime
 
+from app.core.ids import new_id
+from app.core.pagination import Page, page_params
 from app.core.security import get_current_user
+from app.db.storage import storage
+from app.services.rollups import record_task_completion
 
 router = APIRouter()
 
-# In-memory storage
-tasks_db: dict = {}
-
 
 class TaskCreate(BaseModel):
     """Task creation request."""
@@ -49,25 +50,58 @@ class TaskResponse(BaseModel):
     created_at: str
 
 
+class TaskBatchOperation(BaseModel):
+    """Single operation in a batch request."""
+    op: Literal["create", "update", "complete", "delete"]
+    task_id: Optional[str] = None  # required for update, complete, delete
+    data: Optional[dict] = None  # TaskCreate / TaskUpdate fields
+
+
+class TaskBatchRequest(BaseModel):
+    """Batch of task operations applied in order."""
+    operations: List[TaskBatchOperation] = Field(..., min_length=1, max_length=500)
+
+
+class TaskBatchResult(BaseModel):
+    """Outcome of a single batch operation."""
+    index: int
+    op: str
+    ok: bool
+    task_id: Optional[str] = None
+    task: Optional[TaskResponse] = None
+    error: Optional[str] = None
+
+
+class TaskBatchResponse(BaseModel):
+    """Batch response with per-operation results."""
+    results: List[TaskBatchResult]
+    succeeded: int
+    failed: int
+
+
 @router.get("", response_model=List[TaskResponse])
 async def get_tasks(
+    response: Response,
     status: Optional[str] = None,
     priority: Optional[str] = None,
+    page: Page = Depends(page_params),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get all tasks for current user."""
-    user_tasks = [
-        task for task in tasks_db.values()
-        if task["user_id"] == current_user["id"]
-    ]
-    
+    """Get a page of tasks for current user."""
+    filters = {"user_id": current_user["id"]}
     if status:
-        user_tasks = [t for t in user_tasks if t["status"] == status]
+        filters["status"] = status
     if priority:
-        user_tasks = [t for t in user_tasks if t["priority"] == priority]
+        filters["priority"] = priority
+    user_tasks = await storage.tasks.find(
+        projection=page.projection(TaskResponse),
+        limit=page.limit + 1,
+        after=page.cursor,
+        **filters,
+    )
     
     # Return demo tasks if empty
-    if not user_tasks:
+    if not user_tasks and page.cursor is None:
         demo_tasks = [
             TaskResponse(
                 id="task_1",
@@ -96,9 +130,9 @@ async def get_tasks(
                 created_at=datetime.utcnow().isoformat()
             ),
         ]
-        return demo_tasks
+        return page.respond(response, [t.model_dump() for t in demo_tasks])
     
-    return user_tasks
+    return page.respond(response, user_tasks)
 
 
 @router.post("", response_model=TaskResponse)
@@ -107,7 +141,7 @@ async def create_task(
     current_user: dict = Depends(get_current_user)
 ):
     """Create a new task."""
-    task_id = f"task_{len(tasks_db) + 1}"
+    task_id = new_id("task")
     
     task = {
         "id": task_id,
@@ -123,17 +157,62 @@ async def create_task(
         "created_at": datetime.utcnow().isoformat(),
     }
     
-    tasks_db[task_id] = task
+    await storage.tasks.insert(task)
     return task
 
 
+@router.post("/batch", response_model=TaskBatchResponse)
+async def batch_tasks(
+    batch: TaskBatchRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Apply many create/update/complete/delete operations in one request.
+    
+    Operations run in order with a single auth check; a failing operation is
+    reported in its result and does not abort the rest of the batch.
+    """
+    results = []
+    for index, operation in enumerate(batch.operations):
+        result = {"index": index, "op": operation.op, "ok": True, "task_id": operation.task_id}
+        try:
+            task = None
+            if operation.op == "create":
+                task = await create_task(TaskCreate(**(operation.data or {})), current_user)
+                result["task_id"] = task["id"]
+            elif not operation.task_id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="task_id is required"
+                )
+            elif operation.op == "update":
+                task_data = TaskUpdate(**(operation.data or {}))
+                task = await update_task(operation.task_id, task_data, current_user)
+            elif operation.op == "complete":
+                task = await complete_task(operation.task_id, current_user)
+            else:
+                await delete_task(operation.task_id, current_user)
+            # Snapshot now so later operations on the same task don't leak in
+            if task is not None:
+                result["task"] = TaskResponse(**task)
+        except HTTPException as e:
+            result.update(ok=False, error=e.detail)
+        except ValidationError as e:
+            result.update(ok=False, error="; ".join(
+                f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+            ))
+        results.append(result)
+    
+    succeeded = sum(1 for r in results if r["ok"])
+    return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+
+
 @router.get("/{task_id}", response_model=TaskResponse)
 async def get_task(
     task_id: str,
     current_user: dict = Depends(get_current_user)
 ):
     """Get a specific task."""
-    task = tasks_db.get(task_id)
+    task = await storage.tasks.get(task_id)
     if not task or task["user_id"] != current_user["id"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -149,7 +228,7 @@ async def update_task(
     current_user: dict = Depends(get_current_user)
 ):
     """Update a task."""
-    task = tasks_db.get(task_id)
+    task = await storage.tasks.get(task_id)
     if not task or task["user_id"] != current_user["id"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -157,10 +236,19 @@ async def update_task(
         )
     
     update_data = task_data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        if value is not None:
-            task[key] = value
+    changes = {key: value for key, value in update_data.items() if value is not None}
+    
+    was_completed = task["status"] == "completed"
+    if changes.get("status", task["status"]) == "completed" and not was_completed:
+        changes["completed_at"] = datetime.utcnow().isoformat()
+    elif "status" in changes and changes["status"] != "completed" and was_completed:
+        # Reopened: take it back out of the analytics rollups
+        await record_task_completion(current_user["id"], task, delta=-1)
+        changes["completed_at"] = None
     
+    task = await storage.tasks.update(task_id, changes)
+    if "completed_at" in changes and changes["completed_at"]:
+        await record_task_completion(current_user["id"], task)
     return task
 
 
@@ -170,16 +258,21 @@ async def complete_task(
     current_user: dict = Depends(get_current_user)
 ):
     """Mark a task as completed."""
-    task = tasks_db.get(task_id)
+    task = await storage.tasks.get(task_id)
     if not task or task["user_id"] != current_user["id"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
     
-    task["status"] = "completed"
-    task["completed_at"] = datetime.utcnow().isoformat()
+    if task["status"] == "completed":
+        return task
     
+    task = await storage.tasks.update(task_id, {
+        "status": "completed",
+        "completed_at": datetime.utcnow().isoformat(),
+    })
+    await record_task_completion(current_user["id"], task)
     return task
 
 
@@ -189,12 +282,12 @@ async def delete_task(
     current_user: dict = Depends(get_current_user)
 ):
     """Delete a task."""
-    task = tasks_db.get(task_id)
+    task = await storage.tasks.get(task_id)
     if not task or task["user_id"] != current_user["id"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
     
-    del tasks_db[task_id]
+    await storage.tasks.delete(task_id)
     return {"message": "Task deleted successfully"}
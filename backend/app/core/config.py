@@ -18,6 +18,9 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     ALGORITHM: str = "HS256"
+    BCRYPT_ROUNDS: int = 12  # Changing this rehashes passwords on next login
+    PASSWORD_HASH_WORKERS: int = 4
+    TOKEN_CACHE_SIZE: int = 10000  # Verified JWTs kept in memory
     
     # CORS
     CORS_ORIGINS: List[str] = [
@@ -26,9 +29,13 @@ class Settings(BaseSettings):
         "http://127.0.0.1:5173",
     ]
     
+    # Storage ("memory" or "mongodb")
+    STORAGE_BACKEND: str = "memory"
+    
     # MongoDB
     MONGODB_URL: str = "mongodb://localhost:27017"
     MONGODB_DB_NAME: str = "studyos"
+    MONGODB_MAX_POOL_SIZE: int = 100
     
     # Firebase (optional - for production auth)
     FIREBASE_PROJECT_ID: str = ""
@@ -38,11 +45,68 @@ class Settings(BaseSettings):
     # AI Configuration
     GEMINI_API_KEY: str = ""
     OPENAI_API_KEY: str = ""
+    GEMINI_MODEL: str = "gemini-1.5-flash"
+    OPENAI_MODEL: str = "gpt-4o-mini"
+    GEMINI_BASE_URL: str = "https://generativelanguage.googleapis.com"
+    OPENAI_BASE_URL: str = "https://api.openai.com"
+    AI_PRIMARY_PROVIDER: str = "gemini"  # gemini, openai
+    AI_REQUESTS_PER_MINUTE: int = 60  # per provider
+    AI_BURST_SECONDS: float = 5  # bucket capacity, in seconds of rate
+    AI_MAX_CONCURRENCY: int = 8  # per provider
+    AI_TIMEOUT_SECONDS: float = 60
+    AI_MAX_RETRIES: int = 3
+    AI_BACKOFF_BASE_SECONDS: float = 0.5
+    AI_BACKOFF_MAX_SECONDS: float = 8
+    AI_HEDGE_DELAY_SECONDS: float = 5
+    
+    # Generated notes cache
+    NOTE_CACHE_SIZE: int = 1024
+    NOTE_CACHE_TTL_SECONDS: int = 24 * 60 * 60
+    
+    # Map-reduce summarization (token budgets are estimates)
+    CHUNK_MAX_TOKENS: int = 2000
+    CHUNK_OVERLAP_TOKENS: int = 200
+    CHUNK_CACHE_SIZE: int = 4096
+    SUMMARY_CONCURRENCY: int = 4
+    
+    # Analytics
+    WEEKLY_STUDY_GOAL_HOURS: float = 20
+    ANALYTICS_CACHE_SIZE: int = 256  # Users whose event columns stay loaded
+    ANALYTICS_CACHE_TTL_SECONDS: int = 60 * 60
+    SKETCH_K: int = 200  # Percentile sketch accuracy (rank error ~1/k)
+    SKETCH_SNAPSHOT_PATH: str = "data/cohort_sketches.json"  # Empty keeps sketches in memory only
+    SKETCH_SYNC_SECONDS: float = 60
+    DASHBOARD_SECTION_TIMEOUT_SECONDS: float = 5  # Slower sections are reported in ``errors``
+    
+    # Study plans
+    STUDY_PLAN_MAX_DAYS: int = 366
+    
+    # Quiz grading
+    ANSWER_KEY_CACHE_SIZE: int = 4096  # Compiled answer keys kept in memory
+    ANSWER_KEY_CACHE_TTL_SECONDS: int = 24 * 60 * 60
+    ADAPTIVE_MAX_QUESTIONS: int = 10
+    ADAPTIVE_INDEX_CACHE_SIZE: int = 1024  # (user, topic) difficulty indexes kept in memory
+    ADAPTIVE_INDEX_CACHE_TTL_SECONDS: int = 60 * 60
+    
+    # Background jobs
+    JOB_CONCURRENCY: int = 4
+    JOB_QUEUE_SIZE: int = 100  # Jobs waiting for a slot; more are rejected with 503
+    JOB_RESULT_TTL_SECONDS: int = 60 * 60
     
     # File Storage
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_FILE_TYPES: List[str] = ["application/pdf"]
     
+    # PDF extraction (PDF_WORKERS=0 uses one process per CPU)
+    PDF_WORKERS: int = 0
+    PDF_PAGES_PER_TASK: int = 8
+    PDF_TEXT_CACHE_SIZE: int = 128  # Extracted texts kept in memory, keyed by upload hash
+    
+    # YouTube transcripts, cached on disk by video ID and language
+    TRANSCRIPT_CACHE_DIR: str = "data/transcripts"
+    TRANSCRIPT_LANGUAGES: List[str] = ["en"]
+    TRANSCRIPT_WORKERS: int = 4
+    
     class Config:
         env_file = ".env"
         extra = "ignore"
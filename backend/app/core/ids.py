@@ -0,0 +1,55 @@
+"""
+Time-ordered unique ID generation.
+"""
+import itertools
+import os
+import time
+
+# Crockford base32 (no I, L, O, U); ascending in ASCII so encoded IDs sort correctly
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+# Random per-process node id so concurrent workers never produce the same ID
+_NODE = int.from_bytes(os.urandom(4), "big")
+
+# itertools.count is advanced atomically under the GIL, so no lock is needed
+_sequence = itertools.count()
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, rem = divmod(value, 32)
+        chars.append(_ALPHABET[rem])
+    return "".join(reversed(chars))
+
+
+def new_id(prefix: str) -> str:
+    """Generate a unique, time-ordered ID such as ``task_01J9Z3...``.
+
+    The 26-character ULID-style body packs a 48-bit millisecond timestamp,
+    a 32-bit per-process node id and a 48-bit sequence number, so IDs sort
+    lexicographically by creation time and never collide across workers.
+    """
+    millis = time.time_ns() // 1_000_000
+    sequence = next(_sequence) & 0xFFFF_FFFF_FFFF
+    value = (millis << 80) | (_NODE << 48) | sequence
+    return f"{prefix}_{_encode(value, 26)}"
+
+
+def id_floor(prefix: str, timestamp: float) -> str:
+    """Return an ID that sorts before every ``new_id(prefix)`` made at or after ``timestamp``.
+
+    Use it as a ``find(after=...)`` cursor to scan a time range of documents.
+    """
+    millis = int(timestamp * 1000)
+    return f"{prefix}_{_encode(max((millis << 80) - 1, 0), 26)}"
+
+
+def id_timestamp(doc_id: str) -> float:
+    """Return the creation time (Unix seconds) encoded in an ID from ``new_id``."""
+    body = doc_id.rsplit("_", 1)[-1]
+    value = 0
+    for char in body[:10]:
+        value = value * 32 + _ALPHABET.index(char)
+    # 26 chars carry 130 bits, so the first 10 are 2 zero pad bits + the timestamp
+    return value / 1000
@@ -0,0 +1,69 @@
+"""
+Cursor pagination and field projection for list endpoints.
+"""
+from typing import List, Optional, Type
+
+from fastapi import HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class Page:
+    """Pagination parameters parsed from the query string.
+
+    Results are ordered by id, and ids are time-ordered, so the cursor is
+    simply the id of the last item on the previous page.
+    """
+
+    def __init__(self, limit: int, cursor: Optional[str], fields: Optional[List[str]]):
+        self.limit = limit
+        self.cursor = cursor
+        self.fields = fields
+
+    def projection(self, model: Type[BaseModel]) -> Optional[List[str]]:
+        """Validate requested fields against a response model.
+
+        Returns ``None`` when no projection was requested. ``id`` is always
+        included so clients can keep paginating.
+        """
+        if self.fields is None:
+            return None
+        unknown = [f for f in self.fields if f not in model.model_fields]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(unknown)}"
+            )
+        return ["id", *(f for f in self.fields if f != "id")]
+
+    def respond(self, response: Response, docs: List[dict]):
+        """Build the page response from up to ``limit + 1`` fetched documents.
+
+        The extra document only signals that another page exists; its
+        presence sets the ``X-Next-Cursor`` header.
+        """
+        items = docs[:self.limit]
+        headers = {}
+        if len(docs) > self.limit:
+            headers[NEXT_CURSOR_HEADER] = items[-1]["id"]
+
+        if self.fields is None:
+            response.headers.update(headers)
+            return items
+
+        # Projected items don't satisfy the full response model, so bypass it
+        fields = ["id", *self.fields]
+        projected = [{f: doc[f] for f in fields if f in doc} for doc in items]
+        return JSONResponse(content=projected, headers=headers)
+
+
+def page_params(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Id of the last item on the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+) -> Page:
+    """Dependency parsing ``limit``, ``cursor`` and ``fields`` query parameters."""
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    return Page(limit=limit, cursor=cursor, fields=field_list)
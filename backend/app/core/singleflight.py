@@ -0,0 +1,58 @@
+"""
+Single-flight request coalescing.
+
+Concurrent calls for the same key share one in-flight task instead of each
+doing the same work. The task is shielded, so a caller that goes away (e.g. a
+client disconnect) does not cancel the work for the callers still waiting.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Deduplicates concurrent async work by key (per-process)."""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Task] = {}
+        self._leaders = 0
+        self._coalesced = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> "asyncio.Future[T]":
+        """Run ``fn()`` for ``key``, or join the run already in flight.
+
+        The flight is registered before this returns, so callers can check
+        ``key in flights`` first to learn whether they lead it. Await the
+        returned future for the result; every caller receives the same result
+        object (or exception), and cancelling it leaves the flight running.
+        """
+        task = self._flights.get(key)
+        if task is None:
+            self._leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._flights[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self._coalesced += 1
+        return asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every caller went away
+            task.exception()
+
+    def stats(self) -> dict:
+        """Return in-flight, started and coalesced counters."""
+        total = self._leaders + self._coalesced
+        return {
+            "in_flight": len(self._flights),
+            "started": self._leaders,
+            "coalesced": self._coalesced,
+            "coalesced_rate": self._coalesced / total if total else 0.0,
+        }
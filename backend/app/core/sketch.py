@@ -0,0 +1,199 @@
+"""
+Mergeable cohort summaries: a streaming quantile sketch (KLL) and a
+histogram whose values can be replaced.
+"""
+import math
+import random
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Dict, List, Optional
+
+
+class KLLSketch:
+    """KLL quantile sketch: approximate ranks in O(k) memory, mergeable.
+
+    Values enter level 0. A full level is sorted and every other value
+    (random offset) is promoted to the next level with double weight, so the
+    sketch stays small while rank error stays around ``1/k``. Two sketches
+    merge by concatenating levels and compacting, which lets workers combine
+    their partial sketches. Rank lookups bisect a cached CDF that is only
+    rebuilt after an update.
+    """
+
+    def __init__(self, k: int = 200, c: float = 2 / 3):
+        self.k = k
+        self.c = c
+        self.levels: List[List[float]] = [[]]
+        self.count = 0
+        self.total = 0.0
+        self._cdf: Optional[tuple] = None
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * self.c ** depth))
+
+    def _size(self) -> int:
+        return sum(len(items) for items in self.levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def update(self, value: float) -> None:
+        """Add one value."""
+        self.levels[0].append(value)
+        self.count += 1
+        self.total += value
+        self._cdf = None
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        """Fold another sketch into this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.count += other.count
+        self.total += other.total
+        self._cdf = None
+        self._compress()
+
+    def _compress(self) -> None:
+        while self._size() >= self._max_size():
+            for level, items in enumerate(self.levels):
+                if len(items) >= self._capacity(level):
+                    if level + 1 == len(self.levels):
+                        self.levels.append([])
+                    items.sort()
+                    # An odd item out stays behind at this level
+                    keep = [items.pop()] if len(items) % 2 else []
+                    self.levels[level + 1].extend(items[random.getrandbits(1)::2])
+                    self.levels[level] = keep
+                    break
+
+    def _build_cdf(self) -> tuple:
+        if self._cdf is None:
+            weighted = sorted(
+                (value, 1 << level) for level, items in enumerate(self.levels) for value in items
+            )
+            values = [value for value, _ in weighted]
+            cumulative = list(accumulate(weight for _, weight in weighted))
+            self._cdf = (values, cumulative)
+        return self._cdf
+
+    def rank(self, value: float, inclusive: bool = True) -> float:
+        """Approximate fraction of values ``<= value`` (``< value`` if not
+        ``inclusive``; 0.0 when empty)."""
+        values, cumulative = self._build_cdf()
+        i = (bisect_right if inclusive else bisect_left)(values, value)
+        return cumulative[i - 1] / cumulative[-1] if i else 0.0
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate value at quantile ``q`` in ``[0, 1]`` (None when empty)."""
+        values, cumulative = self._build_cdf()
+        if not values:
+            return None
+        target = q * cumulative[-1]
+        i = bisect_right(cumulative, target)
+        return values[min(i, len(values) - 1)]
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Exact mean of every value added."""
+        return self.total / self.count if self.count else None
+
+    def to_dict(self) -> dict:
+        """Serialize for snapshots."""
+        return {"k": self.k, "c": self.c, "levels": self.levels, "count": self.count, "total": self.total}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "KLLSketch":
+        """Restore a sketch serialized with ``to_dict``."""
+        sketch = cls(k=data["k"], c=data["c"])
+        sketch.levels = [list(items) for items in data["levels"]] or [[]]
+        sketch.count = data["count"]
+        sketch.total = data["total"]
+        return sketch
+
+
+class ScoreHistogram:
+    """Fixed-width histogram over ``[low, high]`` whose values can be replaced.
+
+    Counts are signed, so a value is withdrawn by adding it with weight -1:
+    a student whose average moves from 70 to 72 adds ``(70, -1)`` and
+    ``(72, +1)``. Histograms merge by adding counts, which lets workers
+    publish such deltas. Ranks are exact to one bin width.
+    """
+
+    def __init__(self, low: float = 0.0, high: float = 100.0, bins: int = 1000):
+        self.low = low
+        self.high = high
+        self.bins = bins
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self._cdf: Optional[tuple] = None
+
+    def _bin(self, value: float) -> int:
+        position = (value - self.low) / (self.high - self.low) * self.bins
+        return min(self.bins - 1, max(0, int(position)))
+
+    def add(self, value: float, weight: int = 1) -> None:
+        """Add ``weight`` copies of a value (negative to withdraw it)."""
+        i = self._bin(value)
+        self.counts[i] = self.counts.get(i, 0) + weight
+        if not self.counts[i]:
+            del self.counts[i]
+        self.count += weight
+        self.total += weight * value
+        self._cdf = None
+
+    def merge(self, other: "ScoreHistogram") -> None:
+        """Fold another histogram (or delta) into this one."""
+        for i, weight in other.counts.items():
+            self.counts[i] = self.counts.get(i, 0) + weight
+            if not self.counts[i]:
+                del self.counts[i]
+        self.count += other.count
+        self.total += other.total
+        self._cdf = None
+
+    def _build_cdf(self) -> tuple:
+        if self._cdf is None:
+            # A delta published before its base can leave a bin briefly negative
+            bins = sorted(i for i, weight in self.counts.items() if weight > 0)
+            self._cdf = (bins, list(accumulate(self.counts[i] for i in bins)))
+        return self._cdf
+
+    def rank(self, value: float, inclusive: bool = True) -> float:
+        """Fraction of values in bins up to ``value``'s (``inclusive``) or below it."""
+        bins, cumulative = self._build_cdf()
+        if not bins:
+            return 0.0
+        i = (bisect_right if inclusive else bisect_left)(bins, self._bin(value))
+        return cumulative[i - 1] / cumulative[-1] if i else 0.0
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Mean of the current values."""
+        return self.total / self.count if self.count > 0 else None
+
+    def to_dict(self) -> dict:
+        """Serialize for snapshots."""
+        return {
+            "low": self.low,
+            "high": self.high,
+            "bins": self.bins,
+            "counts": {str(i): weight for i, weight in self.counts.items()},
+            "count": self.count,
+            "total": self.total,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScoreHistogram":
+        """Restore a histogram serialized with ``to_dict``."""
+        histogram = cls(low=data["low"], high=data["high"], bins=data["bins"])
+        histogram.counts = {int(i): weight for i, weight in data["counts"].items()}
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        return histogram
@@ -0,0 +1,85 @@
+"""
+Storage interface shared by every repository backend.
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional
+
+
+class DuplicateKeyError(Exception):
+    """A write would give two documents the same value for a unique field."""
+
+    def __init__(self, field: str):
+        super().__init__(f"Duplicate value for unique field '{field}'")
+        self.field = field
+
+
+class Repository(ABC):
+    """Async document repository.
+
+    Documents are plain dicts identified by their ``id`` field. Backends must
+    keep ``user_id`` plus any configured secondary fields indexed so that
+    ``find`` on those fields does not scan the whole collection, and raise
+    ``DuplicateKeyError`` on writes that break a configured unique field.
+    """
+
+    @abstractmethod
+    async def get(self, doc_id: str) -> Optional[dict]:
+        """Get a document by id."""
+
+    @abstractmethod
+    async def insert(self, doc: dict) -> dict:
+        """Insert a new document (or replace one with the same id)."""
+
+    @abstractmethod
+    async def update(self, doc_id: str, changes: dict) -> Optional[dict]:
+        """Apply field changes to a document and return the updated document."""
+
+    @abstractmethod
+    async def increment(self, doc_id: str, amounts: Dict[str, float], defaults: Optional[dict] = None) -> dict:
+        """Atomically add ``amounts`` to numeric fields and return the document.
+
+        A missing document is created from ``defaults`` (which must not name
+        any incremented field) with the incremented fields starting at zero.
+        """
+
+    @abstractmethod
+    async def delete(self, doc_id: str) -> Optional[dict]:
+        """Delete a document by id and return it."""
+
+    @abstractmethod
+    async def find(
+        self,
+        projection: Optional[Iterable[str]] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        **filters,
+    ) -> List[dict]:
+        """Find documents whose fields equal the given values, in id order.
+
+        ``projection`` limits the returned documents to the listed fields,
+        ``after`` skips ids up to and including the given cursor, and
+        ``limit`` caps the number of documents returned.
+        """
+
+    @abstractmethod
+    async def find_until(
+        self,
+        field: str,
+        until,
+        limit: int,
+        projection: Optional[Iterable[str]] = None,
+        **filters,
+    ) -> List[dict]:
+        """Find documents whose ``field`` is at most ``until``, in ``field`` order.
+
+        Other filters match by equality, as in ``find``. Backends that index
+        externally need a compound index of the filters and ``field``
+        (``RANGE_INDEXES``) for this to avoid a scan.
+        """
+
+    @abstractmethod
+    async def count(self, **filters) -> int:
+        """Count documents matching the given filters."""
+
+    async def ensure_indexes(self) -> None:
+        """Create backend indexes (no-op for backends that index in-process)."""
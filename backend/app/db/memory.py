@@ -0,0 +1,175 @@
+"""
+In-memory document repository with secondary indexes.
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from app.db.base import DuplicateKeyError, Repository
+
+
+class InMemoryRepository(Repository):
+    """Dict-backed document store that keeps secondary indexes up to date.
+
+    Documents are plain dicts keyed by their ``id``. Every repository indexes
+    ``user_id``; additional fields (e.g. task ``status``) are indexed by
+    passing them in ``indexes``. Lookups on indexed fields only touch the
+    matching ids instead of scanning the whole store.
+
+    Index buckets are sorted id lists, so results come back in id (creation)
+    order and a page after a cursor starts with a binary search.
+
+    Fields in ``unique`` are indexed too, and writes that would share a
+    value between two documents raise ``DuplicateKeyError``.
+
+    Returned documents are the stored dicts themselves; callers must go
+    through ``update`` rather than mutating them so indexes stay correct.
+    """
+
+    def __init__(self, indexes: Iterable[str] = (), unique: Iterable[str] = ()):
+        self._docs: Dict[str, dict] = {}
+        self._ids: List[str] = []
+        self._unique = tuple(unique)
+        self._index_fields = ("user_id", *indexes, *self._unique)
+        # field -> value -> sorted list of ids
+        self._indexes: Dict[str, Dict[object, List[str]]] = {
+            field: defaultdict(list) for field in self._index_fields
+        }
+
+    async def get(self, doc_id: str) -> Optional[dict]:
+        """Get a document by id."""
+        return self._docs.get(doc_id)
+
+    async def insert(self, doc: dict) -> dict:
+        """Insert a new document (or replace one with the same id)."""
+        self._check_unique(doc["id"], doc)
+        if doc["id"] in self._docs:
+            await self.delete(doc["id"])
+        self._docs[doc["id"]] = doc
+        insort(self._ids, doc["id"])
+        self._index(doc)
+        return doc
+
+    async def update(self, doc_id: str, changes: dict) -> Optional[dict]:
+        """Apply field changes to a document, reindexing touched fields."""
+        doc = self._docs.get(doc_id)
+        if doc is None:
+            return None
+
+        self._check_unique(doc_id, changes)
+        reindexed = [field for field in self._index_fields if field in changes]
+        for field in reindexed:
+            self._unindex_field(doc, field)
+        doc.update(changes)
+        for field in reindexed:
+            self._index_field(doc, field)
+        return doc
+
+    async def increment(self, doc_id: str, amounts: Dict[str, float], defaults: Optional[dict] = None) -> dict:
+        """Add to numeric fields, creating the document from ``defaults`` if missing."""
+        doc = self._docs.get(doc_id)
+        if doc is None:
+            doc = await self.insert({**(defaults or {}), "id": doc_id, **{field: 0 for field in amounts}})
+        return await self.update(doc_id, {field: doc.get(field, 0) + value for field, value in amounts.items()})
+
+    async def delete(self, doc_id: str) -> Optional[dict]:
+        """Delete a document by id and drop it from every index."""
+        doc = self._docs.pop(doc_id, None)
+        if doc is not None:
+            _discard(self._ids, doc_id)
+            for field in self._index_fields:
+                self._unindex_field(doc, field)
+        return doc
+
+    async def find(
+        self,
+        projection: Optional[Iterable[str]] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        **filters,
+    ) -> List[dict]:
+        """Find documents whose fields equal the given values, in id order.
+
+        Indexed filters are resolved by walking the smallest matching index
+        bucket from the cursor position; remaining filters are checked per
+        document. Iteration stops as soon as ``limit`` matches are found.
+        """
+        indexed = [f for f in filters if f in self._indexes]
+        if not indexed:
+            candidates = self._ids
+        else:
+            buckets = [self._indexes[f].get(filters[f], []) for f in indexed]
+            candidates = min(buckets, key=len)
+
+        start = bisect_right(candidates, after) if after is not None else 0
+        results = []
+        for doc_id in candidates[start:]:
+            doc = self._docs[doc_id]
+            if all(doc.get(field) == value for field, value in filters.items()):
+                results.append(doc if projection is None else _project(doc, projection))
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+    async def find_until(
+        self,
+        field: str,
+        until,
+        limit: int,
+        projection: Optional[Iterable[str]] = None,
+        **filters,
+    ) -> List[dict]:
+        """Find documents whose ``field`` is at most ``until``, in ``field`` order.
+
+        Walks the documents matching ``filters`` and sorts the hits, so it is
+        linear in those; callers with a hot path keep their own ordering.
+        """
+        hits = [
+            doc for doc in await self.find(**filters)
+            if doc.get(field) is not None and doc[field] <= until
+        ]
+        hits.sort(key=lambda doc: (doc[field], doc["id"]))
+        return [doc if projection is None else _project(doc, projection) for doc in hits[:limit]]
+
+    async def count(self, **filters) -> int:
+        """Count documents matching the given filters."""
+        if not filters:
+            return len(self._docs)
+        if len(filters) == 1:
+            (field, value), = filters.items()
+            if field in self._indexes:
+                return len(self._indexes[field].get(value, {}))
+        return len(await self.find(**filters))
+
+    def _check_unique(self, doc_id: str, fields: dict) -> None:
+        for field in self._unique:
+            if field in fields:
+                if any(other != doc_id for other in self._indexes[field].get(fields[field], ())):
+                    raise DuplicateKeyError(field)
+
+    def _index(self, doc: dict) -> None:
+        for field in self._index_fields:
+            self._index_field(doc, field)
+
+    def _index_field(self, doc: dict, field: str) -> None:
+        if field in doc:
+            insort(self._indexes[field][doc[field]], doc["id"])
+
+    def _unindex_field(self, doc: dict, field: str) -> None:
+        if field not in doc:
+            return
+        bucket = self._indexes[field].get(doc[field])
+        if bucket is not None:
+            _discard(bucket, doc["id"])
+            if not bucket:
+                del self._indexes[field][doc[field]]
+
+
+def _discard(ids: List[str], doc_id: str) -> None:
+    i = bisect_left(ids, doc_id)
+    if i < len(ids) and ids[i] == doc_id:
+        del ids[i]
+
+
+def _project(doc: dict, fields: Iterable[str]) -> dict:
+    return {field: doc[field] for field in fields if field in doc}
@@ -0,0 +1,129 @@
+"""
+MongoDB repository backed by the async Motor driver.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError as MongoDuplicateKeyError
+
+from app.db.base import DuplicateKeyError, Repository
+
+
+class MongoRepository(Repository):
+    """Repository storing each document in a Motor collection.
+
+    The document ``id`` doubles as the Mongo ``_id`` so primary-key lookups use
+    the built-in index; ``_id`` is stripped from everything returned.
+    """
+
+    def __init__(
+        self,
+        collection,
+        indexes: Iterable[str] = (),
+        unique: Iterable[str] = (),
+        ranges: Iterable[Tuple[str, ...]] = (),
+    ):
+        self._collection = collection
+        self._unique = tuple(unique)
+        self._index_fields = ("user_id", *indexes)
+        self._ranges = tuple(ranges)
+
+    async def ensure_indexes(self) -> None:
+        """Create the user_id, secondary, unique and range indexes.
+
+        Each secondary index is compound with ``_id`` so filtered lists come
+        back in id order and cursor pages resolve without an in-memory sort.
+        Range indexes list the equality fields, then the ranged field, then
+        ``_id``, so ``find_until`` reads matches in order.
+        """
+        for field in self._index_fields:
+            await self._collection.create_index([(field, ASCENDING), ("_id", ASCENDING)])
+        for field in self._unique:
+            await self._collection.create_index(field, unique=True)
+        for fields in self._ranges:
+            await self._collection.create_index([(field, ASCENDING) for field in (*fields, "_id")])
+
+    async def get(self, doc_id: str) -> Optional[dict]:
+        """Get a document by id."""
+        return await self._collection.find_one({"_id": doc_id}, {"_id": 0})
+
+    async def insert(self, doc: dict) -> dict:
+        """Insert a new document (or replace one with the same id)."""
+        try:
+            await self._collection.replace_one({"_id": doc["id"]}, {**doc, "_id": doc["id"]}, upsert=True)
+        except MongoDuplicateKeyError as e:
+            raise DuplicateKeyError(self._duplicate_field(e)) from e
+        return doc
+
+    async def update(self, doc_id: str, changes: dict) -> Optional[dict]:
+        """Apply field changes to a document and return the updated document."""
+        if not changes:
+            return await self.get(doc_id)
+        try:
+            return await self._collection.find_one_and_update(
+                {"_id": doc_id},
+                {"$set": changes},
+                projection={"_id": 0},
+                return_document=ReturnDocument.AFTER,
+            )
+        except MongoDuplicateKeyError as e:
+            raise DuplicateKeyError(self._duplicate_field(e)) from e
+
+    async def increment(self, doc_id: str, amounts: Dict[str, float], defaults: Optional[dict] = None) -> dict:
+        """Atomically ``$inc`` numeric fields, upserting from ``defaults``."""
+        return await self._collection.find_one_and_update(
+            {"_id": doc_id},
+            {"$inc": amounts, "$setOnInsert": {**(defaults or {}), "id": doc_id}},
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def delete(self, doc_id: str) -> Optional[dict]:
+        """Delete a document by id and return it."""
+        return await self._collection.find_one_and_delete({"_id": doc_id}, projection={"_id": 0})
+
+    async def find(
+        self,
+        projection: Optional[Iterable[str]] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        **filters,
+    ) -> List[dict]:
+        """Find documents whose fields equal the given values, in id order."""
+        fields = {"_id": 0}
+        if projection is not None:
+            fields.update({field: 1 for field in projection})
+        query = dict(filters)
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        cursor = self._collection.find(query, fields).sort("_id", ASCENDING)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def find_until(
+        self,
+        field: str,
+        until,
+        limit: int,
+        projection: Optional[Iterable[str]] = None,
+        **filters,
+    ) -> List[dict]:
+        """Find documents whose ``field`` is at most ``until``, in ``field`` order."""
+        fields = {"_id": 0}
+        if projection is not None:
+            fields.update({name: 1 for name in projection})
+        query = {**filters, field: {"$lte": until}}
+        cursor = self._collection.find(query, fields).sort([(field, ASCENDING), ("_id", ASCENDING)]).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def count(self, **filters) -> int:
+        """Count documents matching the given filters."""
+        if not filters:
+            return await self._collection.estimated_document_count()
+        return await self._collection.count_documents(filters)
+
+    def _duplicate_field(self, error: MongoDuplicateKeyError) -> str:
+        key = (error.details or {}).get("keyPattern") or {}
+        return next(iter(key), self._unique[0] if self._unique else "_id")
@@ -0,0 +1,106 @@
+"""
+Storage registry exposing one repository per collection.
+"""
+from typing import Dict
+
+from app.core.config import settings
+from app.db.base import Repository
+from app.db.memory import InMemoryRepository
+
+# Collection name -> secondary indexes (user_id is always indexed)
+COLLECTIONS: Dict[str, tuple] = {
+    "tasks": ("status", "priority"),
+    "notes": (),
+    "study_plans": (),
+    "quizzes": (),
+    "quiz_attempts": ("quiz_id",),
+    "habits": (),
+    "habit_logs": ("habit_id",),
+    "users": (),
+    "daily_rollups": (),
+    "subject_rollups": (),
+    "topic_rollups": (),
+    "study_events": (),
+    "question_bank": ("subject", "topic", "difficulty"),
+    "abilities": (),
+    "adaptive_sessions": (),
+    "review_cards": ("source_id",),
+}
+
+# Collection name -> fields that must be unique (and are indexed)
+UNIQUE_FIELDS: Dict[str, tuple] = {
+    "users": ("email",),
+    "question_bank": ("hash",),
+}
+
+# Collection name -> equality fields then ranged field, indexed for ``find_until``
+RANGE_INDEXES: Dict[str, tuple] = {
+    "review_cards": (("user_id", "due_at"),),
+}
+
+
+class Storage:
+    """Holds the repositories for the configured storage backend.
+
+    Starts out with in-memory repositories so the app (and tests) work without
+    a database server; ``connect`` swaps in MongoDB repositories when
+    ``STORAGE_BACKEND`` is ``"mongodb"``.
+    """
+
+    tasks: Repository
+    notes: Repository
+    study_plans: Repository
+    quizzes: Repository
+    quiz_attempts: Repository
+    habits: Repository
+    habit_logs: Repository
+    users: Repository
+    daily_rollups: Repository
+    subject_rollups: Repository
+    topic_rollups: Repository
+    study_events: Repository
+    question_bank: Repository
+    abilities: Repository
+    adaptive_sessions: Repository
+    review_cards: Repository
+
+    def __init__(self):
+        self._client = None
+        self._use({
+            name: InMemoryRepository(indexes, UNIQUE_FIELDS.get(name, ()))
+            for name, indexes in COLLECTIONS.items()
+        })
+
+    async def connect(self) -> None:
+        """Connect to the configured backend and build its indexes."""
+        if settings.STORAGE_BACKEND != "mongodb":
+            return
+
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from app.db.mongo import MongoRepository
+
+        self._client = AsyncIOMotorClient(
+            settings.MONGODB_URL,
+            maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+        )
+        db = self._client[settings.MONGODB_DB_NAME]
+        repos = {
+            name: MongoRepository(db[name], indexes, UNIQUE_FIELDS.get(name, ()), RANGE_INDEXES.get(name, ()))
+            for name, indexes in COLLECTIONS.items()
+        }
+        for repo in repos.values():
+            await repo.ensure_indexes()
+        self._use(repos)
+
+    async def close(self) -> None:
+        """Close the database client, if any."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def _use(self, repos: Dict[str, Repository]) -> None:
+        for name, repo in repos.items():
+            setattr(self, name, repo)
+
+
+storage = Storage()
@@ -5,9 +5,18 @@ AI-Powered Student Productivity & Learning Operating System
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 
-from app.api.v1 import auth, study_plans, notes, quizzes, analytics, tasks, habits
+from app.api.v1 import auth, study_plans, notes, quizzes, analytics, tasks, habits, jobs, dashboard, reviews
 from app.core.config import settings
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.security import shutdown_hash_executor
+from app.db.storage import storage
+from app.services import pdf, youtube
+from app.services.ai_client import ai_client
+from app.services.cohort_stats import cohort_stats
+from app.services.jobs import job_runner
+from app.services.reviews import review_scheduler
 
 
 @asynccontextmanager
@@ -15,9 +24,21 @@ async def lifespan(app: FastAPI):
     """Application lifespan handler for startup and shutdown events."""
     # Startup
     print("🚀 Starting StudyOS Backend...")
+    await storage.connect()
+    await review_scheduler.load()
+    await cohort_stats.sync()
+    sketch_sync = asyncio.create_task(cohort_stats.run_sync_loop())
     yield
     # Shutdown
     print("👋 Shutting down StudyOS Backend...")
+    sketch_sync.cancel()
+    await cohort_stats.sync()
+    await job_runner.shutdown()
+    await ai_client.close()
+    await storage.close()
+    pdf.shutdown_executor()
+    youtube.shutdown_executor()
+    shutdown_hash_executor()
 
 
 app = FastAPI(
@@ -34,6 +55,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include API routers
@@ -44,6 +66,9 @@ app.include_router(quizzes.router, prefix="/api/v1/quizzes", tags=["Quizzes"])
 app.include_router(analytics.router, prefix="/api/v1/analytics", tags=["Analytics"])
 app.include_router(tasks.router, prefix="/api/v1/tasks", tags=["Tasks"])
 app.include_router(habits.router, prefix="/api/v1/habits", tags=["Habits"])
+app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["Jobs"])
+app.include_router(dashboard.router, prefix="/api/v1/dashboard", tags=["Dashboard"])
+app.include_router(reviews.router, prefix="/api/v1/reviews", tags=["Reviews"])
 
 
 @app.get("/", tags=["Root"])
@@ -0,0 +1,195 @@
+"""
+Adaptive quizzing: Elo-style ability estimates and nearest-difficulty items.
+
+Students and banked questions share one rating scale. Each answer moves the
+student's ability for the question's topic towards the observed outcome,
+and the question's difficulty the opposite way, by how surprising the
+outcome was: ``expected = 1 / (1 + 10 ** ((difficulty - ability) / 400))``.
+Early answers move the estimate more (``K`` shrinks as answers accumulate),
+so a few well-targeted questions are enough to place a student.
+
+Abilities live in the ``abilities`` collection, one document per user,
+subject and topic (ids ``{user_id}:{subject}:{topic}``, like topic
+rollups), updated with atomic increments. For question selection, the
+ratings of a user's banked questions for a topic are kept as a sorted
+in-process index, so the next question is a binary search away.
+"""
+import math
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.storage import storage
+
+INITIAL_RATING = 1500.0
+DIFFICULTY_RATINGS = {"easy": 1300.0, "medium": 1500.0, "hard": 1700.0}
+ABILITY_K_MAX = 160  # Step size for a student's first answer in a topic
+ABILITY_K_MIN = 24  # Floor, so abilities keep tracking learning
+ITEM_K = 16
+
+IndexKey = Tuple[str, str, str]
+
+_indexes = TTLCache(maxsize=settings.ADAPTIVE_INDEX_CACHE_SIZE, ttl=settings.ADAPTIVE_INDEX_CACHE_TTL_SECONDS)
+
+
+def expected_score(ability: float, difficulty: float) -> float:
+    """Probability that a student of ``ability`` answers an item correctly."""
+    return 1 / (1 + 10 ** ((difficulty - ability) / 400))
+
+
+def mastery(ability: float) -> float:
+    """Chance (in percent) of answering a medium question correctly."""
+    return round(expected_score(ability, DIFFICULTY_RATINGS["medium"]) * 100, 1)
+
+
+def initial_item_rating(difficulty: str) -> float:
+    """Starting rating for a question with a difficulty label."""
+    return DIFFICULTY_RATINGS.get(difficulty, INITIAL_RATING)
+
+
+def item_rating(item: dict) -> float:
+    """Current rating of a banked question.
+
+    Questions banked before ratings existed start from their difficulty label.
+    """
+    return item.get("rating", initial_item_rating(item.get("difficulty", "medium")))
+
+
+def _k(answered: int) -> float:
+    return max(ABILITY_K_MIN, ABILITY_K_MAX / math.sqrt(1 + answered))
+
+
+class ItemIndex:
+    """Item ids sorted by rating, for nearest-difficulty lookups."""
+
+    def __init__(self, items: Iterable[Tuple[float, str]] = ()):
+        self._entries: List[Tuple[float, str]] = sorted(items)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, item_id: str, rating: float) -> None:
+        insort(self._entries, (rating, item_id))
+
+    def move(self, item_id: str, old: float, new: float) -> None:
+        i = bisect_left(self._entries, (old, item_id))
+        if i < len(self._entries) and self._entries[i] == (old, item_id):
+            del self._entries[i]
+        self.add(item_id, new)
+
+    def nearest(self, rating: float, exclude: Iterable[str] = ()) -> Optional[str]:
+        """Id of the item rated closest to ``rating``, skipping ``exclude``.
+
+        A binary search finds the insertion point; the search then widens
+        one step at a time past excluded items, so the cost is
+        ``O(log n + len(exclude))``.
+        """
+        exclude = set(exclude)
+        entries = self._entries
+        hi = bisect_left(entries, (rating, ""))
+        lo = hi - 1
+        while lo >= 0 or hi < len(entries):
+            below = entries[lo] if lo >= 0 else None
+            above = entries[hi] if hi < len(entries) else None
+            if above is None or (below is not None and rating - below[0] <= above[0] - rating):
+                if below[1] not in exclude:
+                    return below[1]
+                lo -= 1
+            else:
+                if above[1] not in exclude:
+                    return above[1]
+                hi += 1
+        return None
+
+
+async def item_index(user_id: str, subject: str, topic: str) -> ItemIndex:
+    """Rating index over a user's banked questions for a topic."""
+    key: IndexKey = (user_id, subject, topic)
+    index = _indexes.get(key)
+    if index is None:
+        items = await storage.question_bank.find(
+            projection=("id", "rating", "difficulty"), user_id=user_id, subject=subject, topic=topic
+        )
+        index = ItemIndex((item_rating(item), item["id"]) for item in items)
+        _indexes.set(key, index)
+    return index
+
+
+def index_item(item: dict) -> None:
+    """Add a newly banked question to its index, if that index is loaded."""
+    index = _indexes.get((item["user_id"], item["subject"], item["topic"]))
+    if index is not None:
+        index.add(item["id"], item["rating"])
+
+
+def _ability_id(user_id: str, subject: str, topic: str) -> str:
+    return f"{user_id}:{subject}:{topic}"
+
+
+async def get_ability(user_id: str, subject: str, topic: str) -> Tuple[float, int]:
+    """Current ``(rating, answers so far)`` for a user and topic."""
+    doc = await storage.abilities.get(_ability_id(user_id, subject, topic))
+    if doc is None:
+        return INITIAL_RATING, 0
+    return INITIAL_RATING + doc["rating_change"], doc["answered"]
+
+
+async def _update_ability(user_id: str, subject: str, topic: str, change: float, answered: int, correct: int) -> None:
+    await storage.abilities.increment(
+        _ability_id(user_id, subject, topic),
+        {"rating_change": change, "answered": answered, "correct": correct},
+        defaults={"user_id": user_id, "subject": subject, "topic": topic},
+    )
+
+
+async def record_adaptive_answer(
+    user_id: str,
+    item: dict,
+    correct: bool,
+    ability: float,
+    answered: int,
+) -> float:
+    """Apply one adaptive answer to the student's ability and the item's rating.
+
+    ``ability`` and ``answered`` are the student's estimate before this
+    answer (the caller carries them between questions, saving a read).
+    Returns the new ability.
+    """
+    rating = item_rating(item)
+    surprise = correct - expected_score(ability, rating)
+    change = _k(answered) * surprise
+    await _update_ability(user_id, item["subject"], item["topic"], change, 1, int(correct))
+
+    if "rating" not in item:
+        await storage.question_bank.update(item["id"], {"rating": rating})
+    item_change = -ITEM_K * surprise
+    await storage.question_bank.increment(item["id"], {"rating": item_change})
+    index = _indexes.get((user_id, item["subject"], item["topic"]))
+    if index is not None:
+        index.move(item["id"], rating, rating + item_change)
+    return ability + change
+
+
+async def record_quiz_abilities(user_id: str, quiz: dict, answers: Dict[str, str]) -> None:
+    """Update abilities from a regular (non-adaptive) quiz attempt.
+
+    Questions are rated by their difficulty label. Each topic's answers are
+    scored against the ability from before the attempt and applied as one
+    increment, so a quiz costs one read and one write per topic.
+    """
+    by_topic: Dict[str, List[dict]] = defaultdict(list)
+    for question in quiz["questions"]:
+        by_topic[question.get("topic") or quiz["subject"]].append(question)
+
+    for topic, questions in by_topic.items():
+        ability, answered = await get_ability(user_id, quiz["subject"], topic)
+        change = correct = 0
+        for question in questions:
+            right = answers.get(question["id"]) == question["correct_answer"]
+            difficulty = initial_item_rating(question.get("difficulty", "medium"))
+            change += _k(answered) * (right - expected_score(ability, difficulty))
+            correct += right
+            answered += 1
+        await _update_ability(user_id, quiz["subject"], topic, change, len(questions), correct)
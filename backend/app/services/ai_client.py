@@ -0,0 +1,363 @@
+"""
+Shared AI provider client (Gemini and OpenAI).
+
+A single module-level ``ai_client`` owns one pooled ``httpx.AsyncClient`` and,
+per provider, a token-bucket rate limiter and a concurrency cap. Calls are
+retried with jittered exponential backoff, and if the primary provider is
+slow or failing the request is hedged to the other one; the first good
+answer wins. ``generate_stream`` yields text as the provider produces it
+(server-sent events); streams are not hedged, but fail over to the next
+provider if they fail before any text arrives.
+
+When no API key is configured ``ai_client.configured`` is False and call
+sites fall back to their placeholder content.
+"""
+import asyncio
+import json
+import random
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, List, Optional
+
+import httpx
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+class TokenBucket:
+    """Async token-bucket rate limiter: ``rate`` tokens/second, bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until ``tokens`` are available and take them (FIFO)."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+class ProviderError(Exception):
+    """A provider call failed; ``retryable`` marks transient failures."""
+
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def _backoff(attempt: int, error: ProviderError) -> float:
+    # Full jitter: spread retries out so clients don't stampede together
+    backoff = random.uniform(0, min(settings.AI_BACKOFF_MAX_SECONDS, settings.AI_BACKOFF_BASE_SECONDS * 2 ** attempt))
+    return max(backoff, error.retry_after or 0)
+
+
+class Provider(ABC):
+    """Base class for a model provider with its own rate limit and concurrency cap."""
+
+    name = ""
+
+    def __init__(self, api_key: str, base_url: str, model: str):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        rate = settings.AI_REQUESTS_PER_MINUTE / 60
+        self.bucket = TokenBucket(rate=rate, capacity=max(1.0, rate * settings.AI_BURST_SECONDS))
+        self.semaphore = asyncio.Semaphore(settings.AI_MAX_CONCURRENCY)
+
+    @abstractmethod
+    async def complete(self, http: httpx.AsyncClient, prompt: str, system: Optional[str],
+                       max_tokens: int, json_mode: bool) -> str:
+        """Run one completion request and return the generated text."""
+
+    @abstractmethod
+    def stream(self, http: httpx.AsyncClient, prompt: str, system: Optional[str],
+               max_tokens: int, json_mode: bool) -> AsyncIterator[str]:
+        """Run one streaming completion request, yielding text as it is generated."""
+
+    def _status_error(self, response: httpx.Response) -> ProviderError:
+        retry_after = response.headers.get("Retry-After")
+        return ProviderError(
+            f"{self.name}: HTTP {response.status_code}",
+            retryable=response.status_code in RETRYABLE_STATUS_CODES,
+            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+        )
+
+    async def _post(self, http: httpx.AsyncClient, url: str, **kwargs) -> dict:
+        try:
+            response = await http.post(url, **kwargs)
+        except httpx.TransportError as e:
+            raise ProviderError(f"{self.name}: {type(e).__name__}", retryable=True)
+
+        if response.status_code >= 400:
+            raise self._status_error(response)
+        return response.json()
+
+    async def _post_events(self, http: httpx.AsyncClient, url: str, **kwargs) -> AsyncIterator[dict]:
+        """POST and yield the JSON payload of each server-sent event in the response."""
+        try:
+            async with http.stream("POST", url, **kwargs) as response:
+                if response.status_code >= 400:
+                    raise self._status_error(response)
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if payload and payload != "[DONE]":
+                        yield json.loads(payload)
+        except httpx.TransportError as e:
+            raise ProviderError(f"{self.name}: {type(e).__name__}", retryable=True)
+        except json.JSONDecodeError:
+            raise ProviderError(f"{self.name}: malformed stream event", retryable=True)
+
+
+class GeminiProvider(Provider):
+    name = "gemini"
+
+    def _body(self, prompt, system, max_tokens, json_mode) -> dict:
+        body = {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {"maxOutputTokens": max_tokens},
+        }
+        if system:
+            body["systemInstruction"] = {"parts": [{"text": system}]}
+        if json_mode:
+            body["generationConfig"]["responseMimeType"] = "application/json"
+        return body
+
+    async def complete(self, http, prompt, system, max_tokens, json_mode):
+        data = await self._post(
+            http,
+            f"{self.base_url}/v1beta/models/{self.model}:generateContent",
+            params={"key": self.api_key},
+            json=self._body(prompt, system, max_tokens, json_mode),
+        )
+        try:
+            parts = data["candidates"][0]["content"]["parts"]
+        except (KeyError, IndexError):
+            raise ProviderError(f"{self.name}: empty response", retryable=True)
+        return "".join(part.get("text", "") for part in parts)
+
+    async def stream(self, http, prompt, system, max_tokens, json_mode):
+        events = self._post_events(
+            http,
+            f"{self.base_url}/v1beta/models/{self.model}:streamGenerateContent",
+            params={"key": self.api_key, "alt": "sse"},
+            json=self._body(prompt, system, max_tokens, json_mode),
+        )
+        async for data in events:
+            # The final event may carry only a finish reason
+            for candidate in data.get("candidates", [])[:1]:
+                text = "".join(part.get("text", "") for part in candidate.get("content", {}).get("parts", []))
+                if text:
+                    yield text
+
+
+class OpenAIProvider(Provider):
+    name = "openai"
+
+    def _body(self, prompt, system, max_tokens, json_mode) -> dict:
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": prompt})
+        body = {"model": self.model, "messages": messages, "max_tokens": max_tokens}
+        if json_mode:
+            body["response_format"] = {"type": "json_object"}
+        return body
+
+    async def complete(self, http, prompt, system, max_tokens, json_mode):
+        data = await self._post(
+            http,
+            f"{self.base_url}/v1/chat/completions",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json=self._body(prompt, system, max_tokens, json_mode),
+        )
+        try:
+            return data["choices"][0]["message"]["content"] or ""
+        except (KeyError, IndexError):
+            raise ProviderError(f"{self.name}: empty response", retryable=True)
+
+    async def stream(self, http, prompt, system, max_tokens, json_mode):
+        events = self._post_events(
+            http,
+            f"{self.base_url}/v1/chat/completions",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json={**self._body(prompt, system, max_tokens, json_mode), "stream": True},
+        )
+        async for data in events:
+            for choice in data.get("choices", [])[:1]:
+                text = choice.get("delta", {}).get("content")
+                if text:
+                    yield text
+
+
+class AIClient:
+    """Pooled, rate-limited client that fails over between providers."""
+
+    def __init__(self):
+        self._http: Optional[httpx.AsyncClient] = None
+        providers = []
+        if settings.GEMINI_API_KEY:
+            providers.append(GeminiProvider(settings.GEMINI_API_KEY, settings.GEMINI_BASE_URL, settings.GEMINI_MODEL))
+        if settings.OPENAI_API_KEY:
+            providers.append(OpenAIProvider(settings.OPENAI_API_KEY, settings.OPENAI_BASE_URL, settings.OPENAI_MODEL))
+        # Primary provider first, the rest are hedges/fallbacks
+        providers.sort(key=lambda p: p.name != settings.AI_PRIMARY_PROVIDER)
+        self.providers: List[Provider] = providers
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.providers)
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=settings.AI_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=settings.AI_MAX_CONCURRENCY * 2,
+                    max_keepalive_connections=settings.AI_MAX_CONCURRENCY,
+                ),
+            )
+        return self._http
+
+    async def close(self) -> None:
+        """Close the pooled HTTP client."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def generate(self, prompt: str, system: Optional[str] = None,
+                       max_tokens: int = 1024, json_mode: bool = False) -> str:
+        """Generate text, hedging to the next provider if the current one is slow.
+
+        Raises ``HTTPException(503)`` if no provider is configured or all fail.
+        """
+        if not self.providers:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="No AI provider configured"
+            )
+
+        tasks: List[asyncio.Task] = []
+
+        def start(provider: Provider) -> asyncio.Task:
+            task = asyncio.create_task(self._call(provider, prompt, system, max_tokens, json_mode))
+            tasks.append(task)
+            return task
+
+        backups = list(self.providers[1:])
+        pending = {start(self.providers[0])}
+        errors = []
+        try:
+            while pending or backups:
+                if not pending:
+                    # Everything in flight failed: fail over
+                    pending.add(start(backups.pop(0)))
+                    continue
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=settings.AI_HEDGE_DELAY_SECONDS if backups else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # Still slow after the hedge delay: race the next provider
+                    pending.add(start(backups.pop(0)))
+                    continue
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(str(task.exception()))
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"AI providers unavailable ({'; '.join(errors)})"
+        )
+
+    async def generate_stream(self, prompt: str, system: Optional[str] = None,
+                              max_tokens: int = 1024, json_mode: bool = False) -> AsyncIterator[str]:
+        """Generate text, yielding it piece by piece as the provider streams it.
+
+        Providers are tried in order, retrying or failing over only while no
+        text has been yielded. Raises ``HTTPException(503)`` if no provider is
+        configured, all fail, or a stream breaks off part way.
+        """
+        if not self.providers:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="No AI provider configured"
+            )
+
+        errors = []
+        for provider in self.providers:
+            for attempt in range(settings.AI_MAX_RETRIES + 1):
+                streamed = False
+                try:
+                    async with provider.semaphore:
+                        await provider.bucket.acquire()
+                        async for text in provider.stream(self._client(), prompt, system, max_tokens, json_mode):
+                            streamed = True
+                            yield text
+                    return
+                except ProviderError as e:
+                    if streamed:
+                        raise HTTPException(
+                            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail=f"AI provider stream interrupted ({e})"
+                        )
+                    if not e.retryable or attempt == settings.AI_MAX_RETRIES:
+                        errors.append(str(e))
+                        break
+                    await asyncio.sleep(_backoff(attempt, e))
+
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"AI providers unavailable ({'; '.join(errors)})"
+        )
+
+    async def generate_json(self, prompt: str, system: Optional[str] = None, max_tokens: int = 2048) -> dict:
+        """Generate a JSON object. Raises ``HTTPException(502)`` on unparseable output."""
+        text = await self.generate(prompt, system=system, max_tokens=max_tokens, json_mode=True)
+        try:
+            data = json.loads(_CODE_FENCE.sub("", text.strip()))
+        except json.JSONDecodeError:
+            data = None
+        if not isinstance(data, dict):
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="AI provider returned invalid JSON"
+            )
+        return data
+
+    async def _call(self, provider: Provider, prompt: str, system: Optional[str],
+                    max_tokens: int, json_mode: bool) -> str:
+        for attempt in range(settings.AI_MAX_RETRIES + 1):
+            try:
+                async with provider.semaphore:
+                    await provider.bucket.acquire()
+                    return await provider.complete(self._client(), prompt, system, max_tokens, json_mode)
+            except ProviderError as e:
+                if not e.retryable or attempt == settings.AI_MAX_RETRIES:
+                    raise
+                await asyncio.sleep(_backoff(attempt, e))
+        raise AssertionError("unreachable")
+
+
+ai_client = AIClient()
@@ -0,0 +1,251 @@
+"""
+Columnar analytics over a user's study event history.
+
+Every task completion, quiz attempt and habit log is also appended to
+``study_events``. Reports over arbitrary ranges (e.g. a whole term) load the
+events into NumPy column arrays once and aggregate them with vectorized
+group-bys (``np.bincount`` over integer codes) instead of Python loops.
+Loaded columns are cached per user and topped up with new events only.
+"""
+import asyncio
+import math
+from datetime import date, datetime, time as dt_time, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.ids import id_floor, new_id
+from app.db.storage import storage
+
+KINDS = ("task", "quiz", "habit", "topic")
+TASK, QUIZ, HABIT, TOPIC = range(len(KINDS))
+
+# Topics need a few answered questions before they count as weak or strong
+MIN_TOPIC_ANSWERS = 3
+WEAK_TOPIC_SCORE = 60
+STRONG_TOPIC_SCORE = 80
+
+EVENT_FIELDS = ["id", "date", "kind", "subject", "topic", "count", "minutes", "score", "correct", "answered"]
+
+# Loaded event columns per user
+_columns = TTLCache(maxsize=settings.ANALYTICS_CACHE_SIZE, ttl=settings.ANALYTICS_CACHE_TTL_SECONDS)
+
+
+async def record_event(
+    user_id: str,
+    day: str,
+    kind: str,
+    subject: str,
+    count: int = 1,
+    minutes: float = 0,
+    score: Optional[float] = None,
+    topic: str = "",
+    correct: int = 0,
+    answered: int = 0,
+) -> None:
+    """Append one event to the user's study history."""
+    await storage.study_events.insert({
+        "id": new_id("event"),
+        "user_id": user_id,
+        "date": day,
+        "kind": kind,
+        "subject": subject,
+        "topic": topic,
+        "count": count,
+        "minutes": minutes,
+        "score": score,
+        "correct": correct,
+        "answered": answered,
+    })
+
+
+def _encode(values: Iterable[str], codes: Dict[str, int], labels: List[str], n: int) -> np.ndarray:
+    """Dictionary-encode strings to int codes, growing ``codes``/``labels`` as needed."""
+    values = list(values)
+    for value in set(values).difference(codes):
+        codes[value] = len(labels)
+        labels.append(value)
+    return np.fromiter(map(codes.__getitem__, values), dtype=np.int64, count=n)
+
+
+class EventColumns:
+    """A user's events from ``start`` onwards as parallel NumPy arrays.
+
+    Subjects and topics are dictionary-encoded into ``subject``/``topic``
+    codes indexing ``subjects``/``topics``. Columns are cached per user and
+    extended with only the events recorded since ``last_id``.
+    """
+
+    def __init__(self, start: date):
+        self.start = start
+        self.last_id: Optional[str] = None
+        self.lock = asyncio.Lock()
+        self.subjects: List[str] = []
+        self.topics: List[str] = []
+        self._subject_codes: Dict[str, int] = {}
+        self._topic_codes: Dict[str, int] = {}
+        self.day = np.empty(0, dtype=np.int64)
+        self.kind = np.empty(0, dtype=np.int8)
+        self.subject = np.empty(0, dtype=np.int64)
+        self.topic = np.empty(0, dtype=np.int64)
+        self.count = np.empty(0, dtype=np.float64)
+        self.minutes = np.empty(0, dtype=np.float64)
+        self.score = np.empty(0, dtype=np.float64)
+        self.correct = np.empty(0, dtype=np.float64)
+        self.answered = np.empty(0, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    def extended(self, events: List[dict]) -> dict:
+        """Columns, labels and cursor with events (in id order) appended.
+
+        Builds new arrays without touching ``self``, so it can run in a
+        worker thread while reports read the current columns; ``apply`` the
+        result on the event loop to swap them all in at once.
+        """
+        if not events:
+            return {}
+        n = len(events)
+        kinds = {kind: i for i, kind in enumerate(KINDS)}
+        subjects, topics = list(self.subjects), list(self.topics)
+        subject_codes, topic_codes = dict(self._subject_codes), dict(self._topic_codes)
+        new = {
+            "day": np.array([e["date"] for e in events], dtype="datetime64[D]").astype(np.int64),
+            "kind": np.fromiter((kinds[e["kind"]] for e in events), dtype=np.int8, count=n),
+            "subject": _encode((e["subject"] for e in events), subject_codes, subjects, n),
+            "topic": _encode((e.get("topic") or "" for e in events), topic_codes, topics, n),
+            "count": np.fromiter((e.get("count", 1) for e in events), dtype=np.float64, count=n),
+            "minutes": np.fromiter((e.get("minutes") or 0 for e in events), dtype=np.float64, count=n),
+            "score": np.fromiter(
+                (math.nan if e.get("score") is None else e["score"] for e in events), dtype=np.float64, count=n
+            ),
+            "correct": np.fromiter((e.get("correct", 0) for e in events), dtype=np.float64, count=n),
+            "answered": np.fromiter((e.get("answered", 0) for e in events), dtype=np.float64, count=n),
+        }
+        return {
+            **{name: np.concatenate([getattr(self, name), values]) for name, values in new.items()},
+            "subjects": subjects,
+            "topics": topics,
+            "_subject_codes": subject_codes,
+            "_topic_codes": topic_codes,
+            "last_id": events[-1]["id"],
+        }
+
+    def apply(self, changes: dict) -> None:
+        """Swap in the result of ``extended``."""
+        vars(self).update(changes)
+
+
+async def load_events(user_id: str, start: date) -> EventColumns:
+    """Return columns holding (at least) the user's events from ``start`` on.
+
+    Cached columns that already cover ``start`` only fetch newer events;
+    callers should mask ``day`` to their exact range.
+    """
+    cols = _columns.get(user_id)
+    if cols is None or cols.start > start:
+        cols = EventColumns(start)
+        _columns.set(user_id, cols)
+
+    async with cols.lock:
+        # Event days are UTC, so the cursor is UTC midnight of the start day
+        since = datetime.combine(cols.start, dt_time.min, tzinfo=timezone.utc).timestamp()
+        events = await storage.study_events.find(
+            projection=EVENT_FIELDS,
+            after=cols.last_id or id_floor("event", since),
+            user_id=user_id,
+        )
+        # Row-to-column conversion is CPU-bound; keep it off the event loop,
+        # then swap the columns in on the loop so reports never see a mix
+        cols.apply(await asyncio.to_thread(cols.extended, events))
+    return cols
+
+
+def _day_number(day: date) -> int:
+    return int(np.datetime64(day, "D").astype(np.int64))
+
+
+def _average(totals: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    return np.divide(totals, counts, out=np.zeros(len(totals)), where=counts > 0)
+
+
+def weekly_report(cols: EventColumns, start: date, end: date) -> List[dict]:
+    """Per-week study hours, tasks, quizzes and average quiz score in ``[start, end]``."""
+    first = _day_number(start)
+    weeks = (_day_number(end) - first) // 7 + 1
+    in_range = (cols.day >= first) & (cols.day <= _day_number(end))
+    week = (cols.day - first) // 7
+
+    task = in_range & (cols.kind == TASK)
+    quiz = in_range & (cols.kind == QUIZ)
+    minutes = np.bincount(week[in_range], weights=cols.minutes[in_range], minlength=weeks)
+    tasks = np.bincount(week[task], weights=cols.count[task], minlength=weeks)
+    quizzes = np.bincount(week[quiz], minlength=weeks).astype(np.float64)
+    scores = np.bincount(week[quiz], weights=cols.score[quiz], minlength=weeks)
+    average = _average(scores, quizzes)
+
+    return [
+        {
+            "week_start": str(np.datetime64(first + 7 * i, "D")),
+            "study_hours": round(float(minutes[i]) / 60, 1),
+            "tasks_completed": int(tasks[i]),
+            "quizzes_taken": int(quizzes[i]),
+            "average_quiz_score": round(float(average[i]), 1),
+        }
+        for i in range(weeks)
+    ]
+
+
+def subject_report(cols: EventColumns, mask: Optional[np.ndarray] = None) -> List[dict]:
+    """Study hours and quiz performance per subject."""
+    mask = np.ones(len(cols), dtype=bool) if mask is None else mask
+    n = len(cols.subjects)
+    quiz = mask & (cols.kind == QUIZ)
+    minutes = np.bincount(cols.subject[mask], weights=cols.minutes[mask], minlength=n)
+    quizzes = np.bincount(cols.subject[quiz], minlength=n).astype(np.float64)
+    average = _average(np.bincount(cols.subject[quiz], weights=cols.score[quiz], minlength=n), quizzes)
+
+    return [
+        {
+            "subject": subject,
+            "score": round(float(average[i]), 1),
+            "total_study_hours": round(float(minutes[i]) / 60, 1),
+            "quizzes_taken": int(quizzes[i]),
+            "average_quiz_score": round(float(average[i]), 1),
+        }
+        for i, subject in enumerate(cols.subjects)
+        if subject and (minutes[i] or quizzes[i])
+    ]
+
+
+def topic_report(cols: EventColumns, mask: Optional[np.ndarray] = None, limit: int = 3) -> Tuple[List[dict], List[dict]]:
+    """Return ``(weak_areas, strong_areas)`` from per-topic quiz accuracy."""
+    mask = np.ones(len(cols), dtype=bool) if mask is None else mask
+    topic = mask & (cols.kind == TOPIC)
+    n_topics = len(cols.topics)
+    # One group per (subject, topic) pair
+    group = cols.subject[topic] * n_topics + cols.topic[topic]
+    size = len(cols.subjects) * n_topics
+    correct = np.bincount(group, weights=cols.correct[topic], minlength=size)
+    answered = np.bincount(group, weights=cols.answered[topic], minlength=size)
+
+    eligible = np.flatnonzero(answered >= MIN_TOPIC_ANSWERS)
+    scores = correct[eligible] / answered[eligible] * 100
+    order = np.argsort(scores, kind="stable")
+
+    def areas(indices: Iterable[int]) -> List[dict]:
+        return [
+            {
+                "topic": cols.topics[eligible[i] % n_topics],
+                "score": round(float(scores[i]), 1),
+                "subject": cols.subjects[eligible[i] // n_topics],
+            }
+            for i in indices
+        ]
+
+    weak = areas(i for i in order[:limit] if scores[i] < WEAK_TOPIC_SCORE)
+    strong = areas(i for i in order[::-1][:limit] if scores[i] >= STRONG_TOPIC_SCORE)
+    return weak, strong
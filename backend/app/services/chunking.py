@@ -0,0 +1,111 @@
+"""
+Token-budgeted text chunking for map-reduce summarization.
+"""
+import hashlib
+import re
+from typing import Iterator, List, Optional
+
+# Rough average for English text; good enough for budgeting model context
+CHARS_PER_TOKEN = 4
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of model tokens in ``text``."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _word_windows(text: str, max_tokens: int) -> Iterator[str]:
+    words = text.split()
+    window: List[str] = []
+    size = 0
+    for word in words:
+        tokens = estimate_tokens(word) + 1
+        if window and size + tokens > max_tokens:
+            yield " ".join(window)
+            window, size = [], 0
+        window.append(word)
+        size += tokens
+    if window:
+        yield " ".join(window)
+
+
+def _units(text: str, max_tokens: int) -> Iterator[str]:
+    """Split text into paragraphs, breaking oversized ones into sentences or words."""
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            yield paragraph
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            if estimate_tokens(sentence) <= max_tokens:
+                yield sentence
+            else:
+                yield from _word_windows(sentence, max_tokens)
+
+
+def _is_boundary(unit: str) -> bool:
+    # Content-defined cut points: whether a chunk may end after this unit
+    # depends only on the unit itself, so an edit early in a document
+    # doesn't shift every later chunk boundary (and invalidate its cache)
+    return hashlib.blake2b(unit.encode(), digest_size=2).digest()[0] % 4 == 0
+
+
+class Chunker:
+    """Incremental ``split_into_chunks``: text is fed piece by piece.
+
+    Pieces are treated as separated by paragraph breaks, so feeding a
+    document's pages gives the same chunks as splitting the pages joined
+    with blank lines. Each chunk is returned as soon as it is complete.
+    """
+
+    def __init__(self, max_tokens: int, overlap_tokens: int = 0):
+        self.overlap_tokens = overlap_tokens
+        self._budget = max(max_tokens - overlap_tokens, 1)
+        self._current: List[str] = []
+        self._size = 0
+        self._previous: Optional[str] = None
+
+    def feed(self, text: str) -> List[str]:
+        """Add text, returning the chunks it completed."""
+        chunks = []
+        for unit in _units(text, self._budget):
+            tokens = estimate_tokens(unit) + 1
+            if self._current and self._size + tokens > self._budget:
+                chunks.append(self._cut())
+            self._current.append(unit)
+            self._size += tokens
+            if self._size >= self._budget // 2 and _is_boundary(unit):
+                chunks.append(self._cut())
+        return chunks
+
+    def close(self) -> List[str]:
+        """Return the final, partly filled chunk (if any)."""
+        return [self._cut()] if self._current else []
+
+    def _cut(self) -> str:
+        body = "\n\n".join(self._current)
+        self._current, self._size = [], 0
+        previous, self._previous = self._previous, body
+        if previous is None or not self.overlap_tokens:
+            return body
+        tail = previous[-self.overlap_tokens * CHARS_PER_TOKEN:]
+        # Start the overlap on a word boundary
+        tail = tail.split(" ", 1)[-1] if " " in tail else tail
+        return f"{tail}\n\n{body}"
+
+
+def split_into_chunks(text: str, max_tokens: int, overlap_tokens: int = 0) -> List[str]:
+    """Split text into chunks of at most ``max_tokens`` estimated tokens.
+
+    Chunks are built from whole paragraphs (or sentences, for paragraphs over
+    budget) and end at content-defined boundaries once at least half full.
+    Each chunk after the first starts with roughly ``overlap_tokens`` of the
+    previous chunk's tail so context carries across the cut.
+    """
+    chunker = Chunker(max_tokens, overlap_tokens)
+    return chunker.feed(text) + chunker.close()
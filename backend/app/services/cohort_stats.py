@@ -0,0 +1,214 @@
+"""
+Anonymous cohort statistics for peer comparison.
+
+Mergeable summaries per metric and subject (plus an ``ALL_SUBJECTS``
+summary) make "where do I stand" a percentile lookup instead of a scan over
+everyone's history:
+
+- ``SESSION_MINUTES``: a quantile sketch of study session lengths, one
+  value per session.
+- ``USER_QUIZ_AVERAGE``: a ``ScoreHistogram`` of students' average quiz
+  scores, one value per student. When an attempt moves a student's
+  average, the old value is withdrawn and the new one added (``replace``).
+
+Each worker process keeps two sets of summaries: ``base``, the cohort as of
+the last sync, and ``delta``, what this worker has recorded since. ``sync``
+merges the delta into a shared snapshot file under an exclusive lock and
+reloads the result as the new base, so any number of workers contribute
+without double counting, and the cohort survives restarts. On platforms
+with no file locking the snapshot is not used and each worker keeps its
+own in-memory cohort.
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import IO, Callable, Dict, Optional, Tuple, Union
+
+from app.core.config import settings
+from app.core.sketch import KLLSketch, ScoreHistogram
+
+USER_QUIZ_AVERAGE = "user_quiz_average"
+SESSION_MINUTES = "session_minutes"
+ALL_SUBJECTS = "*"
+
+# Metrics whose values are replaced rather than accumulated
+REPLACEABLE_METRICS = {USER_QUIZ_AVERAGE}
+
+SketchKey = Tuple[str, str]
+Summary = Union[KLLSketch, ScoreHistogram]
+
+logger = logging.getLogger(__name__)
+
+
+def _file_lock() -> Optional[Callable[[IO], None]]:
+    """Blocking exclusive file lock for this platform, or None if it has none.
+
+    Imported lazily: ``fcntl`` is POSIX-only and ``msvcrt`` Windows-only.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        pass
+    else:
+        return lambda f: fcntl.flock(f, fcntl.LOCK_EX)
+    try:
+        import msvcrt
+    except ImportError:
+        return None
+
+    def lock(f: IO) -> None:
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                # LK_LOCK gives up after ten one-second attempts; keep waiting
+                continue
+    return lock
+
+
+def _new(metric: str) -> Summary:
+    return ScoreHistogram() if metric in REPLACEABLE_METRICS else KLLSketch(k=settings.SKETCH_K)
+
+
+def _load(path: Path) -> Dict[SketchKey, Summary]:
+    if not path.exists() or path.stat().st_size == 0:
+        return {}
+    try:
+        data = json.loads(path.read_text())
+        return {
+            (entry["metric"], entry["subject"]): type(_new(entry["metric"])).from_dict(entry["sketch"])
+            for entry in data["sketches"]
+        }
+    except (ValueError, KeyError, TypeError) as e:
+        # Set the unreadable snapshot aside rather than failing every sync
+        quarantine = path.with_suffix(".corrupt")
+        logger.warning("Cohort snapshot %s is unreadable (%s); moved to %s", path, e, quarantine)
+        os.replace(path, quarantine)
+        return {}
+
+
+def _dump(path: Path, sketches: Dict[SketchKey, Summary]) -> None:
+    payload = {
+        "sketches": [
+            {"metric": metric, "subject": subject, "sketch": sketch.to_dict()}
+            for (metric, subject), sketch in sketches.items()
+        ]
+    }
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+def _merged(metric: str, *parts: Optional[Summary]) -> Summary:
+    sketch = _new(metric)
+    for part in parts:
+        if part is not None:
+            sketch.merge(part)
+    return sketch
+
+
+class CohortStats:
+    """Per-metric, per-subject cohort summaries shared across workers."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self._base: Dict[SketchKey, Summary] = {}
+        self._delta: Dict[SketchKey, Summary] = {}
+        # Base merged with delta, rebuilt lazily after an update
+        self._views: Dict[SketchKey, Summary] = {}
+        self._lock = asyncio.Lock()
+
+    def _delta_for(self, key: SketchKey) -> Summary:
+        self._views.pop(key, None)
+        sketch = self._delta.get(key)
+        if sketch is None:
+            sketch = self._delta[key] = _new(key[0])
+        return sketch
+
+    def record(self, metric: str, subject: str, value: float) -> None:
+        """Add one observation for ``subject`` and for all subjects."""
+        for key in ((metric, subject), (metric, ALL_SUBJECTS)):
+            self._delta_for(key).update(value)
+
+    def replace(self, metric: str, subject: str, old: Optional[float], new: float) -> None:
+        """Replace one student's value (``old`` is None if they had none)."""
+        histogram = self._delta_for((metric, subject))
+        if old is not None:
+            histogram.add(old, -1)
+        histogram.add(new)
+
+    def sketch(self, metric: str, subject: str = ALL_SUBJECTS) -> Optional[Summary]:
+        """Cohort summary for a metric and subject, or None with no data."""
+        key = (metric, subject)
+        view = self._views.get(key)
+        if view is None:
+            base, delta = self._base.get(key), self._delta.get(key)
+            if base is None and delta is None:
+                return None
+            view = self._views[key] = _merged(metric, base, delta)
+        return view if view.count > 0 else None
+
+    def percentile(self, metric: str, subject: str, value: float) -> Optional[float]:
+        """Percentile rank of ``value`` in the cohort (None with no data).
+
+        Ties count half, so matching everyone (or being the only student)
+        is the 50th percentile.
+        """
+        sketch = self.sketch(metric, subject)
+        if not sketch:
+            return None
+        return round((sketch.rank(value, inclusive=False) + sketch.rank(value)) * 50, 1)
+
+    def average(self, metric: str, subject: str = ALL_SUBJECTS) -> Optional[float]:
+        """Cohort mean (None with no data)."""
+        sketch = self.sketch(metric, subject)
+        return sketch.mean if sketch else None
+
+    def subjects(self, metric: str) -> list:
+        """Subjects with data for a metric."""
+        keys = self._base.keys() | self._delta.keys()
+        return sorted(subject for m, subject in keys if m == metric and subject != ALL_SUBJECTS)
+
+    def _sync_file(self, delta: Dict[SketchKey, Summary]) -> Dict[SketchKey, Summary]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "w") as lock:
+            _file_lock()(lock)
+            merged = _load(self.path)
+            for key, sketch in delta.items():
+                merged[key] = _merged(key[0], merged.get(key), sketch)
+            if delta:
+                _dump(self.path, merged)
+            return merged
+
+    async def sync(self) -> None:
+        """Publish this worker's delta and pick up everyone else's."""
+        if self.path is None or _file_lock() is None:
+            return
+        async with self._lock:
+            delta, self._delta = self._delta, {}
+            try:
+                base = await asyncio.to_thread(self._sync_file, delta)
+            except BaseException:
+                # Keep the unpublished observations for the next attempt
+                for key, sketch in delta.items():
+                    self._delta[key] = _merged(key[0], sketch, self._delta.get(key))
+                raise
+            self._base = base
+            self._views = {}
+
+    async def run_sync_loop(self) -> None:
+        """Sync every ``SKETCH_SYNC_SECONDS`` until cancelled."""
+        while True:
+            await asyncio.sleep(settings.SKETCH_SYNC_SECONDS)
+            try:
+                await self.sync()
+            except OSError:
+                logger.exception("Cohort snapshot sync failed")
+
+
+cohort_stats = CohortStats(settings.SKETCH_SNAPSHOT_PATH or None)
@@ -0,0 +1,93 @@
+"""
+Quiz grading against compiled answer keys.
+
+A quiz is compiled once into an ``AnswerKey``: question ids and correct
+answers packed in question order, as a tuple and as a NumPy array of small
+integer answer codes. A single submission is scored by comparing the
+packed tuples; many submissions are encoded into one code matrix and
+compared against the key at once. Quizzes never change after creation, so
+compiled keys are cached by quiz id.
+"""
+from itertools import chain, repeat
+from operator import eq
+from typing import Dict, Iterator, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+_keys = TTLCache(maxsize=settings.ANSWER_KEY_CACHE_SIZE, ttl=settings.ANSWER_KEY_CACHE_TTL_SECONDS)
+
+
+class AnswerKey:
+    """Compiled answer key for one quiz."""
+
+    def __init__(self, quiz: dict):
+        questions = quiz["questions"]
+        self.question_ids: Tuple[str, ...] = tuple(q["id"] for q in questions)
+        self.correct_answers: Dict[str, str] = {q["id"]: q["correct_answer"] for q in questions}
+        self.answers: Tuple[str, ...] = tuple(self.correct_answers[qid] for qid in self.question_ids)
+        # Answer code 0 is reserved for "unanswered or not an option"
+        choices = sorted({c for q in questions for c in (q["correct_answer"], *q.get("options", {}))})
+        self.choices: Dict[str, int] = {choice: i + 1 for i, choice in enumerate(choices)}
+        self.codes = np.array([self.choices[q["correct_answer"]] for q in questions], dtype=np.uint16)
+        topics = [q.get("topic") or quiz.get("subject") for q in questions]
+        self.topics: List[str] = list(dict.fromkeys(topics))
+        topic_codes = {topic: i for i, topic in enumerate(self.topics)}
+        self.topic_codes = np.array([topic_codes[t] for t in topics], dtype=np.intp)
+
+    def __len__(self) -> int:
+        return len(self.question_ids)
+
+    def _codes(self, answers: Mapping[str, str]) -> Iterator[int]:
+        # C-level lookups only; missing questions and unknown answers map to 0
+        return map(self.choices.get, map(answers.get, self.question_ids), repeat(0))
+
+    def _encode(self, attempts: Sequence[Mapping[str, str]]) -> np.ndarray:
+        codes = chain.from_iterable(map(self._codes, attempts))
+        try:
+            flat = np.fromiter(codes, dtype=np.uint16, count=len(attempts) * len(self))
+        except TypeError:
+            # Unhashable answer values (lists, objects) can never be correct
+            attempts = [{q: a for q, a in answers.items() if isinstance(a, str)} for answers in attempts]
+            return self._encode(attempts)
+        return flat.reshape(len(attempts), len(self))
+
+    def score(self, answers: Mapping[str, str]) -> int:
+        """Number of correct answers in one attempt."""
+        # For a single attempt, comparing the packed tuples beats NumPy's
+        # per-call overhead
+        return sum(map(eq, map(answers.get, self.question_ids), self.answers))
+
+    def grade(self, answers: Mapping[str, str]) -> np.ndarray:
+        """Boolean mask of correctly answered questions, in quiz order."""
+        try:
+            given = np.fromiter(self._codes(answers), dtype=np.uint16, count=len(self))
+        except TypeError:
+            given = self._encode([answers])[0]
+        return given == self.codes
+
+    def grade_many(self, attempts: Sequence[Mapping[str, str]]) -> np.ndarray:
+        """Correctness matrix with one row per attempt."""
+        return self._encode(attempts) == self.codes
+
+    def topic_counts(self, correct: np.ndarray) -> List[Tuple[str, int, int]]:
+        """``(topic, correct, answered)`` for each topic in the quiz."""
+        n = len(self.topics)
+        right = np.bincount(self.topic_codes, weights=correct, minlength=n)
+        total = np.bincount(self.topic_codes, minlength=n)
+        return [(topic, int(right[i]), int(total[i])) for i, topic in enumerate(self.topics)]
+
+
+def compile_answer_key(quiz: dict) -> AnswerKey:
+    """Compile a quiz's answer key and cache it by quiz id."""
+    key = AnswerKey(quiz)
+    _keys.set(quiz["id"], key)
+    return key
+
+
+def answer_key(quiz: dict) -> AnswerKey:
+    """Compiled answer key for a quiz, compiling it on first use."""
+    key = _keys.get(quiz["id"])
+    return key if key is not None else compile_answer_key(quiz)
@@ -0,0 +1,116 @@
+"""
+Per-user question bank for fast quiz assembly.
+
+Generated MCQs (from notes and quizzes) are kept in the ``question_bank``
+collection, indexed by subject, topic and difficulty, each with a
+difficulty ``rating`` for adaptive quizzes (see ``adaptive``). A question
+is stored once per user: its ``hash`` covers the user and the normalized
+question text, and is a unique field, so rewordings that differ only in
+case, spacing or punctuation are dropped on insert.
+
+Placeholder questions (no AI provider configured) are only banked where
+a caller asks for them (adaptive quizzes, which can only serve banked
+questions); they are flagged and never sampled into regular quizzes.
+"""
+import hashlib
+import random
+import re
+from collections import defaultdict
+from datetime import datetime
+from itertools import chain, islice, zip_longest
+from typing import Iterable, List, Optional
+
+from app.core.ids import new_id
+from app.db.base import DuplicateKeyError
+from app.db.storage import storage
+from app.services.adaptive import index_item, initial_item_rating
+from app.services.ai_client import ai_client
+from app.services.mcq_generation import DIFFICULTIES
+
+MCQ_FIELDS = ("question", "options", "correct_answer", "explanation", "difficulty", "topic")
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def question_hash(user_id: str, question: str) -> str:
+    """Dedup key for a question, ignoring case, spacing and punctuation."""
+    normalized = _WHITESPACE.sub(" ", _PUNCTUATION.sub("", question)).strip().lower()
+    return hashlib.sha256(f"{user_id}\n{normalized}".encode()).hexdigest()
+
+
+async def add_questions(
+    user_id: str,
+    mcqs: Iterable[dict],
+    subject: str,
+    topic: str,
+    source: str,
+    source_id: str,
+    placeholders: bool = False,
+) -> int:
+    """Bank MCQs, skipping questions the user already has. Returns the number added.
+
+    Without an AI provider the MCQs are placeholders and are skipped unless
+    ``placeholders`` is set.
+    """
+    if not ai_client.configured and not placeholders:
+        return 0
+    added = 0
+    created_at = datetime.utcnow().isoformat()
+    for mcq in mcqs:
+        difficulty = mcq.get("difficulty", "medium")
+        try:
+            item = await storage.question_bank.insert({
+                "id": new_id("item"),
+                "user_id": user_id,
+                "hash": question_hash(user_id, mcq["question"]),
+                "subject": subject,
+                "topic": mcq.get("topic") or topic,
+                "difficulty": difficulty,
+                "rating": initial_item_rating(difficulty),
+                "question": mcq["question"],
+                "options": mcq["options"],
+                "correct_answer": mcq["correct_answer"],
+                "explanation": mcq.get("explanation", ""),
+                "source": source,
+                "source_id": source_id,
+                "placeholder": not ai_client.configured,
+                "created_at": created_at,
+            })
+        except DuplicateKeyError:
+            continue
+        index_item(item)
+        added += 1
+    return added
+
+
+async def sample_questions(
+    user_id: str,
+    subject: str,
+    topic: Optional[str],
+    difficulty: str,
+    count: int,
+) -> List[dict]:
+    """Draw up to ``count`` banked MCQs, balanced across difficulties and topics.
+
+    ``difficulty="mixed"`` draws from every difficulty; without a ``topic``
+    every topic in the subject is eligible. Candidates are grouped by
+    (difficulty, topic) and picked round-robin from shuffled groups, so no
+    single group dominates the quiz.
+    """
+    filters = {"user_id": user_id, "subject": subject}
+    if topic:
+        filters["topic"] = topic
+    levels = DIFFICULTIES if difficulty == "mixed" else [difficulty]
+
+    groups = defaultdict(list)
+    for level in levels:
+        for item in await storage.question_bank.find(difficulty=level, **filters):
+            if not item.get("placeholder"):
+                groups[(level, item["topic"])].append(item)
+    for items in groups.values():
+        random.shuffle(items)
+
+    rounds = chain.from_iterable(zip_longest(*groups.values()))
+    picked = islice((item for item in rounds if item is not None), count)
+    return [{field: item[field] for field in MCQ_FIELDS} for item in picked]
@@ -0,0 +1,247 @@
+"""
+In-process background jobs for long-running AI generation.
+
+Endpoints that call the model accept ``?background=true``: the work is queued
+on the shared ``job_runner`` and a job ID is returned immediately. Clients
+then poll ``/api/v1/jobs/{job_id}`` or subscribe to its Server-Sent Events
+stream for progress and partial results.
+
+Jobs live in the memory of the worker that accepted them. At most
+``JOB_QUEUE_SIZE`` jobs wait for a slot; further submissions get a 503.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.ids import new_id
+
+ProgressFn = Callable[..., None]
+Work = Callable[[ProgressFn], Awaitable[Any]]
+Cleanup = Callable[[], None]
+
+TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+def _no_progress(progress: float, message: str = "", partial: Any = None) -> None:
+    pass
+
+
+class Job:
+    """A queued unit of work with status, progress and an event history."""
+
+    def __init__(self, user_id: str, kind: str):
+        self.id = new_id("job")
+        self.user_id = user_id
+        self.kind = kind
+        self.status = "queued"
+        self.progress = 0.0
+        self.message = ""
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow().isoformat()
+        self.finished_at: Optional[float] = None
+        self.events: List[dict] = []
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._emit("queued")
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def report(self, progress: float, message: str = "", partial: Any = None) -> None:
+        """Record progress (0-1) and optionally a partial result."""
+        self.progress = max(0.0, min(1.0, progress))
+        self.message = message
+        event = {"progress": self.progress, "message": message}
+        if partial is not None:
+            event["partial"] = jsonable_encoder(partial)
+        self._emit("progress", event)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+        }
+
+    async def stream(self, heartbeat: float = 15.0) -> AsyncIterator[Optional[dict]]:
+        """Yield past and future events until the job finishes.
+
+        Yields ``None`` when no event arrived within ``heartbeat`` seconds so
+        callers can keep idle connections alive.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        history = list(self.events)
+        self._subscribers.add(queue)
+        try:
+            for event in history:
+                yield event
+            if self.done:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield event
+                if event["event"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            self._subscribers.discard(queue)
+
+    def _emit(self, name: str, data: Optional[dict] = None) -> None:
+        event = {"event": name, "status": self.status, **(data or {})}
+        self.events.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+
+class JobRunner:
+    """Runs jobs as asyncio tasks with bounded concurrency and queue length.
+
+    Finished jobs are kept for ``result_ttl`` seconds so clients can collect
+    their results, then pruned.
+    """
+
+    def __init__(self, concurrency: int, result_ttl: float, queue_size: int):
+        self.result_ttl = result_ttl
+        self.queue_size = queue_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._queued = 0
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, user_id: str, kind: str, work: Work, cleanup: Optional[Cleanup] = None) -> Job:
+        """Queue ``work`` and return its job immediately.
+
+        ``cleanup`` runs once the job is over, however it ends (even if it is
+        cancelled before ``work`` starts). Raises ``HTTPException(503)``
+        when ``queue_size`` jobs are already waiting.
+        """
+        self._prune()
+        if self._queued >= self.queue_size:
+            if cleanup is not None:
+                cleanup()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many jobs queued, try again later"
+            )
+        job = Job(user_id, kind)
+        self._jobs[job.id] = job
+        self._queued += 1
+        task = asyncio.create_task(self._run(job, work))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._finished(job))
+        if cleanup is not None:
+            task.add_done_callback(lambda _: cleanup())
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by id."""
+        return self._jobs.get(job_id)
+
+    def for_user(self, user_id: str) -> List[Job]:
+        """Get the jobs submitted by a user, oldest first."""
+        self._prune()
+        return [job for job in self._jobs.values() if job.user_id == user_id]
+
+    async def shutdown(self) -> None:
+        """Cancel running jobs."""
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def _run(self, job: Job, work: Work) -> None:
+        async with self._semaphore:
+            self._queued -= 1
+            job.status = "running"
+            job._emit("running")
+            try:
+                result = await work(job.report)
+            except asyncio.CancelledError:
+                self._cancelled(job)
+                raise
+            except Exception as e:
+                job.status = "failed"
+                job.error = getattr(e, "detail", None) or str(e) or type(e).__name__
+                job._emit("failed", {"error": job.error})
+            else:
+                job.status = "succeeded"
+                job.progress = 1.0
+                job.result = jsonable_encoder(result)
+                job._emit("succeeded", {"progress": 1.0, "result": job.result})
+            finally:
+                job.finished_at = time.monotonic()
+
+    def _finished(self, job: Job) -> None:
+        self._tasks.pop(job.id, None)
+        if job.status == "queued":
+            # Cancelled while waiting for a slot (possibly before it ever ran)
+            self._queued -= 1
+            self._cancelled(job)
+            job.finished_at = time.monotonic()
+
+    def _cancelled(self, job: Job) -> None:
+        job.status = "cancelled"
+        job.error = "Job cancelled"
+        job._emit("cancelled", {"error": job.error})
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+job_runner = JobRunner(
+    concurrency=settings.JOB_CONCURRENCY,
+    result_ttl=settings.JOB_RESULT_TTL_SECONDS,
+    queue_size=settings.JOB_QUEUE_SIZE,
+)
+
+
+async def run_or_enqueue(
+    kind: str,
+    current_user: dict,
+    background: bool,
+    work: Work,
+    cleanup: Optional[Cleanup] = None,
+):
+    """Run ``work`` inline, or queue it and return ``202 Accepted`` with the job ID.
+
+    ``cleanup`` (e.g. removing a spooled upload ``work`` reads) always runs
+    once the work is over or can no longer start.
+    """
+    if not background:
+        try:
+            return await work(_no_progress)
+        finally:
+            if cleanup is not None:
+                cleanup()
+
+    job = job_runner.submit(current_user["id"], kind, work, cleanup)
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/api/v1/jobs/{job.id}",
+            "events_url": f"/api/v1/jobs/{job.id}/events",
+        },
+    )
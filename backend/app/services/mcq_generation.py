@@ -0,0 +1,131 @@
+"""
+Multiple-choice question generation.
+"""
+import json
+from typing import AsyncIterator, Iterator, List
+
+from app.services.ai_client import ai_client
+
+DIFFICULTIES = ["easy", "medium", "hard"]
+OPTION_KEYS = ["a", "b", "c", "d"]
+
+MCQ_SYSTEM_PROMPT = (
+    "You write multiple-choice questions for students. Each question has exactly "
+    "four options keyed a, b, c and d with a single correct answer. Respond with JSON only."
+)
+
+
+def _difficulty(difficulty: str, i: int) -> str:
+    return difficulty if difficulty != "mixed" else DIFFICULTIES[i % 3]
+
+
+def _placeholder_mcqs(count: int, difficulty: str, about: str) -> List[dict]:
+    return [
+        {
+            "question": f"Sample question {i + 1} about {about}?",
+            "options": {key: f"Option {key.upper()} for question {i + 1}" for key in OPTION_KEYS},
+            "correct_answer": OPTION_KEYS[i % 4],
+            "explanation": f"Explanation for question {i + 1}",
+            "difficulty": _difficulty(difficulty, i),
+        }
+        for i in range(count)
+    ]
+
+
+def _valid_mcq(item) -> bool:
+    return (
+        isinstance(item, dict)
+        and isinstance(item.get("question"), str)
+        and isinstance(item.get("options"), dict)
+        and sorted(item["options"]) == OPTION_KEYS
+        and item.get("correct_answer") in OPTION_KEYS
+    )
+
+
+def _prompt(material: str, count: int, difficulty: str, about: str) -> str:
+    level = "a mix of easy, medium and hard" if difficulty == "mixed" else difficulty
+    return (
+        f"Write {count} multiple-choice questions of {level} difficulty about {about}, "
+        f"based on the material below. Return {{\"mcqs\": [{{\"question\", \"options\": "
+        f"{{\"a\", \"b\", \"c\", \"d\"}}, \"correct_answer\", \"explanation\", \"difficulty\"}}]}}."
+        f"\n\n{material}"
+    )
+
+
+def _normalize(item: dict, i: int, difficulty: str) -> dict:
+    # ``item`` is the ``i``-th valid question from the model
+    return {
+        "question": item["question"],
+        "options": {key: str(item["options"][key]) for key in OPTION_KEYS},
+        "correct_answer": item["correct_answer"],
+        "explanation": str(item.get("explanation", "")),
+        "difficulty": item.get("difficulty") if item.get("difficulty") in DIFFICULTIES else _difficulty(difficulty, i),
+    }
+
+
+class _ArrayItems:
+    """Incrementally parses the items of the first JSON array in streamed text."""
+
+    def __init__(self):
+        self._text = ""
+        self._pos = -1
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, text: str) -> Iterator:
+        """Add streamed text and yield each array item completed by it."""
+        self._text += text
+        if self._pos < 0:
+            start = self._text.find("[")
+            if start < 0:
+                return
+            self._pos = start + 1
+        while True:
+            while self._pos < len(self._text) and self._text[self._pos] in " \t\r\n,":
+                self._pos += 1
+            if self._pos >= len(self._text) or self._text[self._pos] == "]":
+                return
+            try:
+                item, end = self._decoder.raw_decode(self._text, self._pos)
+            except json.JSONDecodeError:
+                # Incomplete item: wait for more text
+                return
+            self._pos = end
+            yield item
+
+
+async def generate_mcqs(material: str, count: int, difficulty: str = "mixed", about: str = "the content") -> List[dict]:
+    """Generate up to ``count`` MCQs (without ids) from study material.
+
+    Each MCQ has ``question``, ``options``, ``correct_answer``, ``explanation``
+    and ``difficulty``. Malformed questions from the model are dropped, so
+    fewer than ``count`` may be returned. Without an AI provider, placeholder
+    questions about ``about`` are returned.
+    """
+    if count <= 0:
+        return []
+    if not ai_client.configured:
+        return _placeholder_mcqs(count, difficulty, about)
+
+    data = await ai_client.generate_json(_prompt(material, count, difficulty, about), system=MCQ_SYSTEM_PROMPT)
+    valid = (item for item in data.get("mcqs", []) if _valid_mcq(item))
+    return [_normalize(item, i, difficulty) for i, item in enumerate(valid)][:count]
+
+
+async def stream_mcqs(material: str, count: int, difficulty: str = "mixed", about: str = "the content") -> AsyncIterator[dict]:
+    """Like ``generate_mcqs``, but yield each MCQ as soon as the model has written it."""
+    if count <= 0:
+        return
+    if not ai_client.configured:
+        for mcq in _placeholder_mcqs(count, difficulty, about):
+            yield mcq
+        return
+
+    items = _ArrayItems()
+    valid = 0
+    async for text in ai_client.generate_stream(
+        _prompt(material, count, difficulty, about), system=MCQ_SYSTEM_PROMPT, max_tokens=2048, json_mode=True
+    ):
+        for item in items.feed(text):
+            if _valid_mcq(item) and valid < count:
+                yield _normalize(item, valid, difficulty)
+                valid += 1
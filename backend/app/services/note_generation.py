@@ -0,0 +1,227 @@
+"""
+Note generation (key points, summary and MCQs) behind a content-hash cache.
+"""
+import asyncio
+import copy
+import hashlib
+import re
+from typing import AsyncIterator, Iterator, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.services.ai_client import ai_client
+from app.services.mcq_generation import stream_mcqs
+from app.services.summarization import summarize_document_stream
+
+# Generated content keyed by normalized content hash or video ID
+note_cache = TTLCache(maxsize=settings.NOTE_CACHE_SIZE, ttl=settings.NOTE_CACHE_TTL_SECONDS)
+
+# Generations in progress, keyed like the cache, so identical concurrent
+# requests share one model call
+note_flights = SingleFlight()
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def text_cache_key(content: str) -> str:
+    """Cache key for text content, ignoring case and whitespace differences."""
+    normalized = _WHITESPACE.sub(" ", content).strip().lower()
+    return f"text:{hashlib.sha256(normalized.encode()).hexdigest()}"
+
+
+def video_cache_key(video_id: str, language: Optional[str] = None) -> str:
+    """Cache key for a YouTube video (and transcript language, if chosen)."""
+    return f"youtube:{video_id}:{language}" if language else f"youtube:{video_id}"
+
+
+NOTE_MCQ_COUNT = 5
+
+
+def _generate(source_type: str, content: str) -> dict:
+    # Placeholder content used when no AI provider is configured
+    if source_type == "youtube":
+        return {
+            "key_points": [
+                "Key concept from video",
+                "Important explanation point",
+                "Practical demonstration summary",
+                "Key takeaway 1",
+                "Key takeaway 2"
+            ],
+            "summary": "AI-generated summary of the YouTube video content. The video covers important topics with practical demonstrations.",
+            "mcqs": [
+                {
+                    "id": "mcq_1",
+                    "question": "Based on the video, what is the correct approach?",
+                    "options": {"a": "Approach A", "b": "Approach B", "c": "Approach C", "d": "Approach D"},
+                    "correct_answer": "b",
+                    "explanation": "As explained in the video...",
+                    "difficulty": "medium"
+                }
+            ],
+        }
+    if source_type == "pdf":
+        return {
+            "key_points": [
+                "Main concept from PDF",
+                "Key definition or formula",
+                "Important theorem or principle",
+                "Application example",
+                "Summary of chapter"
+            ],
+            "summary": "AI-generated summary of the document. The document covers fundamental concepts with detailed explanations.",
+            "mcqs": [
+                {
+                    "id": "mcq_1",
+                    "question": "Based on the document, which statement is correct?",
+                    "options": {"a": "Statement A", "b": "Statement B", "c": "Statement C", "d": "Statement D"},
+                    "correct_answer": "a",
+                    "explanation": "According to the document...",
+                    "difficulty": "medium"
+                },
+                {
+                    "id": "mcq_2",
+                    "question": "What is the key formula mentioned?",
+                    "options": {"a": "E = mc²", "b": "F = ma", "c": "V = IR", "d": "PV = nRT"},
+                    "correct_answer": "b",
+                    "explanation": "The document emphasizes this formula for...",
+                    "difficulty": "easy"
+                }
+            ],
+        }
+    return {
+        "key_points": [
+            "Main concept explanation from the content",
+            "Key terminology and definitions",
+            "Important relationships between concepts",
+            "Practical applications mentioned",
+            "Summary of main arguments"
+        ],
+        "summary": f"AI-generated summary of the provided content. The content covers key concepts and their relationships. {content[:200]}...",
+        "mcqs": [
+            {
+                "id": "mcq_1",
+                "question": "What is the main topic discussed in this content?",
+                "options": {"a": "Option A", "b": "Option B", "c": "Option C", "d": "Option D"},
+                "correct_answer": "a",
+                "explanation": "This is the correct answer because...",
+                "difficulty": "medium"
+            }
+        ],
+    }
+
+
+def empty_note_content() -> dict:
+    """Empty generated-content skeleton to accumulate stream events into."""
+    return {"key_points": [], "summary": "", "mcqs": []}
+
+
+def apply_note_event(generated: dict, event: dict) -> None:
+    """Accumulate a ``stream_note_content`` event into generated content.
+
+    ``section`` events are progress only and leave the content unchanged.
+    """
+    if event["type"] == "summary":
+        generated["summary"] += event["delta"]
+    elif event["type"] == "key_point":
+        generated["key_points"].append(event["text"])
+    elif event["type"] == "mcq":
+        generated["mcqs"].append(event["mcq"])
+
+
+async def _generate_stream(source_type: str, content: str) -> AsyncIterator[dict]:
+    # Section summaries go out as the summarizer finishes each chunk and the
+    # combined summary as it streams from the model; key points follow, then
+    # each MCQ as soon as the model has written it
+    generated = _generate(source_type, content)
+    summary_streamed = False
+    async for event in summarize_document_stream(content):
+        if event["type"] == "section":
+            yield event
+        elif event["type"] == "summary":
+            summary_streamed = True
+            yield event
+        else:
+            if event["summary"]:
+                generated["summary"] = event["summary"]
+            if event["key_points"]:
+                generated["key_points"] = event["key_points"]
+    if not summary_streamed:
+        yield {"type": "summary", "delta": generated["summary"]}
+    for i, point in enumerate(generated["key_points"]):
+        yield {"type": "key_point", "index": i, "text": point}
+    if ai_client.configured:
+        i = 0
+        async for mcq in stream_mcqs(generated["summary"], NOTE_MCQ_COUNT):
+            yield {"type": "mcq", "index": i, "mcq": {"id": f"mcq_{i + 1}", **mcq}}
+            i += 1
+    else:
+        for i, mcq in enumerate(generated["mcqs"]):
+            yield {"type": "mcq", "index": i, "mcq": mcq}
+
+
+def _replay(generated: dict) -> Iterator[dict]:
+    yield {"type": "summary", "delta": generated["summary"]}
+    for i, point in enumerate(generated["key_points"]):
+        yield {"type": "key_point", "index": i, "text": point}
+    for i, mcq in enumerate(generated["mcqs"]):
+        yield {"type": "mcq", "index": i, "mcq": mcq}
+
+
+async def stream_note_content(cache_key: str, source_type: str, content: str) -> AsyncIterator[dict]:
+    """Yield generated note content incrementally.
+
+    Events are ``{"type": "section", "index": int, "summary": str,
+    "key_point": str}`` for each chunk summary as it is produced (misses
+    only), then ``{"type": "summary", "delta": str}`` (several, as the
+    summary streams from the model), ``{"type":
+    "key_point", "index": int, "text": str}`` and ``{"type": "mcq", "index":
+    int, "mcq": dict}``. Cache hits replay the stored content at once; misses
+    populate the cache when complete.
+    Requests for a key that is already being generated wait for that
+    generation and then replay it.
+    """
+    cached = note_cache.get(cache_key)
+    if cached is not None:
+        for event in _replay(copy.deepcopy(cached)):
+            yield event
+        return
+
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def produce() -> dict:
+        generated = empty_note_content()
+        try:
+            async for event in _generate_stream(source_type, content):
+                apply_note_event(generated, event)
+                events.put_nowait(copy.deepcopy(event))
+        finally:
+            events.put_nowait(None)
+        note_cache.set(cache_key, generated)
+        return generated
+
+    leader = cache_key not in note_flights
+    flight = note_flights.do(cache_key, produce)
+    try:
+        if leader:
+            while (event := await events.get()) is not None:
+                yield event
+            await flight
+        else:
+            for event in _replay(copy.deepcopy(await flight)):
+                yield event
+    finally:
+        # Stop waiting if the consumer goes away; the shared generation carries on
+        flight.cancel()
+
+
+async def generate_note_content(cache_key: str, source_type: str, content: str) -> dict:
+    """Generate key points, summary and MCQs, reusing cached results.
+
+    Returns a fresh copy so callers can store or modify it freely.
+    """
+    generated = empty_note_content()
+    async for event in stream_note_content(cache_key, source_type, content):
+        apply_note_event(generated, event)
+    return generated
@@ -0,0 +1,134 @@
+"""
+PDF text extraction.
+
+Uploads are streamed to a temp file on disk and pages are extracted in a
+process pool, so large documents use every core without blocking the
+event loop. Uploads are hashed while they are spooled, so a repeat upload
+of the same file can reuse its extracted text (``pdf_text_cache``).
+"""
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+from fastapi import HTTPException, UploadFile, status
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Extracted text keyed by the SHA-256 of the uploaded bytes
+pdf_text_cache = TTLCache(maxsize=settings.PDF_TEXT_CACHE_SIZE, ttl=settings.NOTE_CACHE_TTL_SECONDS)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Forkserver children start clean rather than forking the running server
+        # (its event loop, sockets and threads); spawn where there is no forkserver
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.PDF_WORKERS or None,
+            mp_context=multiprocessing.get_context(method),
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Shut down the extraction process pool."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+def _page_count(path: str) -> int:
+    with fitz.open(path) as doc:
+        return doc.page_count
+
+
+def _extract_pages(path: str, start: int, stop: int) -> List[str]:
+    with fitz.open(path) as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+
+async def spool_upload(file: UploadFile, max_size: Optional[int] = None) -> Tuple[str, str]:
+    """Stream an upload to a temp file, enforcing the size limit.
+
+    ``max_size`` defaults to ``MAX_UPLOAD_SIZE``. Returns the temp file path
+    and the SHA-256 hex digest of the uploaded bytes; the caller is
+    responsible for removing the file (``remove_spool``).
+    """
+    max_size = max_size or settings.MAX_UPLOAD_SIZE
+    if file.size is not None and file.size > max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File exceeds maximum size of {max_size} bytes"
+        )
+
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File exceeds maximum size of {max_size} bytes"
+                    )
+                out.write(chunk)
+                digest.update(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest()
+
+
+def remove_spool(path: str) -> None:
+    """Remove a spooled upload; safe to call more than once."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def iter_pdf_pages(path: str) -> AsyncIterator[Tuple[int, str]]:
+    """Yield ``(page_number, text)`` for each page of a PDF, in order.
+
+    Pages are split into ranges of ``PDF_PAGES_PER_TASK`` and extracted in
+    parallel; each range is yielded as soon as it and all earlier ranges
+    are done.
+    """
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+
+    try:
+        page_count = await loop.run_in_executor(executor, _page_count, path)
+    except RuntimeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Could not read PDF file"
+        )
+
+    step = settings.PDF_PAGES_PER_TASK
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    futures = [
+        loop.run_in_executor(executor, _extract_pages, path, start, stop)
+        for start, stop in ranges
+    ]
+    try:
+        for (start, _), future in zip(ranges, futures):
+            for offset, text in enumerate(await future):
+                yield start + offset + 1, text
+    finally:
+        for future in futures:
+            future.cancel()
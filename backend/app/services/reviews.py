@@ -0,0 +1,229 @@
+"""
+Spaced-repetition review scheduling (SM-2).
+
+Every MCQ a student should remember becomes a card in ``review_cards``:
+questions they got wrong in a quiz, and the MCQs of their notes. Reviewing
+a card grades recall from 0 (blackout) to 5 (perfect); SM-2 turns the
+grade into the next interval and adjusts the card's ease.
+
+Due times are also kept in memory as one min-heap per user, so "what is
+due now" pops only the due cards instead of scanning them all, plus a
+global heap of each user's earliest due time for reminder sweeps. Heap
+entries are never updated in place: rescheduling pushes a new entry and
+stale ones are skipped (and dropped) when they surface. The heaps are
+loaded from storage at startup and are per process, so they are only used
+with the in-memory store, which a single process owns. With MongoDB, other
+workers add and review cards too, and ``due_cards`` queries the indexed
+``due_at`` in storage instead.
+"""
+import heapq
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.db.storage import storage
+
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+PASSING_GRADE = 3
+# Grades inferred from answering a card's question
+CORRECT_GRADE = 4
+WRONG_GRADE = 1
+
+
+def card_id(user_id: str, source_id: str, question_id: str) -> str:
+    """Card ids are deterministic, so a question is never carded twice."""
+    return f"{user_id}:{source_id}:{question_id}"
+
+
+def sm2(card: dict, grade: int, now: datetime) -> dict:
+    """Card changes after a review graded ``0``-``5``."""
+    repetitions = card.get("repetitions", 0)
+    interval = card.get("interval_days", 0)
+    ease = card.get("ease", INITIAL_EASE)
+    lapses = card.get("lapses", 0)
+    if grade < PASSING_GRADE:
+        repetitions, interval, lapses = 0, 1, lapses + 1
+    else:
+        repetitions += 1
+        interval = 1 if repetitions == 1 else 6 if repetitions == 2 else round(interval * ease)
+    ease = max(MIN_EASE, ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    return {
+        "repetitions": repetitions,
+        "interval_days": interval,
+        "ease": round(ease, 3),
+        "lapses": lapses,
+        "last_reviewed_at": now.isoformat(),
+        "due_at": (now + timedelta(days=interval)).isoformat(),
+    }
+
+
+class ReviewScheduler:
+    """Per-user due-time heaps plus a global heap of users' earliest due times."""
+
+    def __init__(self):
+        self._due: Dict[str, Dict[str, str]] = {}  # user -> card -> due_at
+        self._heaps: Dict[str, List[Tuple[str, str]]] = {}  # user -> [(due_at, card)]
+        self._users: List[Tuple[str, str]] = []  # [(earliest due_at, user)]
+
+    @property
+    def active(self) -> bool:
+        """Whether this process sees every card write (in-memory storage)."""
+        return settings.STORAGE_BACKEND != "mongodb"
+
+    async def load(self) -> None:
+        """Rebuild the heaps from stored cards."""
+        self._due, self._heaps, self._users = {}, {}, []
+        if not self.active:
+            return
+        for card in await storage.review_cards.find(projection=("id", "user_id", "due_at")):
+            self._due.setdefault(card["user_id"], {})[card["id"]] = card["due_at"]
+        for user_id in self._due:
+            self._rebuild(user_id)
+        self._rebuild_users()
+
+    def schedule(self, user_id: str, cid: str, due_at: str) -> None:
+        """Set (or move) a card's due time."""
+        if not self.active:
+            return
+        self._due.setdefault(user_id, {})[cid] = due_at
+        heapq.heappush(self._heaps.setdefault(user_id, []), (due_at, cid))
+        self._changed(user_id)
+
+    def remove(self, user_id: str, cid: str) -> None:
+        """Forget a card; its heap entries go stale."""
+        if self._due.get(user_id, {}).pop(cid, None) is not None:
+            self._changed(user_id)
+
+    def _changed(self, user_id: str) -> None:
+        # Compact once stale entries outnumber live ones
+        if len(self._heaps[user_id]) > 2 * len(self._due[user_id]) + 16:
+            self._rebuild(user_id)
+        earliest = self._earliest(user_id)
+        if earliest is not None:
+            heapq.heappush(self._users, (earliest, user_id))
+        if len(self._users) > 2 * len(self._heaps) + 64:
+            self._rebuild_users()
+
+    def _rebuild(self, user_id: str) -> None:
+        heap = self._heaps[user_id] = [(due_at, cid) for cid, due_at in self._due[user_id].items()]
+        heapq.heapify(heap)
+
+    def _rebuild_users(self) -> None:
+        self._users = [(self._heaps[u][0][0], u) for u in self._heaps if self._earliest(u) is not None]
+        heapq.heapify(self._users)
+
+    def _earliest(self, user_id: str) -> Optional[str]:
+        # Drop stale entries from the top so heap[0] is the real next due card
+        heap, due = self._heaps.get(user_id), self._due.get(user_id, {})
+        while heap and due.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def due(self, user_id: str, now: str, limit: int) -> List[str]:
+        """Ids of up to ``limit`` cards due at ``now``, most overdue first.
+
+        Pops the due entries and pushes them back: ``O(k log n)``.
+        """
+        heap, due = self._heaps.get(user_id, []), self._due.get(user_id, {})
+        found: List[Tuple[str, str]] = []
+        while heap and heap[0][0] <= now and len(found) < limit:
+            entry = heapq.heappop(heap)
+            if due.get(entry[1]) == entry[0]:
+                found.append(entry)
+        for entry in found:
+            heapq.heappush(heap, entry)
+        return [cid for _, cid in found]
+
+    def sweep(self, now: str) -> List[Tuple[str, str]]:
+        """``(user_id, earliest due_at)`` for every user with cards due at ``now``.
+
+        Only users with due cards are visited: ``O(k log n)`` in the number
+        of such users.
+        """
+        due_users: Dict[str, str] = {}
+        while self._users and self._users[0][0] <= now:
+            due_at, user_id = heapq.heappop(self._users)
+            if user_id not in due_users and self._earliest(user_id) == due_at:
+                due_users[user_id] = due_at
+        for user_id, due_at in due_users.items():
+            heapq.heappush(self._users, (due_at, user_id))
+        return sorted(due_users.items(), key=lambda item: item[1])
+
+
+review_scheduler = ReviewScheduler()
+
+
+async def due_cards(user_id: str, now: datetime, limit: int) -> List[dict]:
+    """Up to ``limit`` of the user's cards due at ``now``, most overdue first."""
+    if not review_scheduler.active:
+        return await storage.review_cards.find_until("due_at", now.isoformat(), limit, user_id=user_id)
+    cards = [await storage.review_cards.get(cid) for cid in review_scheduler.due(user_id, now.isoformat(), limit)]
+    return [card for card in cards if card is not None]
+
+
+async def add_cards(
+    user_id: str,
+    source: str,
+    source_id: str,
+    mcqs: Iterable[dict],
+    now: Optional[datetime] = None,
+) -> int:
+    """Card MCQs that are not carded yet, due immediately. Returns the number added."""
+    now = now or datetime.utcnow()
+    added = 0
+    for mcq in mcqs:
+        cid = card_id(user_id, source_id, mcq["id"])
+        if await storage.review_cards.get(cid) is not None:
+            continue
+        card = await storage.review_cards.insert({
+            "id": cid,
+            "user_id": user_id,
+            "source": source,
+            "source_id": source_id,
+            "question": mcq["question"],
+            "options": mcq["options"],
+            "correct_answer": mcq["correct_answer"],
+            "explanation": mcq.get("explanation", ""),
+            "repetitions": 0,
+            "interval_days": 0,
+            "ease": INITIAL_EASE,
+            "lapses": 0,
+            "last_reviewed_at": None,
+            "due_at": now.isoformat(),
+        })
+        review_scheduler.schedule(user_id, cid, card["due_at"])
+        added += 1
+    return added
+
+
+async def review_card(card: dict, grade: int, now: Optional[datetime] = None) -> dict:
+    """Apply a graded review to a card and reschedule it."""
+    card = await storage.review_cards.update(card["id"], sm2(card, grade, now or datetime.utcnow()))
+    review_scheduler.schedule(card["user_id"], card["id"], card["due_at"])
+    return card
+
+
+async def record_quiz_reviews(user_id: str, quiz: dict, answers: Dict[str, str]) -> None:
+    """Feed a quiz attempt into review scheduling.
+
+    Wrongly answered questions become cards (or lapse, if already carded);
+    correct answers count as successful reviews of existing cards.
+    """
+    now = datetime.utcnow()
+    wrong = []
+    for question in quiz["questions"]:
+        correct = answers.get(question["id"]) == question["correct_answer"]
+        card = await storage.review_cards.get(card_id(user_id, quiz["id"], question["id"]))
+        if card is not None:
+            await review_card(card, CORRECT_GRADE if correct else WRONG_GRADE, now)
+        elif not correct:
+            wrong.append(question)
+    await add_cards(user_id, "quiz", quiz["id"], wrong, now)
+
+
+async def remove_cards(user_id: str, source_id: str) -> None:
+    """Drop the cards that came from a deleted note or quiz."""
+    for card in await storage.review_cards.find(projection=("id",), user_id=user_id, source_id=source_id):
+        await storage.review_cards.delete(card["id"])
+        review_scheduler.remove(user_id, card["id"])
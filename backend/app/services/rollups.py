@@ -0,0 +1,141 @@
+"""
+Incrementally maintained analytics rollups.
+
+Events (task completed, quiz submitted, habit logged) add to counters as
+they happen, so analytics read precomputed aggregates instead of scanning
+raw tasks, attempts and logs:
+
+- ``daily_rollups``: per user, UTC day (see ``utc_today``) and subject (``""`` for activity with no
+  subject, such as habits). Ids are ``{user_id}:{date}:{subject}``, so a date
+  window is an id range scan.
+- ``subject_rollups``: all-time totals per user and subject.
+- ``topic_rollups``: per user, subject and topic quiz accuracy.
+
+Each event is also appended to the ``study_events`` history used by the
+columnar report engine (``analytics_engine``), and study session lengths
+and students' quiz averages feed the peer comparison (``cohort_stats``).
+The average last counted in the cohort is kept as ``cohort_average`` on the
+subject rollup (and ``cohort_quiz_average`` on the user for all subjects),
+so the next attempt can withdraw it. ``study_sessions``
+counts the sessions with recorded time, so ``study_minutes /
+study_sessions`` is comparable with the cohort's per-session minutes.
+"""
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from app.db.storage import storage
+from app.services.analytics_engine import record_event
+from app.services.cohort_stats import ALL_SUBJECTS, SESSION_MINUTES, USER_QUIZ_AVERAGE, cohort_stats
+from app.services.grading import answer_key
+
+DEFAULT_SUBJECT = "General"
+
+
+def utc_today() -> date:
+    """Today's day bucket. Days are UTC, like the ``created_at`` timestamps."""
+    return datetime.utcnow().date()
+
+
+async def _add(user_id: str, day: str, subject: str, amounts: Dict[str, float]) -> Optional[dict]:
+    """Add to the day's rollup and return the updated subject rollup."""
+    await storage.daily_rollups.increment(
+        f"{user_id}:{day}:{subject}",
+        amounts,
+        defaults={"user_id": user_id, "date": day, "subject": subject},
+    )
+    if subject:
+        return await storage.subject_rollups.increment(
+            f"{user_id}:{subject}",
+            amounts,
+            defaults={"user_id": user_id, "subject": subject},
+        )
+    return None
+
+
+async def _update_cohort_averages(user_id: str, rollup: dict) -> None:
+    """Move the student's subject and overall quiz averages in the cohort."""
+    subject = rollup["subject"]
+    average = rollup["quiz_score_total"] / rollup["quizzes_taken"]
+    cohort_stats.replace(USER_QUIZ_AVERAGE, subject, rollup.get("cohort_average"), average)
+    await storage.subject_rollups.update(rollup["id"], {"cohort_average": average})
+
+    user = await storage.users.get(user_id)
+    if user is None:
+        return
+    rollups = [r for r in await subject_rollups(user_id) if r.get("quizzes_taken")]
+    overall = sum(r["quiz_score_total"] for r in rollups) / sum(r["quizzes_taken"] for r in rollups)
+    cohort_stats.replace(USER_QUIZ_AVERAGE, ALL_SUBJECTS, user.get("cohort_quiz_average"), overall)
+    await storage.users.update(user_id, {"cohort_quiz_average": overall})
+
+
+async def record_task_completion(user_id: str, task: dict, delta: int = 1) -> None:
+    """Count a completed task (``delta=-1`` when it is reopened).
+
+    The task's ``category`` is its subject and its estimated minutes count
+    as study time, on the day in ``completed_at``.
+    """
+    day = task["completed_at"][:10]
+    subject = task.get("category") or DEFAULT_SUBJECT
+    minutes = delta * (task.get("estimated_minutes") or 0)
+    await _add(user_id, day, subject, {
+        "tasks_completed": delta,
+        "study_minutes": minutes,
+        "study_sessions": delta if minutes else 0,
+    })
+    await record_event(user_id, day, "task", subject, count=delta, minutes=minutes)
+    if minutes > 0:
+        cohort_stats.record(SESSION_MINUTES, subject, minutes)
+
+
+async def record_quiz_attempt(user_id: str, quiz: dict, result: dict) -> None:
+    """Count a quiz attempt, its score and time, and per-topic accuracy.
+
+    Attempts without a measured time (``time_taken_seconds`` of 0) add no
+    study time or session.
+    """
+    day = result["completed_at"][:10]
+    subject = quiz["subject"]
+    minutes = result["time_taken_seconds"] / 60
+    rollup = await _add(user_id, day, subject, {
+        "quizzes_taken": 1,
+        "quiz_score_total": result["percentage"],
+        "study_minutes": minutes,
+        "study_sessions": 1 if minutes > 0 else 0,
+    })
+    await record_event(user_id, day, "quiz", subject, minutes=minutes, score=result["percentage"])
+    if minutes > 0:
+        cohort_stats.record(SESSION_MINUTES, subject, minutes)
+    await _update_cohort_averages(user_id, rollup)
+
+    key = answer_key(quiz)
+    for topic, correct, total in key.topic_counts(key.grade(result["answers"])):
+        await storage.topic_rollups.increment(
+            f"{user_id}:{subject}:{topic}",
+            {"correct": correct, "answered": total},
+            defaults={"user_id": user_id, "subject": subject, "topic": topic},
+        )
+        await record_event(user_id, day, "topic", subject, topic=topic, correct=correct, answered=total)
+
+
+async def record_habit_log(user_id: str, day: str, count: int) -> None:
+    """Count habit completions as (subject-less) activity for the day."""
+    await _add(user_id, day, "", {"habit_completions": count})
+    await record_event(user_id, day, "habit", "", count=count)
+
+
+async def daily_rollups(user_id: str, since: Optional[date] = None) -> List[dict]:
+    """Daily rollups from ``since`` (inclusive) onwards, in date order."""
+    return await storage.daily_rollups.find(
+        after=f"{user_id}:{since.isoformat()}" if since else None,
+        user_id=user_id,
+    )
+
+
+async def subject_rollups(user_id: str) -> List[dict]:
+    """All-time totals per subject."""
+    return await storage.subject_rollups.find(user_id=user_id)
+
+
+async def topic_rollups(user_id: str) -> List[dict]:
+    """Quiz accuracy counters per subject and topic."""
+    return await storage.topic_rollups.find(user_id=user_id)
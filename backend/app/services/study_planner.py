@@ -0,0 +1,155 @@
+"""
+Study plan scheduling.
+
+Each day's study time is split into sessions of up to ``SESSION_MINUTES``
+and handed out greedily, one session at a time, to the subject and topic
+furthest behind their fair share. A topic's share (its weight) grows with
+the subject's priority and with the student's measured weakness in it
+(quiz accuracy from the topic rollups), and is boosted as the subject's
+deadline approaches; topics drop out after their deadline. Subjects are
+picked from a heap, so a plan costs about
+``O(days × (topics + sessions per day × log subjects))``.
+"""
+import heapq
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.services.analytics_engine import MIN_TOPIC_ANSWERS
+from app.services.rollups import subject_rollups, topic_rollups
+
+SESSION_MINUTES = 60
+MIN_SESSION_MINUTES = 15
+PRIORITY_WEIGHTS = {"high": 3.0, "medium": 2.0, "low": 1.0}
+DEFAULT_WEAKNESS = 0.5  # No quiz data yet: assume average
+DEADLINE_WINDOW_DAYS = 14  # Boost ramps up over the last two weeks
+DEADLINE_BOOST = 2.0  # Weight multiplier on the deadline day is 1 + boost
+GENERAL_TOPIC = "General Review"
+
+Weakness = Dict[Tuple[str, Optional[str]], float]
+
+
+@dataclass
+class PlanTopic:
+    """A topic to schedule, with its static weight and deadline."""
+    subject: str
+    topic: str
+    priority: str
+    weight: float
+    deadline: date  # Last day the topic is scheduled
+    exam: bool = False  # Whether the deadline was given (rather than the plan's end)
+    minutes: int = 0
+
+
+async def measured_weakness(user_id: str) -> Weakness:
+    """Weakness in ``[0, 1]`` (1 - quiz accuracy) per (subject, topic).
+
+    ``(subject, None)`` holds the subject-wide value, used for topics with
+    too few answers of their own.
+    """
+    weakness: Weakness = {}
+    for rollup in await subject_rollups(user_id):
+        if rollup.get("quizzes_taken"):
+            average = rollup.get("quiz_score_total", 0) / rollup["quizzes_taken"]
+            weakness[(rollup["subject"], None)] = 1 - average / 100
+    for rollup in await topic_rollups(user_id):
+        if rollup["answered"] >= MIN_TOPIC_ANSWERS:
+            weakness[(rollup["subject"], rollup["topic"])] = 1 - rollup["correct"] / rollup["answered"]
+    return weakness
+
+
+def plan_topics(subjects: Sequence[dict], end: date, weakness: Weakness) -> List[PlanTopic]:
+    """Expand plan subjects into weighted topics.
+
+    Subjects are dicts with ``name``, ``topics``, ``priority`` and an
+    optional ``deadline`` (ISO date; defaults to ``end``).
+    """
+    topics = []
+    for subject in subjects:
+        deadline = min(date.fromisoformat(subject["deadline"]), end) if subject.get("deadline") else end
+        priority = PRIORITY_WEIGHTS.get(subject["priority"], PRIORITY_WEIGHTS["medium"])
+        subject_weakness = weakness.get((subject["name"], None), DEFAULT_WEAKNESS)
+        for topic in subject["topics"] or [GENERAL_TOPIC]:
+            topic_weakness = weakness.get((subject["name"], topic), subject_weakness)
+            topics.append(PlanTopic(
+                subject=subject["name"],
+                topic=topic,
+                priority=subject["priority"],
+                weight=priority * (0.5 + topic_weakness),
+                deadline=deadline,
+                exam=bool(subject.get("deadline")),
+            ))
+    return topics
+
+
+def _urgency(topic: PlanTopic, day: date) -> float:
+    days_left = (topic.deadline - day).days
+    return 1 + DEADLINE_BOOST * max(0.0, 1 - days_left / DEADLINE_WINDOW_DAYS)
+
+
+def _sessions(minutes: int) -> List[int]:
+    sessions = [SESSION_MINUTES] * (minutes // SESSION_MINUTES)
+    if minutes % SESSION_MINUTES >= MIN_SESSION_MINUTES:
+        sessions.append(minutes % SESSION_MINUTES)
+    return sessions
+
+
+def _pick_topic(topics: List[PlanTopic], indexes: List[int], day: date, minutes: int) -> int:
+    return min(indexes, key=lambda i: (topics[i].minutes + minutes) / (topics[i].weight * _urgency(topics[i], day)))
+
+
+def build_schedule(topics: List[PlanTopic], start: date, end: date, minutes_per_day: int) -> List[dict]:
+    """Daily schedules from ``start`` to ``end`` inclusive.
+
+    Sessions go first to the subject, then to the topic within it, that
+    would finish furthest below its weighted share (the smallest
+    ``(minutes + session) / weight``), so each day mixes subjects.
+    Topics accumulate their scheduled minutes in ``PlanTopic.minutes``.
+    """
+    sessions = _sessions(minutes_per_day)
+    by_subject: Dict[str, List[int]] = {}
+    exams: Dict[date, List[str]] = {}
+    for i, topic in enumerate(topics):
+        by_subject.setdefault(topic.subject, []).append(i)
+        if topic.exam and topic.subject not in exams.setdefault(topic.deadline, []):
+            exams[topic.deadline].append(topic.subject)
+    subject_minutes = dict.fromkeys(by_subject, 0)
+
+    schedule = []
+    for offset in range((end - start).days + 1):
+        day = start + timedelta(days=offset)
+        active = {}
+        for subject, indexes in by_subject.items():
+            live = [i for i in indexes if topics[i].deadline >= day]
+            if live:
+                active[subject] = (live, sum(topics[i].weight * _urgency(topics[i], day) for i in live))
+        heap = [((subject_minutes[s] + sessions[0]) / weight, s) for s, (_, weight) in active.items()] if sessions else []
+        heapq.heapify(heap)
+
+        today: Dict[int, int] = {}
+        for n, minutes in enumerate(sessions if heap else ()):
+            _, subject = heapq.heappop(heap)
+            live, weight = active[subject]
+            i = _pick_topic(topics, live, day, minutes)
+            topics[i].minutes += minutes
+            subject_minutes[subject] += minutes
+            today[i] = today.get(i, 0) + minutes
+            following = sessions[n + 1] if n + 1 < len(sessions) else 0
+            heapq.heappush(heap, ((subject_minutes[subject] + following) / weight, subject))
+
+        schedule.append({
+            "date": day.isoformat(),
+            "subjects": [
+                {
+                    "subject": topics[i].subject,
+                    "topic": topics[i].topic,
+                    "duration_minutes": minutes,
+                    "priority": topics[i].priority,
+                    "completed": False,
+                }
+                for i, minutes in today.items()
+            ],
+            "total_hours": round(sum(today.values()) / 60, 2),
+            "notes": f"Deadline: {', '.join(exams[day])}" if day in exams else None,
+        })
+    return schedule
@@ -0,0 +1,159 @@
+"""
+Map-reduce summarization for documents that exceed the model context.
+
+Documents are split into token-budgeted chunks, each chunk is summarized
+concurrently (bounded by a semaphore) and the chunk summaries are reduced
+into the final summary and key points. Chunk summaries are cached by chunk
+hash, so regenerating after a small edit only redoes the chunks that changed.
+Extracted documents can be chunked and summarized page by page while they
+are still being read (``summarize_pages``).
+"""
+import asyncio
+import hashlib
+import re
+from typing import AsyncIterable, AsyncIterator, List, Tuple
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services.ai_client import ai_client
+from app.services.chunking import Chunker, estimate_tokens, split_into_chunks
+
+chunk_cache = TTLCache(maxsize=settings.CHUNK_CACHE_SIZE, ttl=settings.NOTE_CACHE_TTL_SECONDS)
+
+_semaphore = asyncio.Semaphore(settings.SUMMARY_CONCURRENCY)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+MAX_KEY_POINTS = 5
+MAX_REDUCE_ROUNDS = 3
+
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You are a study assistant. Summarize the given study material accurately "
+    "and concisely for a student. Respond with plain text only."
+)
+
+
+def _first_sentence(text: str) -> str:
+    return _SENTENCE_END.split(text.strip(), maxsplit=1)[0][:200]
+
+
+def _summarize_text(text: str) -> dict:
+    # Extractive fallback when no AI provider is configured: the leading sentences
+    sentences = [s.strip() for s in _SENTENCE_END.split(" ".join(text.split())) if s.strip()]
+    if not sentences:
+        return {"summary": "", "key_point": ""}
+    return {
+        "summary": " ".join(sentences[:2])[:600],
+        "key_point": sentences[0][:200],
+    }
+
+
+async def summarize_chunk(chunk: str) -> dict:
+    """Summarize one chunk, returning ``{"summary", "key_point"}`` (cached by hash)."""
+    key = hashlib.sha256(chunk.encode()).hexdigest()
+    cached = chunk_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async with _semaphore:
+        if ai_client.configured:
+            summary = await ai_client.generate(
+                f"Summarize this section in 2-3 sentences, leading with its most important point:\n\n{chunk}",
+                system=SUMMARY_SYSTEM_PROMPT,
+                max_tokens=256,
+            )
+            result = {"summary": summary.strip(), "key_point": _first_sentence(summary)}
+        else:
+            result = _summarize_text(chunk)
+    chunk_cache.set(key, result)
+    return result
+
+
+async def summarize_pages(pages: AsyncIterable[str]) -> str:
+    """Collect a document's text from ``pages``, summarizing chunks as they fill.
+
+    Pages go straight into a ``Chunker`` and each completed chunk is
+    summarized while later pages are still arriving, so the chunk summaries
+    are already cached when the returned text is summarized. Returns the
+    non-empty pages, stripped and separated by blank lines.
+    """
+    chunker = Chunker(settings.CHUNK_MAX_TOKENS, settings.CHUNK_OVERLAP_TOKENS)
+    parts: List[str] = []
+    tasks: List[asyncio.Task] = []
+    try:
+        async for page in pages:
+            page = page.strip()
+            if page:
+                parts.append(page)
+                tasks.extend(asyncio.ensure_future(summarize_chunk(chunk)) for chunk in chunker.feed(page))
+        tasks.extend(asyncio.ensure_future(summarize_chunk(chunk)) for chunk in chunker.close())
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return "\n\n".join(parts)
+
+
+async def _map(text: str) -> List[dict]:
+    chunks = split_into_chunks(text, settings.CHUNK_MAX_TOKENS, settings.CHUNK_OVERLAP_TOKENS)
+    return await asyncio.gather(*(summarize_chunk(chunk) for chunk in chunks))
+
+
+async def _summarize_indexed(index: int, chunk: str) -> Tuple[int, dict]:
+    return index, await summarize_chunk(chunk)
+
+
+async def summarize_document_stream(text: str) -> AsyncIterator[dict]:
+    """Summarize text of any length, yielding partial results as they are produced.
+
+    Yields ``{"type": "section", "index", "summary", "key_point"}`` for each
+    chunk as soon as its summary is ready (in completion order), then, when
+    an AI provider combines several sections, ``{"type": "summary",
+    "delta"}`` for each piece of the combined summary as it streams in, and
+    finally one ``{"type": "document", "summary", "key_points"}`` with the
+    reduced result.
+    Chunk summaries that together still exceed the chunk budget are
+    re-chunked and reduced again, up to ``MAX_REDUCE_ROUNDS`` times.
+    """
+    chunks = split_into_chunks(text, settings.CHUNK_MAX_TOKENS, settings.CHUNK_OVERLAP_TOKENS)
+    partials: List[dict] = [{}] * len(chunks)
+    tasks = [asyncio.ensure_future(_summarize_indexed(i, chunk)) for i, chunk in enumerate(chunks)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            i, partial = await next_done
+            partials[i] = partial
+            yield {"type": "section", "index": i, **partial}
+    finally:
+        for task in tasks:
+            task.cancel()
+    key_points = [p["key_point"] for p in partials if p["key_point"]]
+
+    combined = " ".join(p["summary"] for p in partials if p["summary"])
+    for _ in range(MAX_REDUCE_ROUNDS):
+        if estimate_tokens(combined) <= settings.CHUNK_MAX_TOKENS:
+            break
+        partials = await _map(combined)
+        combined = " ".join(p["summary"] for p in partials if p["summary"])
+
+    if ai_client.configured and len(partials) > 1:
+        pieces = []
+        async for delta in ai_client.generate_stream(
+            f"Combine these section summaries into one coherent summary of a single paragraph:\n\n{combined}",
+            system=SUMMARY_SYSTEM_PROMPT,
+            max_tokens=512,
+        ):
+            # Leading whitespace is dropped so the deltas add up to the summary
+            delta = delta if pieces else delta.lstrip()
+            if delta:
+                pieces.append(delta)
+                yield {"type": "summary", "delta": delta}
+        combined = "".join(pieces)
+
+    # Spread key points across the whole document rather than its opening
+    if len(key_points) > MAX_KEY_POINTS:
+        step = len(key_points) / MAX_KEY_POINTS
+        key_points = [key_points[int(i * step)] for i in range(MAX_KEY_POINTS)]
+
+    yield {"type": "document", "summary": combined, "key_points": key_points}
+
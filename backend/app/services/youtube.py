@@ -0,0 +1,172 @@
+"""
+YouTube helpers: video ID extraction and transcript fetching.
+
+``youtube-transcript-api`` is synchronous, so fetches run in a bounded
+thread pool. Transcripts are cached on disk by video ID and language, so
+repeat requests never touch the network.
+"""
+import asyncio
+import json
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+
+_VIDEO_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+
+def extract_video_id(url: str) -> str:
+    """Extract the 11-character video ID from a YouTube URL (or a bare ID).
+
+    Supports ``watch?v=``, ``youtu.be/``, ``/embed/``, ``/shorts/`` and
+    ``/live/`` links. Raises ``ValueError`` if no valid ID is found.
+    """
+    url = url.strip()
+    if _VIDEO_ID.match(url):
+        return url
+
+    parsed = urlparse(url if "//" in url else f"https://{url}")
+    host = (parsed.hostname or "").lower().removeprefix("www.").removeprefix("m.")
+    candidate = None
+    if host == "youtu.be":
+        candidate = parsed.path.lstrip("/").split("/")[0]
+    elif host.endswith("youtube.com") or host.endswith("youtube-nocookie.com"):
+        if parsed.path == "/watch":
+            candidate = parse_qs(parsed.query).get("v", [None])[0]
+        else:
+            parts = parsed.path.strip("/").split("/")
+            if len(parts) >= 2 and parts[0] in ("embed", "shorts", "live", "v"):
+                candidate = parts[1]
+
+    if not candidate or not _VIDEO_ID.match(candidate):
+        raise ValueError(f"Not a valid YouTube URL: {url}")
+    return candidate
+
+
+class TranscriptUnavailable(Exception):
+    """The video has no transcript in any of the requested languages."""
+
+
+# (video_id, languages) -> (language_code, transcript_text)
+TranscriptFetcher = Callable[[str, Sequence[str]], Tuple[str, str]]
+
+
+def fetch_from_youtube(video_id: str, languages: Sequence[str]) -> Tuple[str, str]:
+    """Fetch a transcript with ``youtube-transcript-api`` (blocking)."""
+    from youtube_transcript_api import (
+        NoTranscriptFound,
+        TranscriptsDisabled,
+        VideoUnavailable,
+        YouTubeTranscriptApi,
+    )
+
+    try:
+        if hasattr(YouTubeTranscriptApi, "list_transcripts"):  # < 1.0
+            transcripts = YouTubeTranscriptApi.list_transcripts(video_id)
+        else:
+            transcripts = YouTubeTranscriptApi().list(video_id)
+        transcript = transcripts.find_transcript(languages)
+        segments = transcript.fetch()
+    except (NoTranscriptFound, TranscriptsDisabled, VideoUnavailable) as e:
+        raise TranscriptUnavailable(str(e)) from e
+
+    text = " ".join(
+        (segment["text"] if isinstance(segment, dict) else segment.text).strip()
+        for segment in segments
+    )
+    return transcript.language_code, text
+
+
+_fetcher: TranscriptFetcher = fetch_from_youtube
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+# Concurrent requests for the same video share one fetch
+_fetches = SingleFlight()
+
+
+def set_transcript_fetcher(fetcher: TranscriptFetcher) -> None:
+    """Replace the transcript fetcher (e.g. with a stub in tests)."""
+    global _fetcher
+    _fetcher = fetcher
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.TRANSCRIPT_WORKERS, thread_name_prefix="transcript")
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Shut down the transcript fetch thread pool."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+def _cache_path(video_id: str, language: str) -> Path:
+    return Path(settings.TRANSCRIPT_CACHE_DIR) / f"{video_id}.{language}.json"
+
+
+def _read_cached(video_id: str, languages: Sequence[str]) -> Optional[str]:
+    for language in languages:
+        try:
+            return json.loads(_cache_path(video_id, language).read_text(encoding="utf-8"))["text"]
+        except (OSError, ValueError, KeyError):
+            continue
+    return None
+
+
+def _write_cached(video_id: str, language: str, text: str) -> None:
+    path = _cache_path(video_id, language)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename, so readers never see a partial file
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"video_id": video_id, "language": language, "text": text}, f)
+    os.replace(tmp, path)
+
+
+def _load_transcript(video_id: str, languages: Sequence[str]) -> str:
+    cached = _read_cached(video_id, languages)
+    if cached is not None:
+        return cached
+    language, text = _fetcher(video_id, languages)
+    _write_cached(video_id, language, text)
+    return text
+
+
+async def fetch_transcript(video_id: str, languages: Optional[Sequence[str]] = None) -> str:
+    """Return the transcript text for a video, from the disk cache if possible.
+
+    Fetching and file I/O run in a bounded thread pool so the event loop is
+    never blocked. ``languages`` are tried in order (default
+    ``TRANSCRIPT_LANGUAGES``).
+    """
+    languages = tuple(languages or settings.TRANSCRIPT_LANGUAGES)
+    loop = asyncio.get_running_loop()
+    try:
+        return await _fetches.do(
+            (video_id, languages),
+            lambda: loop.run_in_executor(_get_executor(), _load_transcript, video_id, languages),
+        )
+    except TranscriptUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No transcript available for this video"
+        )
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Could not fetch video transcript"
+        )
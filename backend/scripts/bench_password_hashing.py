@@ -0,0 +1,88 @@
+"""
+Event-loop responsiveness during a burst of logins.
+
+Registers a user, then fires ``--logins`` concurrent logins while probing
+``/health`` every ``--interval`` seconds, in process through httpx's ASGI
+transport. Reports how many probes completed and their latency: if bcrypt
+ran on the event loop, probes would stall for the whole burst.
+``--inline`` hashes on the event loop instead, for comparison.
+
+Run from ``backend/``::
+
+    python scripts/bench_password_hashing.py [--logins 40] [--inline]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from app.api.v1 import auth  # noqa: E402
+from app.core.security import pwd_context  # noqa: E402
+from app.db.storage import storage  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def use_inline_hashing() -> None:
+    async def hash_password(password):
+        return pwd_context.hash(password)
+
+    async def verify_password_and_update(password, hashed):
+        return pwd_context.verify_and_update(password, hashed)
+
+    auth.hash_password = hash_password
+    auth.verify_password_and_update = verify_password_and_update
+
+
+async def run(logins: int, interval: float) -> None:
+    await storage.connect()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        user = {"email": "bench@example.com", "password": "bench-password", "name": "Bench"}
+        await client.post("/api/v1/auth/register", json=user)
+
+        latencies = []
+        done = asyncio.Event()
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/health")
+                latencies.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(interval)
+
+        prober = asyncio.create_task(probe())
+        start = time.perf_counter()
+        credentials = {"email": user["email"], "password": user["password"]}
+        responses = await asyncio.gather(*(client.post("/api/v1/auth/login", json=credentials) for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await prober
+    await storage.close()
+
+    assert all(r.status_code == 200 for r in responses), {r.status_code for r in responses}
+    print(f"{logins} logins in {elapsed:.1f}s")
+    print(f"{len(latencies)} /health probes completed")
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        print(f"probe latency p50 {cuts[49]:.1f} ms, p99 {cuts[98]:.1f} ms, max {max(latencies):.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--interval", type=float, default=0.005, help="seconds between probes")
+    parser.add_argument("--inline", action="store_true", help="hash on the event loop (old behaviour)")
+    args = parser.parse_args()
+    if args.inline:
+        use_inline_hashing()
+    asyncio.run(run(args.logins, args.interval))
+
+
+if __name__ == "__main__":
+    main()
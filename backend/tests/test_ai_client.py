@@ -0,0 +1,217 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services.ai_client import AIClient, GeminiProvider, OpenAIProvider, TokenBucket
+
+
+def gemini_reply(text: str) -> httpx.Response:
+    return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": text}]}}]})
+
+
+def openai_reply(text: str) -> httpx.Response:
+    return httpx.Response(200, json={"choices": [{"message": {"content": text}}]})
+
+
+def sse(*payloads) -> httpx.Response:
+    body = "".join(f"data: {payload}\n\n" for payload in payloads)
+    return httpx.Response(200, text=body, headers={"Content-Type": "text/event-stream"})
+
+
+def collect(client: AIClient, prompt: str = "prompt") -> list:
+    async def run():
+        return [text async for text in client.generate_stream(prompt)]
+
+    return asyncio.run(run())
+
+
+def make_client(handler, *providers) -> AIClient:
+    client = AIClient()
+    client.providers = list(providers)
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+@pytest.fixture(autouse=True)
+def fast_settings(monkeypatch):
+    monkeypatch.setattr(settings, "AI_MAX_RETRIES", 3)
+    monkeypatch.setattr(settings, "AI_BACKOFF_BASE_SECONDS", 0.001)
+    monkeypatch.setattr(settings, "AI_BACKOFF_MAX_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "AI_HEDGE_DELAY_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "AI_REQUESTS_PER_MINUTE", 60 * 1000)
+
+
+@pytest.mark.parametrize("failure", [429, 500, 503])
+def test_retries_transient_failures(failure):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return gemini_reply("ok") if len(calls) == 3 else httpx.Response(failure)
+
+    client = make_client(handler, GeminiProvider("key", "https://gemini.test", "model"))
+    assert asyncio.run(client.generate("prompt")) == "ok"
+    assert len(calls) == 3
+
+
+def test_does_not_retry_client_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400)
+
+    client = make_client(handler, GeminiProvider("key", "https://gemini.test", "model"))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(client.generate("prompt"))
+    assert error.value.status_code == 503
+    assert len(calls) == 1
+
+
+def test_gives_up_after_max_retries():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(502)
+
+    client = make_client(handler, GeminiProvider("key", "https://gemini.test", "model"))
+    with pytest.raises(HTTPException):
+        asyncio.run(client.generate("prompt"))
+    assert len(calls) == settings.AI_MAX_RETRIES + 1
+
+
+def test_hedges_to_backup_after_delay():
+    started = {}
+
+    async def handler(request):
+        host = request.url.host
+        started[host] = time.monotonic()
+        if host == "gemini.test":
+            await asyncio.sleep(1)
+            return gemini_reply("slow")
+        return openai_reply("fast")
+
+    client = make_client(
+        handler,
+        GeminiProvider("key", "https://gemini.test", "model"),
+        OpenAIProvider("key", "https://openai.test", "model"),
+    )
+    begin = time.monotonic()
+    assert asyncio.run(client.generate("prompt")) == "fast"
+    assert time.monotonic() - begin < 1
+    assert started["openai.test"] - started["gemini.test"] >= settings.AI_HEDGE_DELAY_SECONDS * 0.9
+
+
+def test_no_hedge_when_primary_is_fast():
+    hosts = []
+
+    def handler(request):
+        hosts.append(request.url.host)
+        return gemini_reply("primary")
+
+    client = make_client(
+        handler,
+        GeminiProvider("key", "https://gemini.test", "model"),
+        OpenAIProvider("key", "https://openai.test", "model"),
+    )
+    assert asyncio.run(client.generate("prompt")) == "primary"
+    assert hosts == ["gemini.test"]
+
+
+def test_fails_over_when_primary_fails():
+    def handler(request):
+        if request.url.host == "gemini.test":
+            return httpx.Response(401)
+        return openai_reply("backup")
+
+    client = make_client(
+        handler,
+        GeminiProvider("key", "https://gemini.test", "model"),
+        OpenAIProvider("key", "https://openai.test", "model"),
+    )
+    assert asyncio.run(client.generate("prompt")) == "backup"
+
+
+def test_token_bucket_limits_rate():
+    async def take(bucket, n):
+        for _ in range(n):
+            await bucket.acquire()
+
+    bucket = TokenBucket(rate=20, capacity=2)
+    begin = time.monotonic()
+    asyncio.run(take(bucket, 6))
+    # Two tokens come from the burst, the other four at 20 per second
+    assert time.monotonic() - begin >= 4 / 20 * 0.9
+
+
+def test_provider_requests_are_rate_limited(monkeypatch):
+    monkeypatch.setattr(settings, "AI_REQUESTS_PER_MINUTE", 600)  # 10 per second
+    monkeypatch.setattr(settings, "AI_BURST_SECONDS", 0.1)  # no burst beyond one request
+    sent = []
+
+    def handler(request):
+        sent.append(time.monotonic())
+        return gemini_reply("ok")
+
+    client = make_client(handler, GeminiProvider("key", "https://gemini.test", "model"))
+
+    async def run():
+        await asyncio.gather(*(client.generate("prompt") for _ in range(4)))
+
+    asyncio.run(run())
+    assert len(sent) == 4
+    assert sent[-1] - sent[0] >= 3 / 10 * 0.9
+
+
+def test_streams_gemini_deltas():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return sse(
+            json.dumps({"candidates": [{"content": {"parts": [{"text": "Hel"}]}}]}),
+            json.dumps({"candidates": [{"content": {"parts": [{"text": "lo"}]}}]}),
+            json.dumps({"candidates": [{"finishReason": "STOP"}]}),
+        )
+
+    client = make_client(handler, GeminiProvider("key", "https://gemini.test", "model"))
+    assert collect(client) == ["Hel", "lo"]
+    assert requests[0].url.path.endswith(":streamGenerateContent")
+    assert requests[0].url.params["alt"] == "sse"
+
+
+def test_streams_openai_deltas():
+    bodies = []
+
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        return sse(
+            json.dumps({"choices": [{"delta": {"role": "assistant"}}]}),
+            json.dumps({"choices": [{"delta": {"content": "Hi"}}]}),
+            json.dumps({"choices": [{"delta": {"content": " there"}}]}),
+            "[DONE]",
+        )
+
+    client = make_client(handler, OpenAIProvider("key", "https://openai.test", "model"))
+    assert collect(client) == ["Hi", " there"]
+    assert bodies[0]["stream"] is True
+
+
+def test_stream_fails_over_before_first_delta():
+    def handler(request):
+        if request.url.host == "gemini.test":
+            return httpx.Response(401)
+        return sse(json.dumps({"choices": [{"delta": {"content": "backup"}}]}), "[DONE]")
+
+    client = make_client(
+        handler,
+        GeminiProvider("key", "https://gemini.test", "model"),
+        OpenAIProvider("key", "https://openai.test", "model"),
+    )
+    assert collect(client) == ["backup"]
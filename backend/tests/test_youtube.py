@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services import youtube
+from app.services.youtube import TranscriptUnavailable, fetch_transcript, set_transcript_fetcher
+
+VIDEO_ID = "dQw4w9WgXcQ"
+
+
+class FakeFetcher:
+    """Serves transcripts from a dict of language -> text, recording calls."""
+
+    def __init__(self, transcripts):
+        self.transcripts = transcripts
+        self.calls = []
+
+    def __call__(self, video_id, languages):
+        self.calls.append((video_id, tuple(languages)))
+        for language in languages:
+            if language in self.transcripts:
+                return language, self.transcripts[language]
+        raise TranscriptUnavailable(f"No transcript in {languages}")
+
+
+@pytest.fixture(autouse=True)
+def transcript_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TRANSCRIPT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "TRANSCRIPT_LANGUAGES", ["en"])
+    yield tmp_path
+    set_transcript_fetcher(youtube.fetch_from_youtube)
+    youtube.shutdown_executor()
+
+
+def test_cache_miss_fetches_and_writes_cache(transcript_cache):
+    fetcher = FakeFetcher({"en": "hello world"})
+    set_transcript_fetcher(fetcher)
+
+    assert asyncio.run(fetch_transcript(VIDEO_ID)) == "hello world"
+    assert fetcher.calls == [(VIDEO_ID, ("en",))]
+    assert (transcript_cache / f"{VIDEO_ID}.en.json").exists()
+
+
+def test_cache_hit_skips_fetcher():
+    set_transcript_fetcher(FakeFetcher({"en": "hello world"}))
+    asyncio.run(fetch_transcript(VIDEO_ID))
+
+    fetcher = FakeFetcher({"en": "changed"})
+    set_transcript_fetcher(fetcher)
+    assert asyncio.run(fetch_transcript(VIDEO_ID)) == "hello world"
+    assert fetcher.calls == []
+
+
+def test_falls_back_to_later_language(transcript_cache):
+    fetcher = FakeFetcher({"de": "hallo welt"})
+    set_transcript_fetcher(fetcher)
+
+    assert asyncio.run(fetch_transcript(VIDEO_ID, ["en", "de"])) == "hallo welt"
+    assert (transcript_cache / f"{VIDEO_ID}.de.json").exists()
+    assert not (transcript_cache / f"{VIDEO_ID}.en.json").exists()
+
+    # The fallback language is served from the cache next time
+    assert asyncio.run(fetch_transcript(VIDEO_ID, ["en", "de"])) == "hallo welt"
+    assert len(fetcher.calls) == 1
+
+
+def test_cache_prefers_earlier_language():
+    set_transcript_fetcher(FakeFetcher({"en": "hello", "de": "hallo"}))
+    asyncio.run(fetch_transcript(VIDEO_ID, ["de"]))
+    asyncio.run(fetch_transcript(VIDEO_ID, ["en"]))
+
+    assert asyncio.run(fetch_transcript(VIDEO_ID, ["en", "de"])) == "hello"
+    assert asyncio.run(fetch_transcript(VIDEO_ID, ["de", "en"])) == "hallo"
+
+
+def test_no_transcript_is_404(transcript_cache):
+    set_transcript_fetcher(FakeFetcher({}))
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(fetch_transcript(VIDEO_ID))
+    assert error.value.status_code == 404
+    assert error.value.detail == "No transcript available for this video"
+    assert list(transcript_cache.iterdir()) == []
+
+
+def test_fetch_failure_is_502():
+    def broken(video_id, languages):
+        raise ConnectionError("network down")
+
+    set_transcript_fetcher(broken)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(fetch_transcript(VIDEO_ID))
+    assert error.value.status_code == 502